@@ -1,10 +1,15 @@
 # app.py
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, send_file
+from werkzeug.security import safe_join
 from flask_cors import CORS
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import asyncio
+import threading
+from concurrent.futures import Future
 from datetime import datetime
+import re
 import traceback
 
 # Configure logging
@@ -26,17 +31,54 @@ logger.addHandler(file_handler)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Serve /suggest from an async view (needs Flask's async extra, i.e. asgiref). Under
+# WSGI each request still holds a worker thread; the async view adds in-flight
+# de-duplication and does its city/weather HTTP with httpx
+ASYNC_SUGGEST = os.getenv("ASYNC_SUGGEST", "1") == "1"
+
 # Initialize modules with error handling
 try:
     from modules import shared_state
-    from modules.voice_assistant import chat_with_gpt
-    from modules.weather_util import get_weather, get_city_from_ip
-    from modules.outfit_memory import save_history, get_recent_outfits, capture_outfit_snapshot
+    from modules.weather_util import (get_weather, get_city_from_ip, aget_weather, aget_city_from_ip,
+                                      publish_weather, watch_weather)
+    from modules.outfit_memory import save_history, get_outfit_page, format_outfit, capture_outfit_snapshot
+    from modules.snapshot_store import snapshot_store, RENDITIONS
+    from modules.database import init_db, remove_session
+    from modules.event_stream import EventBroker
+    from modules.suggestions import prefetcher, PREFETCH_SUGGESTIONS
+    from modules.wardrobe import suggest, asuggest
+    # Release each request thread's DB session when the request ends
+    app.teardown_appcontext(remove_session)
     MODULES_LOADED = True
 except ImportError as e:
     logger.error(f"Failed to load modules: {str(e)}")
     MODULES_LOADED = False
 
+_initialized = False
+_init_lock = threading.Lock()
+
+def init_app():
+    """Startup hook: create or migrate the database and start prefetching suggestions.
+
+    Runs once, from __main__ or before the first request under any other
+    server, so importing this module (benchmarks, tests, `flask routes`)
+    has no side effects.
+    """
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        _initialized = True
+        if MODULES_LOADED:
+            init_db()
+            if PREFETCH_SUGGESTIONS:
+                prefetcher.start()
+
+@app.before_request
+def ensure_initialized():
+    if not _initialized:
+        init_app()
+
 @app.errorhandler(Exception)
 def handle_error(error):
     """Global error handler for all routes"""
@@ -56,7 +98,28 @@ def home():
         logger.error(f"Error rendering home page: {str(e)}")
         raise
 
-@app.route('/suggest', methods=['GET'])
+def suggestion_response(outfit, city, weather, emotion, prefetched=False):
+    """Build the JSON response for an outfit suggestion"""
+    return jsonify({
+        "message": outfit,
+        "metadata": {
+            "city": city,
+            "weather": weather,
+            "emotion": emotion,
+            "prefetched": prefetched,
+            "timestamp": datetime.now().isoformat()
+        }
+    })
+
+def take_prefetched(city, weather, emotion):
+    """A pre-generated suggestion for these inputs, shown on the mirror like a fresh one, or None"""
+    if not PREFETCH_SUGGESTIONS:
+        return None
+    outfit = prefetcher.take(city, weather, emotion)
+    if outfit:
+        shared_state.publish(latest_response=outfit)
+    return outfit
+
 def suggest_outfit():
     """Get outfit suggestion based on weather and emotion"""
     if not MODULES_LOADED:
@@ -70,25 +133,75 @@ def suggest_outfit():
         weather = get_weather(city)
         emotion = shared_state.current_emotion or "neutral"
 
-        logger.info(f"Generating outfit suggestion for city: {city}, weather: {weather}, emotion: {emotion}")
+        outfit = take_prefetched(city, weather, emotion)
+        if outfit:
+            save_history(outfit, weather=weather, emotion=emotion)
+            return suggestion_response(outfit, city, weather, emotion, prefetched=True)
 
-        prompt = (
-            f"You are a fashion assistant. The user is feeling {emotion}. "
-            f"The weather in {city} is {weather}. Suggest an outfit."
-        )
+        logger.info(f"Generating outfit suggestion for city: {city}, weather: {weather}, emotion: {emotion}")
 
-        outfit = chat_with_gpt(prompt, emotion)
-        save_history(outfit)
+        # Picked by the local wardrobe ranker; the LLM only words it
+        outfit = suggest(city, weather, emotion)
+        shared_state.publish(latest_response=outfit)
+        save_history(outfit, weather=weather, emotion=emotion)
         
+        return suggestion_response(outfit, city, weather, emotion)
+    except Exception as e:
+        logger.error(f"Error generating outfit suggestion: {str(e)}")
         return jsonify({
-            "message": outfit,
-            "metadata": {
-                "city": city,
-                "weather": weather,
-                "emotion": emotion,
-                "timestamp": datetime.now().isoformat()
-            }
-        })
+            "error": "Failed to generate outfit suggestion",
+            "message": str(e)
+        }), 500
+
+# In-flight suggestions keyed by (city, weather, emotion); identical concurrent
+# requests wait on the first one instead of making their own LLM call
+_suggestions_in_flight = {}
+_suggestions_lock = threading.Lock()
+
+async def suggest_outfit_async():
+    """Async variant of suggest_outfit with in-flight request de-duplication"""
+    if not MODULES_LOADED:
+        return jsonify({
+            "error": "Required modules not loaded",
+            "message": "Please check the server logs for details"
+        }), 500
+
+    try:
+        city = await aget_city_from_ip()
+        weather = await aget_weather(city)
+        emotion = shared_state.current_emotion or "neutral"
+        outfit = await asyncio.to_thread(take_prefetched, city, weather, emotion)
+        if outfit:
+            await asyncio.to_thread(save_history, outfit, weather=weather, emotion=emotion)
+            return suggestion_response(outfit, city, weather, emotion, prefetched=True)
+
+        logger.info(f"Generating outfit suggestion for city: {city}, weather: {weather}, emotion: {emotion}")
+
+        key = (city, weather, emotion)
+        with _suggestions_lock:
+            pending = _suggestions_in_flight.get(key)
+            leader = pending is None
+            if leader:
+                pending = _suggestions_in_flight[key] = Future()
+
+        if not leader:
+            # Futures are thread-safe, so this works across per-request event loops
+            outfit = await asyncio.wrap_future(pending)
+            return suggestion_response(outfit, city, weather, emotion)
+
+        try:
+            outfit = await asuggest(city, weather, emotion)
+            shared_state.publish(latest_response=outfit)
+            pending.set_result(outfit)
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with _suggestions_lock:
+                _suggestions_in_flight.pop(key, None)
+
+        await asyncio.to_thread(save_history, outfit, weather=weather, emotion=emotion)
+        return suggestion_response(outfit, city, weather, emotion)
     except Exception as e:
         logger.error(f"Error generating outfit suggestion: {str(e)}")
         return jsonify({
@@ -96,6 +209,9 @@ def suggest_outfit():
             "message": str(e)
         }), 500
 
+app.add_url_rule('/suggest', 'suggest_outfit', suggest_outfit_async if ASYNC_SUGGEST else suggest_outfit,
+                 methods=['GET'])
+
 @app.route('/weather', methods=['GET'])
 def get_weather_info():
     """Get current weather information"""
@@ -108,6 +224,7 @@ def get_weather_info():
     try:
         city = get_city_from_ip()
         weather = get_weather(city)
+        publish_weather(city, weather)
         logger.info(f"Retrieved weather for {city}: {weather}")
         
         return jsonify({
@@ -139,19 +256,20 @@ def save_outfit():
             raise ValueError("Request must be JSON")
 
         name = request.json.get("name", "Unnamed Outfit")
-        image_path = capture_outfit_snapshot()
+        snapshot = capture_outfit_snapshot()
         
-        if not image_path:
+        if not snapshot:
             raise ValueError("Failed to capture outfit image")
 
-        save_history(name, image_path)
-        logger.info(f"Saved outfit: {name} with image at {image_path}")
+        save_history(name, snapshot)
+        logger.info(f"Saved outfit: {name} with image at {snapshot.path}")
         
         return jsonify({
             "message": f"Saved outfit: {name}",
             "metadata": {
                 "name": name,
-                "image_path": image_path,
+                "image_path": snapshot.path,
+                "image_hash": snapshot.image_hash,
                 "timestamp": datetime.now().isoformat()
             }
         })
@@ -162,9 +280,17 @@ def save_outfit():
             "message": str(e)
         }), 500
 
+# Page size limits for /history
+HISTORY_PAGE_SIZE = 10
+HISTORY_MAX_PAGE_SIZE = 100
+
 @app.route('/history', methods=['GET'])
 def get_outfit_history():
-    """Get recent outfit history"""
+    """Get a page of outfit history.
+
+    Query parameters: limit, cursor (next_cursor of the previous page),
+    emotion, band (cold/cool/mild/warm/hot) and since/until (ISO dates).
+    """
     if not MODULES_LOADED:
         return jsonify({
             "error": "Required modules not loaded",
@@ -172,16 +298,35 @@ def get_outfit_history():
         }), 500
 
     try:
-        history = get_recent_outfits()
-        logger.info(f"Retrieved {len(history)} outfit history entries")
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        since = request.args.get('since')
+        until = request.args.get('until')
+        items, next_cursor = get_outfit_page(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            emotion=request.args.get('emotion'),
+            weather_band=request.args.get('band'),
+            since=datetime.fromisoformat(since) if since else None,
+            until=datetime.fromisoformat(until) if until else None
+        )
+        for item in items:
+            item.update(image_urls(item))
+        logger.info(f"Retrieved {len(items)} outfit history entries")
         
         return jsonify({
-            "message": "\n".join(history),
+            "message": "\n".join(format_outfit(item) for item in items),
+            "items": items,
+            "next_cursor": next_cursor,
             "metadata": {
-                "count": len(history),
+                "count": len(items),
                 "timestamp": datetime.now().isoformat()
             }
         })
+    except ValueError as e:
+        return jsonify({
+            "error": "Invalid history query",
+            "message": str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error getting outfit history: {str(e)}")
         return jsonify({
@@ -189,6 +334,157 @@ def get_outfit_history():
             "message": str(e)
         }), 500
 
+# Snapshots are content-addressed, so a URL's bytes never change
+IMAGE_MAX_AGE = 365 * 24 * 60 * 60
+IMAGE_HASH = re.compile(r"^[0-9a-f]{32}$")
+# How long an image request waits for a snapshot that is still being encoded
+IMAGE_PENDING_TIMEOUT = 5.0
+
+def image_urls(item):
+    """URLs for an outfit's image renditions (legacy images only have a full size)"""
+    if item.get("image_hash"):
+        return {rendition + "_url": f"/images/{rendition}/{item['image_hash']}.jpg" for rendition in RENDITIONS}
+    if item.get("image_path"):
+        url = "/" + item["image_path"].lstrip("/")
+        return {rendition + "_url": url for rendition in RENDITIONS}
+    return {}
+
+def image_not_found(message):
+    return jsonify({
+        "error": "Image not found",
+        "message": message
+    }), 404
+
+def immutable(response):
+    response.cache_control.public = True
+    response.cache_control.max_age = IMAGE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/images/<rendition>/<image_hash>.jpg', methods=['GET'])
+def get_outfit_image(rendition, image_hash):
+    """Serve a stored snapshot rendition (full, preview or thumb)"""
+    if not MODULES_LOADED:
+        return jsonify({
+            "error": "Required modules not loaded",
+            "message": "Please check the server logs for details"
+        }), 500
+    if rendition not in RENDITIONS or not IMAGE_HASH.match(image_hash):
+        return image_not_found(f"No such image: {rendition}/{image_hash}")
+
+    # The hash names the content, so a matching If-None-Match needs no file access
+    # at all, and any cached copy (If-Modified-Since, only consulted without an
+    # If-None-Match) is still current
+    etag = f"{image_hash}-{rendition}"
+    if request.if_none_match.contains(etag) or (
+            not request.if_none_match and request.if_modified_since is not None):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return immutable(response)
+
+    try:
+        snapshot_store.wait(image_hash, IMAGE_PENDING_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Snapshot {image_hash} not available: {str(e)}")
+        return image_not_found(f"Snapshot {image_hash} could not be stored")
+    path = snapshot_store.path_for(image_hash, rendition)
+    if not os.path.exists(path):
+        return image_not_found(f"No such image: {rendition}/{image_hash}")
+
+    # send_file honours Range requests and hands the file to the server's
+    # wsgi.file_wrapper (sendfile) when there is one
+    response = send_file(os.path.abspath(path), mimetype="image/jpeg", etag=etag,
+                         conditional=True, max_age=IMAGE_MAX_AGE)
+    return immutable(response)
+
+@app.route('/outfits/<path:filename>', methods=['GET'])
+def get_legacy_outfit_image(filename):
+    """Serve images saved before snapshots were content-addressed"""
+    if not MODULES_LOADED:
+        return jsonify({
+            "error": "Required modules not loaded",
+            "message": "Please check the server logs for details"
+        }), 500
+    path = safe_join(os.path.abspath(snapshot_store.root), filename)
+    if path is None or not os.path.isfile(path):
+        return image_not_found(f"No such image: {filename}")
+    return send_file(path, conditional=True)
+
+# Shared state field -> event pushed to /events clients when it changes
+STATE_EVENTS = {
+    "current_emotion": "emotion",
+    "latest_response": "subtitle",
+    "weather": "weather",
+    "last_outfit": "history",
+}
+
+def event_payload(event, state):
+    if event == "emotion":
+        return {"emotion": state["current_emotion"], "scores": state["emotion_scores"],
+                "updated_at": state["emotion_updated_at"]}
+    if event == "subtitle":
+        return {"text": state["latest_response"]}
+    if event == "history":
+        item = dict(state["last_outfit"])
+        item.update(image_urls(item))
+        return item
+    return state["weather"]
+
+def client_snapshot():
+    """Everything a (re)connecting client needs to redraw"""
+    state = shared_state.snapshot()
+    return {
+        "emotion": event_payload("emotion", state),
+        "subtitle": event_payload("subtitle", state),
+        "weather": state["weather"],
+    }
+
+broker = EventBroker(snapshot=client_snapshot) if MODULES_LOADED else None
+_event_feed_started = False
+_event_feed_lock = threading.Lock()
+
+def start_event_feed():
+    """Turn shared state changes (from any process) into events, on first use"""
+    global _event_feed_started
+    with _event_feed_lock:
+        if _event_feed_started:
+            return
+        _event_feed_started = True
+
+    previous = shared_state.snapshot()
+
+    def on_state(state):
+        nonlocal previous
+        for field, event in STATE_EVENTS.items():
+            if state[field] != previous[field] and state[field] is not None:
+                broker.publish(event, event_payload(event, state))
+        previous = state
+
+    shared_state.subscribe(on_state)
+    watch_weather()
+
+@app.route('/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events: emotion, subtitle, weather and history updates.
+
+    Reconnecting clients send Last-Event-ID (EventSource does this itself)
+    and get the events they missed, or a resync event with the current state.
+    """
+    if not MODULES_LOADED:
+        return jsonify({
+            "error": "Required modules not loaded",
+            "message": "Please check the server logs for details"
+        }), 500
+
+    start_event_feed()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = app.response_class(broker.stream(last_event_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 if __name__ == '__main__':
     logger.info("Starting Smart Mirror application")
+    init_app()
     app.run(host='127.0.0.1', port=8080, debug=True)
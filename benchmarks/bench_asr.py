@@ -0,0 +1,76 @@
+"""Word-error rate and latency of each speech backend on recorded WAV fixtures.
+
+Each fixture is a 16-bit mono WAV file with a .txt file of the same name
+holding the reference transcript. make_asr_fixtures generates a set with
+the mirror's TTS voice; the vosk backend also needs a model in
+VOSK_MODEL_PATH (https://alphacephei.com/vosk/models):
+
+    python -m benchmarks.make_asr_fixtures [fixtures_dir]
+    python -m benchmarks.bench_asr [fixtures_dir]
+"""
+import glob
+import os
+import sys
+import time
+import speech_recognition as sr
+from modules.speech_backends import BACKENDS, load_backend
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "asr")
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(txt_path):
+            continue
+        with sr.AudioFile(wav_path) as source:
+            audio = sr.Recognizer().record(source)
+        with open(txt_path) as f:
+            fixtures.append((os.path.basename(wav_path), audio, f.read().strip()))
+    return fixtures
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURES
+    fixtures = load_fixtures(directory)
+    if not fixtures:
+        print(f"No WAV/TXT fixture pairs found in {directory}; "
+              f"run python -m benchmarks.make_asr_fixtures to generate some")
+        return
+
+    print(f"{'backend':<10} {'WER':>6} {'mean ms':>9} {'max ms':>9} {'failed':>7}")
+    for name in BACKENDS:
+        backend = load_backend(name)
+        if backend is None:
+            print(f"{name:<10} {'unavailable':>34}")
+            continue
+        errors, latencies, failed = [], [], 0
+        for _, audio, reference in fixtures:
+            started = time.perf_counter()
+            try:
+                hypothesis = backend.transcribe(audio)
+            except (sr.UnknownValueError, sr.RequestError):
+                hypothesis = ""
+                failed += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors.append(word_error_rate(reference, hypothesis))
+        print(f"{name:<10} {sum(errors) / len(errors):6.1%} {sum(latencies) / len(latencies):9.1f} "
+              f"{max(latencies):9.1f} {failed:7d}")
+
+
+if __name__ == "__main__":
+    main()
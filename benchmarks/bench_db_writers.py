@@ -0,0 +1,93 @@
+"""Concurrent writer/reader stress test for the outfit database.
+
+Writer threads insert outfits while reader threads page through history,
+first with a default SQLAlchemy engine (rollback journal, no busy handling
+beyond the driver default) and then through modules.database. Both run on a
+scratch database file:
+
+    python -m benchmarks.bench_db_writers [--writers 8] [--readers 4] [--writes 200]
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-db-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from modules import database
+from modules.database import Base, init_db, save_outfit, get_outfits, session_scope
+
+
+def run(scope, writers, readers, writes):
+    locked, other = [], []
+    stop = threading.Event()
+
+    def record(e):
+        (locked if "locked" in str(e) else other).append(e)
+
+    def writer(n):
+        for i in range(writes):
+            try:
+                with scope() as db:
+                    save_outfit(db, name=f"w{n}-{i}", description="Denim jacket, white tee",
+                                weather="clouds, 23°C", emotion="happy")
+            except OperationalError as e:
+                record(e)
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with scope() as db:
+                    get_outfits(db, limit=20)
+            except OperationalError as e:
+                record(e)
+
+    threads = [threading.Thread(target=reader, daemon=True) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    write_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in write_threads:
+        t.start()
+    for t in write_threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+
+    done = writers * writes - len(locked) - len(other)
+    return done / elapsed, len(locked), len(other)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+    init_db()
+
+    baseline_engine = create_engine(f"sqlite:///{os.path.join(SCRATCH, 'baseline.db')}")
+    Base.metadata.create_all(bind=baseline_engine)
+    baseline_sessions = sessionmaker(autocommit=False, autoflush=False, bind=baseline_engine)
+
+    modes = [
+        ("default", lambda: contextlib.closing(baseline_sessions())),
+        ("pooled+WAL", session_scope),
+    ]
+    print(f"{'mode':<11} {'writes/s':>9} {'locked':>7} {'other':>6}")
+    for name, scope in modes:
+        rate, locked, other = run(scope, args.writers, args.readers, args.writes)
+        print(f"{name:<11} {rate:9.1f} {locked:7d} {other:6d}")
+    print(f"pool: {database.engine.pool.status()}")
+
+
+if __name__ == "__main__":
+    main()
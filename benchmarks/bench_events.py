@@ -0,0 +1,197 @@
+"""Fan-out latency of the /events Server-Sent Events stream under many clients.
+
+Serves the app on a local port, connects hundreds of simulated EventSource
+clients from a separate process, then publishes subtitle updates through the
+shared state bus and measures how long each takes to reach every client. A
+few clients stop reading until the updates are over, to exercise
+backpressure, and one disconnects partway and resumes with Last-Event-ID:
+
+    python -m benchmarks.bench_events [--clients 300] [--stalled 5] [--updates 400] [--rate 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-events-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+os.environ.setdefault("STATE_BUS_NAME", f"sakha_bench_{os.getpid()}")
+os.environ.setdefault("STATE_BUS_DIR", SCRATCH)
+os.environ.setdefault("WEATHER_PUSH_INTERVAL", "0")
+os.environ.setdefault("PREFETCH_SUGGESTIONS", "0")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Subtitles carry the whole reply so far, so real events are a few hundred bytes
+FILLER = "x" * 300
+
+
+class Client:
+    """Minimal EventSource that records subtitle latencies"""
+
+    def __init__(self, port, stall=0.0):
+        self.port = port
+        self.stall = stall
+        self.last_event_id = None
+        self.latencies = []
+        self.seen = set()
+        self.resyncs = 0
+        self.ready = asyncio.Event()
+        self.done = asyncio.Event()
+
+    async def connect(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.stall:
+            # A small window so the server's writes really block while we stall
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", self.port))
+        return await asyncio.open_connection(sock=sock, limit=4096)
+
+    async def run(self, stop_after=None):
+        reader, writer = await self.connect()
+        headers = f"Last-Event-ID: {self.last_event_id}\r\n" if self.last_event_id else ""
+        writer.write(f"GET /events HTTP/1.0\r\nAccept: text/event-stream\r\n{headers}\r\n".encode())
+        await reader.readuntil(b"\r\n\r\n")
+
+        event, received = {}, 0
+        try:
+            while not self.done.is_set():
+                line = (await reader.readline()).decode().rstrip("\n")
+                if line:
+                    field, _, value = line.partition(": ")
+                    event[field] = value
+                    continue
+                if "event" in event:
+                    self.handle(event)
+                    received += 1
+                    if stop_after is not None and received >= stop_after:
+                        return
+                    if self.stall:
+                        await asyncio.sleep(self.stall)
+                        self.stall = 0.0
+                event = {}
+        finally:
+            writer.close()
+
+    def handle(self, event):
+        self.last_event_id = event["id"]
+        if event["event"] == "resync":
+            self.resyncs += 1
+            self.ready.set()
+        elif event["event"] == "subtitle":
+            text = json.loads(event["data"])["text"]
+            if text == "done":
+                self.done.set()
+                return
+            sent_at, number, _ = text.split(" ", 2)
+            self.latencies.append(time.monotonic() - float(sent_at))
+            self.seen.add(int(number))
+
+
+async def simulate(port, clients, stalled, stall):
+    live = [Client(port) for _ in range(clients - stalled - 1)]
+    slow = [Client(port, stall=stall) for _ in range(stalled)]
+    resumer = Client(port)
+
+    tasks = []
+    for i, client in enumerate(live + slow):
+        tasks.append(asyncio.create_task(client.run()))
+        if i % 50 == 49:
+            await asyncio.sleep(0.05)
+
+    async def resume():
+        # Drop the connection partway through, then come back with Last-Event-ID
+        await resumer.run(stop_after=20)
+        await asyncio.sleep(0.5)
+        await resumer.run()
+    tasks.append(asyncio.create_task(resume()))
+
+    await asyncio.gather(*(client.ready.wait() for client in live + slow + [resumer]))
+    print("ready", flush=True)
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=120)
+    return {
+        "latencies": [latency for client in live for latency in client.latencies],
+        "live_seen": min(len(client.seen) for client in live),
+        "stalled_seen": [len(client.seen) for client in slow],
+        "stalled_resyncs": sum(client.resyncs - 1 for client in slow),
+        "resumer_seen": len(resumer.seen),
+        "resumer_resyncs": resumer.resyncs - 1,
+    }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--stalled", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=20, help="updates per second")
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    duration = args.updates / args.rate
+    if args.port:
+        stats = asyncio.run(simulate(args.port, args.clients, args.stalled, duration + 1.0))
+        print(json.dumps(stats), flush=True)
+        return
+
+    os.chdir(SCRATCH)
+    from werkzeug.serving import make_server
+    import app as web
+    from modules import shared_state
+    from modules.state_bus import get_bus
+
+    server = make_server("127.0.0.1", 0, web.app, threaded=True)
+    server.socket.listen(1024)
+    accept = server.get_request
+
+    def get_request():
+        # Loopback would otherwise buffer megabytes per connection; cap it like
+        # a slow link so a stalled client really blocks its writer
+        connection, address = accept()
+        connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16384)
+        return connection, address
+    server.get_request = get_request
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    simulator = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_events", "--port", str(server.port),
+                                  "--clients", str(args.clients), "--stalled", str(args.stalled),
+                                  "--updates", str(args.updates), "--rate", str(args.rate)],
+                                 cwd=REPO_ROOT, env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+                                 stdout=subprocess.PIPE, text=True)
+    simulator.stdout.readline()
+
+    interval = 1.0 / args.rate
+    for i in range(args.updates):
+        shared_state.publish(latest_response=f"{time.monotonic()!r} {i} {FILLER}")
+        time.sleep(interval)
+    # Stalled clients start reading again a second after the last update
+    time.sleep(1.5)
+    shared_state.publish(latest_response="done")
+    stats = json.loads(simulator.stdout.readline())
+    simulator.wait()
+
+    latencies = stats["latencies"]
+    print(f"{args.clients} clients ({args.stalled} stalled), {args.updates} updates at {args.rate:.0f}/s")
+    print(f"fan-out latency   p50 {percentile(latencies, 0.5) * 1e3:6.2f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1e3:6.2f} ms   max {max(latencies) * 1e3:6.2f} ms")
+    print(f"every live client got at least {stats['live_seen']}/{args.updates} updates")
+    print(f"stalled clients got {stats['stalled_seen']} updates, {stats['stalled_resyncs']} resyncs")
+    print(f"resumed client got {stats['resumer_seen']}/{args.updates} updates, "
+          f"{stats['resumer_resyncs']} resyncs")
+
+    server.shutdown()
+    get_bus().unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Page-fetch latency of outfit history, OFFSET vs keyset, on a synthetic table.
+
+Fills a scratch database with synthetic outfits, then times fetching one page
+at increasing depths with OFFSET/LIMIT (get_outfits) and with a keyset
+cursor (query_outfits), unfiltered and filtered by emotion:
+
+    python -m benchmarks.bench_history [--rows 1000000] [--page 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-history-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+
+from sqlalchemy import select, text
+from modules.database import (Outfit, engine, init_db, session_scope, encode_cursor,
+                              get_outfits, query_outfits)
+from modules.emotion_smoothing import EMOTIONS
+
+BANDS = ["cold", "cool", "mild", "warm", "hot"]
+REPEATS = 5
+
+
+def fill(rows):
+    started = datetime(2020, 1, 1)
+    rng = random.Random(7)
+    batch = []
+    with engine.begin() as connection:
+        for i in range(rows):
+            created = started + timedelta(seconds=i * 60)
+            batch.append({
+                "name": f"Outfit {i}", "description": "Denim jacket, white tee, sneakers",
+                "weather": "clouds, 23°C", "emotion": rng.choice(EMOTIONS),
+                "weather_band": rng.choice(BANDS), "created_at": created, "updated_at": created,
+            })
+            if len(batch) == 50000:
+                connection.execute(Outfit.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Outfit.__table__.insert(), batch)
+        connection.execute(text("ANALYZE"))
+
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def cursor_at(db, depth, emotion=None):
+    """Cursor of the row just before the page at the given depth (setup, untimed)"""
+    if depth == 0:
+        return None
+    query = select(Outfit.created_at, Outfit.id)
+    if emotion:
+        query = query.where(Outfit.emotion == emotion)
+    row = db.execute(query.order_by(Outfit.created_at.desc(), Outfit.id.desc())
+                     .offset(depth - 1).limit(1)).one()
+    return encode_cursor(row.created_at, row.id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--page", type=int, default=20)
+    args = parser.parse_args()
+    init_db()
+
+    started = time.perf_counter()
+    fill(args.rows)
+    print(f"filled {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+    depths = [d for d in (0, 1000, 10000, 100000, 500000, args.rows - args.page) if d < args.rows]
+    with session_scope() as db:
+        print(f"{'depth':>8} {'offset ms':>10} {'keyset ms':>10} {'keyset+emotion ms':>18}")
+        for depth in depths:
+            cursor = cursor_at(db, depth)
+            emotion_cursor = cursor_at(db, depth // (len(EMOTIONS) + 1), "happy")
+            offset_ms = timed(lambda: get_outfits(db, limit=args.page, offset=depth))
+            keyset_ms = timed(lambda: query_outfits(db, limit=args.page, cursor=cursor))
+            filtered_ms = timed(lambda: query_outfits(db, limit=args.page, cursor=emotion_cursor, emotion="happy"))
+            print(f"{depth:8d} {offset_ms:10.2f} {keyset_ms:10.2f} {filtered_ms:18.2f}")
+
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM outfits WHERE emotion = 'happy' "
+            "AND (created_at, id) < ('2021-01-01', 1) ORDER BY created_at DESC, id DESC LIMIT 20"
+        )).all()
+        print("plan:", "; ".join(row[-1] for row in plan))
+
+
+if __name__ == "__main__":
+    main()
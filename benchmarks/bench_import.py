@@ -0,0 +1,67 @@
+"""Throughput of the legacy history importer on a synthetic outfit_history.json.
+
+Writes a history file with the legacy {"name", "image", "date"} entries
+(with some exact duplicates mixed in) to a scratch directory, imports it into
+a scratch database, then imports it again to measure the all-duplicates path:
+
+    python -m benchmarks.bench_import [--entries 500000]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+from datetime import date, timedelta
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-import-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+
+from modules.database import init_db
+from modules.importer import import_history
+
+PIECES = ["oversized sweater", "pleated trousers", "white sneakers", "denim jacket", "linen shirt",
+          "ankle boots", "beanie", "leather pants", "sundress", "cargo shorts", "statement necklace"]
+
+
+def write_history(path, entries):
+    rng = random.Random(11)
+    start = date(2020, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(entries):
+            if i and i % 50 == 0:
+                entry = previous  # exact duplicate, as double-saves produced
+            else:
+                entry = {
+                    "name": f"Rock a {rng.choice(PIECES)} with {rng.choice(PIECES)} and {rng.choice(PIECES)} #{i}",
+                    "image": f"outfits/{i:08x}.jpg" if rng.random() < 0.3 else None,
+                    "date": (start + timedelta(days=i // 200)).isoformat(),
+                }
+            previous = entry
+            f.write(("  " if i == 0 else ",\n  ") + json.dumps(entry))
+        f.write("\n]\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=500000)
+    args = parser.parse_args()
+    init_db()
+
+    path = os.path.join(SCRATCH, "outfit_history.json")
+    write_history(path, args.entries)
+    size_mb = os.path.getsize(path) / 1e6
+
+    print(f"history file: {args.entries} entries, {size_mb:.1f} MB")
+    print(f"{'run':<10} {'entries/s':>10} {'inserted':>9} {'dupes':>7} {'seconds':>8}")
+    for label in ("first", "repeat"):
+        stats = import_history(path, images_dir=None)
+        print(f"{label:<10} {stats['read'] / stats['seconds']:10.0f} {stats['inserted']:9d} "
+              f"{stats['duplicates']:7d} {stats['seconds']:8.2f}")
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
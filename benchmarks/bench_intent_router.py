@@ -0,0 +1,39 @@
+"""Intent routing table check and per-utterance matching cost.
+
+The routing table is the one tests/test_intent_router.py checks:
+
+    python -m benchmarks.bench_intent_router
+"""
+import os
+import runpy
+import time
+from modules.voice_assistant import router
+
+# Loaded by path: tests/ is not a package
+_table = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "tests", "test_intent_router.py"))
+CASES = _table["CASES"] + _table["FUZZY_CASES"]
+
+
+def main():
+    failures = 0
+    for text, expected in CASES:
+        found = router.match(text)
+        name = found.intent.name if found else None
+        if name != expected:
+            failures += 1
+            print(f"MISMATCH {text!r}: expected {expected}, got {name}")
+    print(f"{len(CASES) - failures}/{len(CASES)} routing cases passed")
+
+    rounds = 2000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in CASES:
+            router.match(text)
+    elapsed = time.perf_counter() - started
+    print(f"{elapsed / (rounds * len(CASES)) * 1e6:.1f} µs per utterance")
+    fallbacks = sum(1 for text, _ in CASES if router.match(text) is None)
+    print(f"{fallbacks}/{len(CASES)} utterances fall through to the LLM")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Hit rate, latency and API spend of prefetched outfit suggestions.
+
+Replays the same simulated session twice against a stand-in completion
+client with a fixed latency: once ranking and phrasing every suggestion on
+request (the /suggest path without prefetching) and once serving from the
+prefetcher. Every served suggestion is saved, as /suggest does. Emotions
+follow a Markov chain that the prefetcher also learns from seeded history;
+the weather changes now and then. "repeats" counts suggestions naming the
+same items as the previous one for that weather and emotion:
+
+    python -m benchmarks.bench_prefetch [--events 400] [--api-latency 0.5] [--gap 0.2]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-prefetch-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+os.environ.setdefault("STATE_BUS_NAME", f"sakha_bench_{os.getpid()}")
+os.environ.setdefault("STATE_BUS_DIR", SCRATCH)
+os.environ.setdefault("WEATHER_PUSH_INTERVAL", "0")
+os.environ.setdefault("PREFETCH_STATS_INTERVAL", "0")
+# The session is compressed into a minute or two, far faster than the hourly budget assumes
+os.environ.setdefault("PREFETCH_MAX_PER_HOUR", "100000")
+
+from modules import llm, shared_state
+from modules.database import init_db, session_scope, save_outfit
+from modules.outfit_memory import save_history
+from modules.response_cache import ResponseCache
+from modules.state_bus import get_bus
+from modules.suggestions import SuggestionPrefetcher, suggestion_key
+from modules.wardrobe import suggest, parse_items
+
+CITY = "Bangalore"
+WEATHERS = ["clear, 29°C", "clouds, 24°C", "rain, 21°C", "clear, 33°C", "mist, 17°C"]
+# Who tends to follow whom; the prefetcher has to learn this
+TRANSITIONS = {
+    "neutral": {"happy": 5, "sad": 2, "surprise": 2, "angry": 1},
+    "happy": {"neutral": 5, "surprise": 3, "sad": 1},
+    "sad": {"neutral": 5, "angry": 2, "happy": 1, "fear": 1},
+    "surprise": {"happy": 4, "neutral": 4, "fear": 1},
+    "angry": {"neutral": 4, "sad": 3, "disgust": 1},
+    "fear": {"neutral": 4, "sad": 2, "surprise": 2},
+    "disgust": {"neutral": 4, "angry": 2},
+}
+
+
+class StandInCompletion:
+    """Same create() interface as openai.ChatCompletion, with a fixed latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        # Reword the decided outfit, keeping the item names as the prompt asks
+        outfit = messages[-1]["content"].split("outfit for today: ", 1)[1]
+        outfit = outfit[:outfit.index(".") + 1]
+        return {"choices": [{"message": {"content": f"Suggestion #{self.calls}: {outfit}"}}]}
+
+
+def next_emotion(rng, emotion):
+    choices = TRANSITIONS[emotion]
+    return rng.choices(list(choices), weights=list(choices.values()))[0]
+
+
+def session(events, seed):
+    """[(kind, value)] with kind in emotion/weather/request"""
+    rng = random.Random(seed)
+    emotion, weather = "neutral", WEATHERS[0]
+    steps = [("weather", weather), ("emotion", emotion)]
+    for _ in range(events):
+        roll = rng.random()
+        if roll < 0.3:
+            emotion = next_emotion(rng, emotion)
+            steps.append(("emotion", emotion))
+        elif roll < 0.35:
+            # Most refreshes only nudge the temperature; some change the conditions
+            if rng.random() < 0.8:
+                condition, temperature = weather.split(", ")
+                weather = f"{condition}, {int(temperature[:-2]) + rng.choice((-1, 1))}°C"
+            else:
+                weather = rng.choice(WEATHERS)
+            steps.append(("weather", weather))
+        else:
+            steps.append(("request", None))
+    return steps
+
+
+def seed_history(count):
+    rng = random.Random(1)
+    emotion = "neutral"
+    with session_scope() as db:
+        for i in range(count):
+            emotion = next_emotion(rng, emotion)
+            save_outfit(db, name=f"Outfit {i}", description=f"Seeded outfit {i}", image_path=None,
+                        weather=rng.choice(WEATHERS), emotion=emotion)
+
+
+def replay(steps, gap, prefetcher=None):
+    """Latencies of the request steps, how many were served from the prefetcher, and repeats"""
+    latencies, hits, repeats = [], 0, 0
+    weather = None
+    previous = {}
+    for kind, value in steps:
+        if kind == "emotion":
+            shared_state.publish(current_emotion=value)
+        elif kind == "weather":
+            weather = value
+            shared_state.publish(weather={"city": CITY, "weather": weather, "updated_at": time.time()})
+        else:
+            emotion = shared_state.current_emotion
+            started = time.perf_counter()
+            outfit = prefetcher.take(CITY, weather, emotion) if prefetcher else None
+            hits += outfit is not None
+            if outfit is None:
+                outfit = suggest(CITY, weather, emotion)
+            save_history(outfit, weather=weather, emotion=emotion)
+            latencies.append(time.perf_counter() - started)
+            key, items = suggestion_key(CITY, weather, emotion), {item.name for item in parse_items(outfit)}
+            repeats += previous.get(key) == items
+            previous[key] = items
+        time.sleep(gap)
+    return latencies, hits, repeats
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--api-latency", type=float, default=0.5, help="seconds per completion")
+    parser.add_argument("--gap", type=float, default=0.2, help="seconds between session events")
+    parser.add_argument("--history", type=int, default=300, help="seeded outfits with emotions")
+    args = parser.parse_args()
+    init_db()
+    seed_history(args.history)
+    steps = session(args.events, seed=7)
+
+    print(f"{sum(kind == 'request' for kind, _ in steps)} requests, "
+          f"{sum(kind == 'emotion' for kind, _ in steps)} emotion changes, "
+          f"{sum(kind == 'weather' for kind, _ in steps)} weather updates; API latency {args.api_latency * 1e3:.0f} ms")
+    print(f"{'mode':<10} {'hit rate':>8} {'waited':>7} {'p50 ms':>8} {'p95 ms':>8} {'API calls':>10} {'saved':>6} "
+          f"{'repeats':>8}")
+    baseline_calls = None
+    for mode in ("on demand", "prefetch"):
+        client = llm.completion_client = StandInCompletion(args.api_latency)
+        llm.response_cache = ResponseCache(path=os.path.join(SCRATCH, f"{mode.replace(' ', '_')}.db"))
+        shared_state.publish(suggestions={}, weather=None, current_emotion="neutral")
+
+        prefetcher = None
+        if mode == "prefetch":
+            prefetcher = SuggestionPrefetcher()
+            prefetcher.start()
+        latencies, hits, repeats = replay(steps, args.gap, prefetcher)
+        if prefetcher:
+            prefetcher.stop()
+            stats = prefetcher.stats()
+            extra = f"  (generated {stats['generated']}, expired unused {stats['expired']})"
+        else:
+            extra = ""
+        if baseline_calls is None:
+            baseline_calls = client.calls
+        # Requests that sat through an API round trip rather than being served from a cache
+        waited = sum(latency > args.api_latency / 2 for latency in latencies) / len(latencies)
+        print(f"{mode:<10} {hits / len(latencies):8.0%} {waited:7.0%} {percentile(latencies, 0.5) * 1e3:8.1f} "
+              f"{percentile(latencies, 0.95) * 1e3:8.1f} {client.calls:10d} {baseline_calls - client.calls:6d} "
+              f"{repeats:8d}{extra}")
+
+    get_bus().unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Latency of is_recently_used() (exact and near-duplicate) on a large history.
+
+Fills a scratch database with synthetic outfits spread over the past weeks,
+then times lookups for new outfits, exact repeats and paraphrases:
+
+    python -m benchmarks.bench_recently_used [--rows 100000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-recent-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+
+from sqlalchemy import text
+from modules.database import Outfit, engine, init_db
+from modules.outfit_memory import is_recently_used
+from modules.text_similarity import text_hash
+
+COLOURS = ["navy", "white", "black", "olive", "rust", "cream", "grey", "mustard", "teal", "burgundy"]
+TOPS = ["denim jacket", "linen shirt", "hoodie", "turtleneck", "blazer", "cardigan", "polo", "tee"]
+BOTTOMS = ["chinos", "jeans", "joggers", "shorts", "pleated skirt", "cargo pants", "trousers"]
+SHOES = ["sneakers", "loafers", "boots", "sandals", "brogues", "espadrilles"]
+
+
+def describe(rng):
+    return (f"Wear a {rng.choice(COLOURS)} {rng.choice(TOPS)} with {rng.choice(COLOURS)} "
+            f"{rng.choice(BOTTOMS)} and {rng.choice(COLOURS)} {rng.choice(SHOES)}.")
+
+
+def paraphrase(description):
+    words = description.rstrip(".").split()
+    return f"Try {' '.join(words[1:5])}, paired with {' '.join(words[6:])}!"
+
+
+def fill(rows, rng):
+    now = datetime.utcnow()
+    batch, recent = [], []
+    with engine.begin() as connection:
+        for i in range(rows):
+            description = describe(rng)
+            created = now - timedelta(minutes=(rows - i) * 5)
+            batch.append({"name": f"Outfit {i}", "description": description, "name_hash": text_hash(description),
+                          "created_at": created, "updated_at": created})
+            if created > now - timedelta(days=7):
+                recent.append(description)
+            if len(batch) == 50000:
+                connection.execute(Outfit.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Outfit.__table__.insert(), batch)
+        connection.execute(text("ANALYZE"))
+    return recent
+
+
+def timed(label, names, **kwargs):
+    latencies, hits = [], 0
+    for name in names:
+        started = time.perf_counter()
+        hits += is_recently_used(name, **kwargs)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"{label:<26} {latencies[len(latencies) // 2] * 1e6:9.0f} "
+          f"{latencies[int(len(latencies) * 0.99)] * 1e6:9.0f} {hits / len(names):8.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    init_db()
+
+    rng = random.Random(3)
+    recent = fill(args.rows, rng)
+    repeats = [rng.choice(recent) for _ in range(args.lookups)]
+    fresh = [f"{describe(rng)} Finish with a {rng.choice(COLOURS)} beanie." for _ in range(args.lookups)]
+    latest = recent[-10:]
+    paraphrases = [paraphrase(rng.choice(latest)) for _ in range(args.lookups)]
+
+    print(f"{args.rows} rows, {len(recent)} in the repeat window")
+    print(f"{'lookup':<26} {'p50 us':>9} {'p99 us':>9} {'flagged':>8}")
+    timed("exact repeat", repeats, near_duplicates=False)
+    timed("new outfit (exact only)", fresh, near_duplicates=False)
+    timed("new outfit (near-dup)", fresh)
+    timed("paraphrase (near-dup)", paraphrases)
+
+
+if __name__ == "__main__":
+    main()
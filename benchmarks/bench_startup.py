@@ -0,0 +1,91 @@
+"""Cold-start import time and memory of the web app and the mirror's voice/vision stack.
+
+Each target is imported in a fresh interpreter run with -X importtime, in a
+scratch directory with its own database. The script reports wall time, import
+time, peak RSS, which heavy subsystems got loaded, and the slowest direct
+imports:
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main.py starts the camera and microphone loop, so for it only its imports are timed
+TARGETS = {
+    "app.py": "import app",
+    "main.py": "import modules.emotion_model, modules.database, modules.emotion_detector, modules.voice_assistant",
+}
+HEAVY = ["cv2", "openai", "speech_recognition", "pyttsx3", "numpy", "sqlalchemy", "deepface"]
+
+PROBE = """
+import resource, sys
+{imports}
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def parse_importtime(stderr):
+    """(total import microseconds, [(cumulative, name)] of top-level imports)"""
+    total, top = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line.split(":", 1)[1].split("|")
+        total += int(self_us)
+        # Nesting is shown as two extra spaces per level after the separator
+        if not name[1:].startswith(" "):
+            top.append((int(cumulative), name.strip()))
+    return total, top
+
+
+def run(imports, scratch):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT,
+               DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'outfits.db')}",
+               RESPONSE_CACHE_PATH=os.path.join(scratch, "response_cache.db"),
+               # Only imports are timed; don't start the prefetcher's threads and lookups
+               PREFETCH_SUGGESTIONS="0")
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE.format(imports=imports, heavy=HEAVY)],
+                               cwd=scratch, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    rss_kb, loaded = completed.stdout.strip().splitlines()[-2:]
+    total, top = parse_importtime(completed.stderr)
+    return wall, total / 1e6, int(rss_kb) / 1024, loaded, top
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'target':<8} {'wall s':>7} {'import s':>9} {'RSS MB':>7}  loaded")
+    slowest = {}
+    for target, imports in TARGETS.items():
+        results = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as scratch:
+                results.append(run(imports, scratch))
+        wall = statistics.median(r[0] for r in results)
+        total = statistics.median(r[1] for r in results)
+        rss = statistics.median(r[2] for r in results)
+        print(f"{target:<8} {wall:7.2f} {total:9.2f} {rss:7.0f}  {results[-1][3] or '-'}")
+        slowest[target] = sorted(results[-1][4], reverse=True)[:6]
+
+    for target, top in slowest.items():
+        print(f"\nslowest top-level imports for {target}:")
+        for cumulative, name in top:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Latency of the shared state bus between processes.
+
+Starts subscriber processes that record how long each update took to reach
+them, then publishes emotion updates from this process at a fixed rate. Also
+times publish() and lock-free reads on their own:
+
+    python -m benchmarks.bench_state_bus [--subscribers 4] [--updates 2000] [--rate 500]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-state-")
+os.environ.setdefault("STATE_BUS_NAME", f"sakha_bench_{os.getpid()}")
+os.environ.setdefault("STATE_BUS_DIR", SCRATCH)
+
+from modules import shared_state
+from modules.state_bus import get_bus
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def subscriber():
+    """Child process: print one latency per update seen, until latest_response == "done" """
+    latencies = []
+    done = threading.Event()
+
+    def on_update(state):
+        latencies.append(time.monotonic() - state["emotion_updated_at"])
+        if state["latest_response"] == "done":
+            done.set()
+
+    shared_state.subscribe(on_update)
+    # The listener binds its socket on its own thread; give it a moment
+    time.sleep(0.2)
+    print("ready", flush=True)
+    done.wait()
+    print(json.dumps(latencies), flush=True)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def timed(label, func, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    print(f"{label:<24} {(time.perf_counter() - started) / runs * 1e6:8.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500, help="updates per second")
+    parser.add_argument("--subscriber", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.subscriber:
+        return subscriber()
+
+    bus = get_bus()
+    shared_state.publish(latest_response="", emotion_updated_at=time.monotonic())
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    children = [subprocess.Popen([sys.executable, "-m", "benchmarks.bench_state_bus", "--subscriber"],
+                                 cwd=SCRATCH, env=env, stdout=subprocess.PIPE, text=True)
+                for _ in range(args.subscribers)]
+    for child in children:
+        child.stdout.readline()
+
+    emotions = ["happy", "sad", "neutral", "surprise"]
+    interval = 1.0 / args.rate
+    for i in range(args.updates):
+        shared_state.publish(current_emotion=emotions[i % len(emotions)],
+                             emotion_scores={emotion: 25.0 for emotion in emotions},
+                             emotion_updated_at=time.monotonic())
+        time.sleep(interval)
+    shared_state.publish(latest_response="done", emotion_updated_at=time.monotonic())
+
+    latencies = []
+    for child in children:
+        latencies += json.loads(child.stdout.readline())
+        child.wait()
+
+    print(f"{args.subscribers} subscribers, {args.updates} updates at {args.rate:.0f}/s")
+    print(f"delivered {len(latencies) / args.subscribers / (args.updates + 1):.0%} of updates "
+          f"(the rest were coalesced into a newer one)")
+    print(f"publish -> subscriber   p50 {percentile(latencies, 0.5) * 1e6:6.0f} us   "
+          f"p99 {percentile(latencies, 0.99) * 1e6:6.0f} us   max {max(latencies) * 1e6:6.0f} us")
+
+    timed("publish()", lambda: shared_state.publish(current_emotion="happy"), 5000)
+    timed("read, unchanged", lambda: shared_state.current_emotion, 100000)
+
+    def fresh_read():
+        bus._cached = (None, {})
+        return shared_state.current_emotion
+    timed("read, after a write", fresh_read, 100000)
+
+    bus.unlink()
+
+
+if __name__ == "__main__":
+    main()
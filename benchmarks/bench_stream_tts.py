@@ -0,0 +1,94 @@
+"""Time-to-first-audio: blocking chat_with_gpt + speak vs. streamed sentences.
+
+Runs against a local fake OpenAI streaming server and a fake TTS engine, so
+no network, API key or audio device is needed:
+
+    python -m benchmarks.bench_stream_tts
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import openai
+from modules import voice_assistant
+from modules.tts_worker import TTSWorker
+
+TOKEN_DELAY = 0.03
+WORD_SPEAK_TIME = 0.05
+REPLY = (
+    "Oh look, the fashion emergency has arrived. Grab the denim jacket and the white sneakers. "
+    "Throw on that scarf you keep hiding in the drawer. Trust me, it's a whole vibe. "
+    "Now go, before the clouds change their mind."
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        tokens = [word + " " for word in REPLY.split(" ")]
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in tokens:
+                chunk = {"object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(TOKEN_DELAY)
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        time.sleep(TOKEN_DELAY * len(tokens))
+        payload = json.dumps({"object": "chat.completion",
+                              "choices": [{"index": 0, "message": {"role": "assistant", "content": REPLY}}]})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode())
+
+
+class FakeEngine:
+    """pyttsx3 stand-in that 'speaks' for a time proportional to the text"""
+
+    def __init__(self):
+        self._text = ""
+
+    def say(self, text):
+        self._text = text
+
+    def runAndWait(self):
+        time.sleep(WORD_SPEAK_TIME * len(self._text.split()))
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    openai.api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    openai.api_key = "test"
+    voice_assistant.tts = TTSWorker(engine_factory=FakeEngine)
+
+    # Blocking: wait for the full completion, then speak the whole reply
+    first_audio = []
+    started = time.perf_counter()
+    reply = voice_assistant.chat_with_gpt("what should I wear?")
+    voice_assistant.tts.say(reply, on_start=lambda text, at: first_audio.append(at))
+    voice_assistant.tts.wait()
+    blocking = first_audio[0] - started
+
+    # Streaming: speak each sentence as soon as it is complete
+    voice_assistant.speak_streaming("what should I wear?")
+    voice_assistant.tts.wait()
+    streaming = voice_assistant.last_time_to_first_audio
+
+    print(f"time to first audio, blocking:  {blocking * 1000:7.1f} ms")
+    print(f"time to first audio, streaming: {streaming * 1000:7.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Frames per second of subtitle drawing on synthetic frames with long replies.
+
+Compares the old per-frame cv2.putText of the whole reply (no wrapping),
+wrapping and drawing every frame, and SubtitleOverlay's cached layer. The
+reply grows sentence by sentence like a streamed GPT answer:
+
+    python -m benchmarks.bench_subtitles [--frames 600] [--width 1280] [--height 720]
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from modules.subtitle_overlay import SubtitleOverlay, FONT
+
+REPLY = ("Oh, fear not, my stylishly scared friend! For this cloudy weather in Bengaluru, how about "
+         "rocking a chic oversized sweater paired with some trendy pleated trousers? Add some cool "
+         "sneakers and a statement necklace to ward off any fashion fears you may have. Trust me, "
+         "you'll look so fabulous that even the clouds will be jealous of your style!")
+# A new sentence arrives about every two seconds of video
+FRAMES_PER_SENTENCE = 60
+
+
+def replies(frames):
+    sentences = [s.strip() + "!" for s in REPLY.replace("?", "!").split("!") if s.strip()]
+    for i in range(frames):
+        yield " ".join(sentences[:min(len(sentences), i // FRAMES_PER_SENTENCE + 1)])
+
+
+def put_text(frame, text):
+    cv2.putText(frame, text, (20, frame.shape[0] - 20), FONT, 0.7, (255, 255, 255), 2)
+
+
+def wrap_every_frame(frame, text):
+    overlay = SubtitleOverlay()
+    overlay.draw(frame, text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    frame = np.empty_like(source)
+    overlay = SubtitleOverlay()
+
+    print(f"{args.width}x{args.height}, {args.frames} frames")
+    print(f"{'renderer':<22} {'fps':>9} {'ms/frame':>9}")
+    for name, draw in (("putText (no wrap)", put_text),
+                       ("wrap every frame", wrap_every_frame),
+                       ("SubtitleOverlay", overlay.draw)):
+        started = time.perf_counter()
+        for text in replies(args.frames):
+            np.copyto(frame, source)
+            draw(frame, text)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<22} {args.frames / elapsed:9.0f} {elapsed / args.frames * 1000:9.3f}")
+    print(f"overlay re-renders: {overlay.renders}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Speed and behaviour of the local wardrobe ranker.
+
+Seeds a history of outfit descriptions, then times learning items from it
+and ranking combinations for each weather x emotion pair. It also
+checks that wearing the top pick rotates the next one, and that a failing
+completion client still yields a real suggestion:
+
+    python -m benchmarks.bench_wardrobe [--history 2000] [--runs 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix="sakha-wardrobe-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+os.environ.setdefault("STATE_BUS_NAME", f"sakha_bench_{os.getpid()}")
+os.environ.setdefault("STATE_BUS_DIR", SCRATCH)
+os.environ.setdefault("WEATHER_PUSH_INTERVAL", "0")
+
+from modules import llm
+from modules.database import init_db, session_scope, save_outfit
+from modules.outfit_memory import save_history
+from modules.response_cache import ResponseCache
+from modules.state_bus import get_bus
+from modules.wardrobe import Wardrobe, GARMENTS, COLORS, MATERIALS, MOODS, parse_items
+import modules.wardrobe as wardrobe_module
+
+WEATHERS = ["clear, 34°C", "clear, 29°C", "clouds, 22°C", "rain, 19°C", "mist, 15°C", "snow, -3°C"]
+
+
+class FailingCompletion:
+    """Same create() interface as openai.ChatCompletion, always failing"""
+
+    def create(self, **kwargs):
+        raise ConnectionError("API unreachable")
+
+
+def seed_history(count):
+    """Descriptions like the phrased suggestions, each naming two to five items"""
+    rng = random.Random(3)
+    kinds, colors, materials = list(GARMENTS), list(COLORS), list(MATERIALS)
+    with session_scope() as db:
+        for i in range(count):
+            items = []
+            for kind in rng.sample(kinds, rng.randint(2, 5)):
+                words = [rng.choice(colors)] + ([rng.choice(materials)] if rng.random() < 0.3 else [])
+                items.append(" ".join(words + [kind]))
+            save_outfit(db, name=f"Outfit {i}", description="Try your " + ", ".join(items) + ".",
+                        image_path=None, weather=rng.choice(WEATHERS), emotion=rng.choice(list(MOODS)))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=2000, help="seeded outfit descriptions")
+    parser.add_argument("--runs", type=int, default=50, help="rankings per weather x emotion pair")
+    args = parser.parse_args()
+    init_db()
+    seed_history(args.history)
+
+    wardrobe = Wardrobe()
+    started = time.perf_counter()
+    wardrobe.refresh()
+    learned = time.perf_counter() - started
+    slots = {}
+    for item in wardrobe.items.values():
+        slots[item.slot] = slots.get(item.slot, 0) + 1
+    bodies = slots["top"] * slots["bottom"] + slots.get("onepiece", 0)
+    combos = bodies * slots["footwear"] * (slots["outer"] + 1) * (slots["accessory"] + 1)
+    print(f"learned {len(wardrobe.items)} items from {args.history} outfits in {learned * 1e3:.0f} ms: "
+          + ", ".join(f"{count} {slot}" for slot, count in sorted(slots.items())))
+    print(f"{combos:,} possible combinations, searched through per-slot shortlists")
+
+    latencies = []
+    for weather in WEATHERS:
+        for emotion in MOODS:
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                wardrobe.rank(weather, emotion)
+                latencies.append(time.perf_counter() - started)
+    print(f"rank  p50 {percentile(latencies, 0.5) * 1e3:7.2f} ms   p99 {percentile(latencies, 0.99) * 1e3:7.2f} ms   "
+          f"({len(latencies)} rankings)")
+
+    # Wear the top pick a few times in a row through the real save path: it should rotate
+    wardrobe_module.wardrobe = Wardrobe()
+    picks = []
+    for _ in range(4):
+        combo, plain = wardrobe_module.pick("rain, 19°C", "neutral")
+        picks.append(plain)
+        save_history(plain, weather="rain, 19°C", emotion="neutral")
+    print(f"consecutive picks for rain/neutral: {len(set(picks))} distinct of {len(picks)}")
+    for plain in picks:
+        print(f"  {plain}")
+
+    llm.completion_client = FailingCompletion()
+    llm.response_cache = ResponseCache(path=os.path.join(SCRATCH, "response_cache.db"))
+    outfit = wardrobe_module.suggest("Bangalore", "clouds, 22°C", "sad", phrase=True)
+    print(f"with the API down: {outfit!r} ({len(parse_items(outfit))} items)")
+    print(f"chat fallback for comparison: {llm.chat_with_gpt('what should I wear?')!r}")
+
+    get_bus().unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Load test for /suggest in sync and async serving modes against local stubs.
+
+Stub servers stand in for ipinfo, OpenWeather and OpenAI (with a fixed LLM
+delay). Each mode runs in a child process in a scratch directory so logs and
+the database stay out of the repository:
+
+    python -m benchmarks.load_suggest [--requests 200] [--concurrency 32]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LLM_DELAY = 0.5
+WEATHER_DELAY = 0.1
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/ipinfo"):
+            self._send({"city": "Bengaluru"})
+        else:
+            time.sleep(WEATHER_DELAY)
+            self._send({"cod": 200, "weather": [{"main": "Clouds"}], "main": {"temp": 23.0}})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(LLM_DELAY)
+        self._send({"object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant",
+                                                         "content": "Denim jacket, white tee, sneakers."}}]})
+
+
+def start_stubs():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def run_load(url, total, concurrency):
+    errors = []
+
+    def fetch(_):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            errors.append(e.code)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(fetch, range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        "errors": len(errors),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1),
+    }
+
+
+def child(total, concurrency):
+    from werkzeug.serving import make_server
+    import openai
+    from app import app
+
+    openai.api_base = os.environ["STUB_URL"] + "/v1"
+    openai.api_key = "test"
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/suggest"
+    run_load(url, 4, 2)  # warm the city/weather cache
+    print(json.dumps(run_load(url, total, concurrency)))
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--child", action="store_true")
+    args = parser.parse_args()
+    if args.child:
+        child(args.requests, args.concurrency)
+        return
+
+    stub_url = start_stubs()
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ,
+                       ASYNC_SUGGEST="1" if mode == "async" else "0",
+                       STUB_URL=stub_url,
+                       IPINFO_URL=stub_url + "/ipinfo",
+                       OPENWEATHER_URL=stub_url + "/weather",
+                       OPENWEATHER_API_KEY="test",
+                       DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'outfits.db')}",
+                       RESPONSE_CACHE_PATH=os.path.join(scratch, "response_cache.db"),
+                       RESPONSE_CACHE_VARIANTS="1000000",
+                       PYTHONPATH=REPO_ROOT)
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.load_suggest", "--child",
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                cwd=scratch, env=env, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                print(f"{mode}: load run failed\n{completed.stderr[-2000:]}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{mode:<6} {result['throughput_rps']:8.1f} {result['p50_ms']:9.1f} "
+                  f"{result['p99_ms']:9.1f} {result['errors']:7d}")
+
+
+if __name__ == "__main__":
+    main()
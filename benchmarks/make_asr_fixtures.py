@@ -0,0 +1,64 @@
+"""Generate WAV/TXT fixture pairs for bench_asr with the mirror's own TTS engine.
+
+Each phrase is spoken to a file by pyttsx3, then rewritten as a 16 kHz,
+16-bit mono WAV next to a .txt file holding the phrase:
+
+    python -m benchmarks.make_asr_fixtures [fixtures_dir]
+
+Synthetic speech is cleaner than a real microphone, so treat the WER as
+a lower bound and add recordings of your own to the same directory.
+"""
+import os
+import sys
+import tempfile
+import speech_recognition as sr
+from modules.tts_worker import create_engine
+from benchmarks.bench_asr import DEFAULT_FIXTURES
+
+SAMPLE_RATE = 16000
+
+# Things people say to the mirror, covering the voice assistant's intents
+PHRASES = [
+    "what should I wear today",
+    "suggest an outfit for the rain",
+    "is it raining outside",
+    "what is the temperature in Bangalore",
+    "save this outfit",
+    "what did I wear yesterday",
+    "show me my last outfit",
+    "stop talking",
+    "resume",
+    "I am feeling a bit sad today",
+    "tell me something funny",
+    "good night",
+]
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURES
+    os.makedirs(directory, exist_ok=True)
+    engine = create_engine()
+    scratch = tempfile.mkdtemp(prefix="sakha-asr-")
+
+    # Some drivers write AIFF whatever the extension, so speak to a scratch
+    # file and normalize it. One phrase per runAndWait(): the eSpeak driver
+    # only remembers the last file queued.
+    for number, phrase in enumerate(PHRASES, 1):
+        name = f"{number:02d}_{'_'.join(phrase.lower().split()[:4])}"
+        raw_path = os.path.join(scratch, name + ".wav")
+        engine.save_to_file(phrase, raw_path)
+        engine.runAndWait()
+
+        with sr.AudioFile(raw_path) as source:
+            audio = sr.Recognizer().record(source)
+        with open(os.path.join(directory, name + ".wav"), "wb") as f:
+            f.write(audio.get_wav_data(convert_rate=SAMPLE_RATE, convert_width=2))
+        with open(os.path.join(directory, name + ".txt"), "w") as f:
+            f.write(phrase + "\n")
+        os.remove(raw_path)
+    os.rmdir(scratch)
+    print(f"Wrote {len(PHRASES)} fixtures to {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
-from modules.emotion_detector import detect_initial_emotion, show_webcam_with_subtitles
-from modules.voice_assistant import run_friend_chat, speak
+from modules.emotion_model import warm_up_async, startup_timings
+
+# ✅ Build and warm the emotion model while the camera and TTS engine start
+warm_up_async()
+
+from modules.database import init_db
+from modules.suggestions import prefetcher, PREFETCH_SUGGESTIONS
+from modules.emotion_detector import detect_initial_emotion, detect_emotion_from_frame
+from modules.voice_assistant import run_friend_chat, speak, tts
 from modules import shared_state
 import threading
 
+# ✅ Create or migrate the outfit database
+init_db()
+
 # ✅ Detect emotion once using webcam
 initial_emotion = detect_initial_emotion()
-shared_state.current_emotion = initial_emotion
+shared_state.publish(current_emotion=initial_emotion)
+print("⏱️ Startup timings:", startup_timings())
+
+# ✅ Keep outfit suggestions ready for the current weather and mood
+if PREFETCH_SUGGESTIONS:
+    prefetcher.start()
 
 # ✅ Speak based on emotion
 speak(f"You look {initial_emotion} today! Want to talk or need a suggestion?")
 
-# ✅ Start webcam with subtitles in a separate thread (non-blocking)
-threading.Thread(target=show_webcam_with_subtitles, daemon=True).start()
+# ✅ Keep detecting emotion (idling the camera when nobody's there) and show the webcam with subtitles
+threading.Thread(target=detect_emotion_from_frame, args=(initial_emotion,), daemon=True).start()
 
 # ✅ Start voice chat loop
 paused = False
@@ -26,3 +41,7 @@ while True:
         continue
     if not should_continue:
         break
+
+# ✅ Let the goodbye finish before exiting
+tts.wait()
+print("📊 TTS stats:", tts.stats())
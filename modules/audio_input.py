@@ -0,0 +1,244 @@
+import os
+import queue
+import threading
+import time
+import wave
+import logging
+from collections import deque, namedtuple
+import numpy as np
+import speech_recognition as sr
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Audio input configuration. AUDIO_SOURCE is "mic" or the path of a WAV file.
+AUDIO_SOURCE = os.getenv("AUDIO_SOURCE", "mic")
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+
+# Voice activity detection
+CALIBRATION_SECONDS = float(os.getenv("VAD_CALIBRATION_SECONDS", "1.0"))
+VAD_ENERGY_RATIO = float(os.getenv("VAD_ENERGY_RATIO", "2.5"))
+VAD_MIN_ENERGY = float(os.getenv("VAD_MIN_ENERGY", "150"))
+VAD_NOISE_ADAPT = float(os.getenv("VAD_NOISE_ADAPT", "0.05"))
+VAD_START_SECONDS = 0.1
+VAD_END_SILENCE_SECONDS = float(os.getenv("VAD_END_SILENCE_SECONDS", "0.8"))
+VAD_PRE_ROLL_SECONDS = 0.3
+PHRASE_TIME_LIMIT = 6.0
+
+# An utterance cut out by the VAD; transcript is set when a streaming
+# recognizer already decoded it
+Utterance = namedtuple("Utterance", "audio transcript")
+
+
+class MicrophoneSource:
+    """16-bit mono chunks from the default microphone"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE):
+        self._microphone = sr.Microphone(sample_rate=sample_rate, chunk_size=chunk_size)
+        self._stream = self._microphone.__enter__().stream
+        self.sample_rate = self._microphone.SAMPLE_RATE
+        self.sample_width = self._microphone.SAMPLE_WIDTH
+        self.chunk_size = chunk_size
+
+    def read(self):
+        return self._stream.read(self.chunk_size)
+
+    def close(self):
+        self._microphone.__exit__(None, None, None)
+
+
+class WavFileSource:
+    """Replays a recorded 16-bit WAV file as if it were the microphone"""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, realtime=True):
+        self._wav = wave.open(path, "rb")
+        if self._wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        self.channels = self._wav.getnchannels()
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = 2
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+
+    def read(self):
+        data = self._wav.readframes(self.chunk_size)
+        if self.channels > 1 and data:
+            samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+            data = samples.mean(axis=1).astype(np.int16).tobytes()
+        if self.realtime and data:
+            time.sleep(self.chunk_size / float(self.sample_rate))
+        return data
+
+    def close(self):
+        self._wav.close()
+
+
+def open_source(source=AUDIO_SOURCE):
+    """Open the microphone or a WAV file source"""
+    if source == "mic":
+        return MicrophoneSource()
+    return WavFileSource(source)
+
+
+def rms(chunk):
+    """Root-mean-square energy of a chunk of 16-bit samples"""
+    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class AudioStream:
+    """Keeps one audio input open and cuts speech into utterances on a background thread.
+
+    The noise floor is calibrated once at startup and then tracked with an
+    exponential moving average over non-speech chunks. Finished utterances
+    are queued as Utterance tuples; utterances that overlap a time when
+    suppress() is true (e.g. the mirror is talking) are discarded.
+
+    With a streaming recognizer, chunks are decoded while the user is still
+    talking and on_partial(text) sees each new partial hypothesis. If it
+    returns True the utterance is kept even while suppressed (barge-in).
+    """
+
+    def __init__(self, source=None, suppress=None, recognizer=None, on_partial=None, max_queued=5):
+        self.source = source or open_source()
+        self.suppress = suppress
+        self.recognizer = recognizer if recognizer is not None and recognizer.supports_streaming else None
+        self.on_partial = on_partial
+        self.noise_floor = None
+        self._utterances = queue.Queue(maxsize=max_queued)
+        self._in_utterance = threading.Event()
+        self._finished = threading.Event()
+        self._running = False
+        self._thread = None
+
+        seconds_per_chunk = self.source.chunk_size / float(self.source.sample_rate)
+        self._chunks = lambda seconds: max(1, int(round(seconds / seconds_per_chunk)))
+
+    def start(self):
+        """Start the capture thread"""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="audio-input", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop capturing and close the source"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.source.close()
+
+    def _calibrate(self):
+        energies = []
+        for _ in range(self._chunks(CALIBRATION_SECONDS)):
+            chunk = self.source.read()
+            if not chunk:
+                break
+            energies.append(rms(chunk))
+        self.noise_floor = float(np.mean(energies)) if energies else 0.0
+        logger.info(f"Calibrated noise floor: {self.noise_floor:.1f}")
+
+    def _is_speech(self, energy):
+        return energy > max(VAD_MIN_ENERGY, self.noise_floor * VAD_ENERGY_RATIO)
+
+    def _suppressed(self):
+        return self.suppress is not None and self.suppress()
+
+    def _emit(self, frames, session=None):
+        audio = sr.AudioData(b"".join(frames), self.source.sample_rate, self.source.sample_width)
+        audio = Utterance(audio, session.result() if session is not None else None)
+        try:
+            self._utterances.put_nowait(audio)
+        except queue.Full:
+            # Keep the newest speech; drop the oldest unread utterance
+            self._utterances.get_nowait()
+            self._utterances.put_nowait(audio)
+
+    def _run(self):
+        self._calibrate()
+        pre_roll = deque(maxlen=self._chunks(VAD_PRE_ROLL_SECONDS))
+        start_chunks = self._chunks(VAD_START_SECONDS)
+        end_chunks = self._chunks(VAD_END_SILENCE_SECONDS)
+        max_chunks = self._chunks(PHRASE_TIME_LIMIT)
+        frames = []
+        voiced = 0
+        silent = 0
+        suppressed = False
+        keep = False
+        session = None
+        partial = ""
+
+        while self._running:
+            chunk = self.source.read()
+            if not chunk:
+                break
+            energy = rms(chunk)
+            speech = self._is_speech(energy)
+
+            if not self._in_utterance.is_set():
+                pre_roll.append(chunk)
+                voiced = voiced + 1 if speech else 0
+                if not speech:
+                    self.noise_floor += VAD_NOISE_ADAPT * (energy - self.noise_floor)
+                if voiced >= start_chunks:
+                    frames = list(pre_roll)
+                    pre_roll.clear()
+                    silent = 0
+                    suppressed = self._suppressed()
+                    keep = False
+                    partial = ""
+                    if self.recognizer is not None:
+                        session = self.recognizer.start_stream(self.source.sample_rate)
+                        for frame in frames:
+                            session.feed(frame)
+                    self._in_utterance.set()
+                continue
+
+            frames.append(chunk)
+            silent = 0 if speech else silent + 1
+            suppressed = suppressed or self._suppressed()
+            if session is not None:
+                text = session.feed(chunk)
+                if text and text != partial:
+                    partial = text
+                    if self.on_partial is not None and self.on_partial(text):
+                        keep = True
+            if silent >= end_chunks or len(frames) >= max_chunks:
+                if keep or not suppressed:
+                    self._emit(frames, session)
+                session = None
+                self._in_utterance.clear()
+                voiced = 0
+                frames = []
+
+        if self._in_utterance.is_set() and frames and (keep or not suppressed):
+            self._emit(frames, session)
+            self._in_utterance.clear()
+        self._running = False
+        self._finished.set()
+
+    def clear(self):
+        """Discard utterances that haven't been read yet"""
+        while not self._utterances.empty():
+            self._utterances.get_nowait()
+
+    def next_utterance(self, timeout=5):
+        """Wait up to timeout for speech to start and return the Utterance, or None.
+
+        If the speaker is mid-utterance when the timeout hits, wait for them
+        to finish.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._utterances.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            if self._finished.is_set() or (time.monotonic() >= deadline and not self._in_utterance.is_set()):
+                try:
+                    return self._utterances.get_nowait()
+                except queue.Empty:
+                    return None
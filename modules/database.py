@@ -1,9 +1,13 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, event, inspect, bindparam, select, text, tuple_, Column, Index, Integer, String, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
+from contextlib import contextmanager
 from datetime import datetime
+import base64
 import os
 import logging
+from .weather_util import weather_bucket
+from .text_similarity import text_hash
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,9 +17,39 @@ if not os.path.exists('data'):
     os.makedirs('data')
 
 # Database configuration
-DATABASE_URL = "sqlite:///data/outfits.db"
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/outfits.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "15"))
+
+# Flask request threads and the voice loop share the engine, so connections
+# must be usable from any thread; the pool hands each one to a single thread
+# at a time.
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+)
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the single writer; writers wait instead of failing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-16000")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# One session per thread (Flask request or voice loop), released by remove_session()
+Session = scoped_session(SessionLocal)
 Base = declarative_base()
 
 class Outfit(Base):
@@ -28,9 +62,26 @@ class Outfit(Base):
     image_path = Column(String(255))
     weather = Column(String(255))
     emotion = Column(String(100))
+    # Temperature band derived from weather ("cold" ... "hot"), kept for filtering
+    weather_band = Column(String(20))
+    # text_hash() of the description, for exact repeat checks
+    name_hash = Column(Integer)
+    # Content hash of the snapshot (see snapshot_store) and its full-size dimensions
+    image_hash = Column(String(32))
+    width = Column(Integer)
+    height = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # History is always read newest first, optionally narrowed by one filter;
+    # id breaks ties between rows created in the same instant.
+    __table_args__ = (
+        Index("ix_outfits_created_id", "created_at", "id"),
+        Index("ix_outfits_emotion_created_id", "emotion", "created_at", "id"),
+        Index("ix_outfits_band_created_id", "weather_band", "created_at", "id"),
+        Index("ix_outfits_name_hash_created", "name_hash", "created_at"),
+    )
+
     def to_dict(self):
         """Convert outfit object to dictionary"""
         return {
@@ -40,14 +91,51 @@ class Outfit(Base):
             "image_path": self.image_path,
             "weather": self.weather,
             "emotion": self.emotion,
+            "weather_band": self.weather_band,
+            "image_hash": self.image_hash,
+            "width": self.width,
+            "height": self.height,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
         }
 
+# Columns added after the first release:
+# name -> (SQL type for ALTER TABLE, column it is derived from, derivation)
+ADDED_COLUMNS = {
+    "weather_band": ("VARCHAR(20)", "weather", lambda weather: weather_bucket(weather)[1]),
+    "name_hash": ("INTEGER", "description", text_hash),
+    # Older snapshots were not content-addressed; they keep NULLs
+    "image_hash": ("VARCHAR(32)", None, None),
+    "width": ("INTEGER", None, None),
+    "height": ("INTEGER", None, None),
+}
+
+def migrate_db(connection):
+    """Add missing columns and indexes to a database created by an older version"""
+    table = Outfit.__tablename__
+    existing = {column["name"] for column in inspect(connection).get_columns(table)}
+    for name, (sql_type, source, derive) in ADDED_COLUMNS.items():
+        if name in existing:
+            continue
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}"))
+        logger.info(f"Added column {table}.{name}")
+        if source is None:
+            continue
+
+        rows = connection.execute(text(f"SELECT id, {source} FROM {table} WHERE {source} IS NOT NULL")).all()
+        updates = [{"row_id": row[0], "value": derive(row[1])} for row in rows]
+        if updates:
+            connection.execute(text(f"UPDATE {table} SET {name} = :value WHERE id = :row_id"), updates)
+
+    for index in Outfit.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
 def init_db():
     """Initialize the database"""
     try:
         Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            migrate_db(connection)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
@@ -61,7 +149,28 @@ def get_db():
     finally:
         db.close()
 
-def save_outfit(db, name, description=None, image_path=None, weather=None, emotion=None):
+@contextmanager
+def session_scope():
+    """Use the current thread's session and release it when the block ends.
+
+    Commits are done by the helpers below; anything left uncommitted when the
+    block raises is rolled back.
+    """
+    db = Session()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        Session.remove()
+
+def remove_session(exception=None):
+    """Release the current thread's session; registered as a Flask teardown hook"""
+    Session.remove()
+
+def save_outfit(db, name, description=None, image_path=None, weather=None, emotion=None,
+                image_hash=None, width=None, height=None):
     """Save a new outfit to the database"""
     try:
         outfit = Outfit(
@@ -69,7 +178,12 @@ def save_outfit(db, name, description=None, image_path=None, weather=None, emoti
             description=description,
             image_path=image_path,
             weather=weather,
-            emotion=emotion
+            emotion=emotion,
+            weather_band=weather_bucket(weather)[1] if weather else None,
+            name_hash=text_hash(description) if description else None,
+            image_hash=image_hash,
+            width=width,
+            height=height
         )
         db.add(outfit)
         db.commit()
@@ -81,11 +195,108 @@ def save_outfit(db, name, description=None, image_path=None, weather=None, emoti
         logger.error(f"Error saving outfit: {str(e)}")
         raise
 
+# Columns returned by history queries (rows, not ORM objects)
+HISTORY_COLUMNS = (Outfit.id, Outfit.name, Outfit.description, Outfit.image_path,
+                   Outfit.image_hash, Outfit.width, Outfit.height,
+                   Outfit.weather, Outfit.emotion, Outfit.weather_band, Outfit.created_at)
+
+def encode_cursor(created_at, outfit_id):
+    """Opaque page cursor pointing just past the given row"""
+    raw = f"{created_at.isoformat()}|{outfit_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, outfit_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(outfit_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def query_outfits(db, limit=10, cursor=None, emotion=None, weather_band=None, since=None, until=None):
+    """Get one page of outfits, newest first, as (items, next_cursor).
+
+    Pages are addressed by keyset (created_at, id) instead of OFFSET, so
+    every page costs the same index seek however deep it is.
+    """
+    try:
+        query = select(*HISTORY_COLUMNS)
+        if cursor:
+            query = query.where(tuple_(Outfit.created_at, Outfit.id) < decode_cursor(cursor))
+        if emotion:
+            query = query.where(Outfit.emotion == emotion)
+        if weather_band:
+            query = query.where(Outfit.weather_band == weather_band)
+        if since:
+            query = query.where(Outfit.created_at >= since)
+        if until:
+            query = query.where(Outfit.created_at < until)
+        query = query.order_by(Outfit.created_at.desc(), Outfit.id.desc()).limit(limit + 1)
+
+        rows = db.execute(query).all()
+        next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+        items = []
+        for row in rows[:limit]:
+            item = row._asdict()
+            item["created_at"] = row.created_at.isoformat()
+            items.append(item)
+        return items, next_cursor
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error(f"Error querying outfits: {str(e)}")
+        raise
+
+# Built once: these run on every outfit suggestion, and constructing the
+# statements costs more than executing them
+RECENT_HASH_QUERY = (select(Outfit.id)
+                     .where(Outfit.name_hash == bindparam("name_hash"), Outfit.created_at >= bindparam("since"))
+                     .limit(1))
+RECENT_DESCRIPTIONS_QUERY = (select(Outfit.id, Outfit.description)
+                             .where(Outfit.created_at >= bindparam("since"), Outfit.description.is_not(None))
+                             .order_by(Outfit.created_at.desc(), Outfit.id.desc())
+                             .limit(bindparam("limit")))
+
+def has_recent_hash(db, name_hash, since):
+    """True if an outfit with this description hash was saved at or after since"""
+    return db.execute(RECENT_HASH_QUERY, {"name_hash": name_hash, "since": since}).first() is not None
+
+def get_recent_descriptions(db, since, limit):
+    """(id, description) of the newest outfits saved at or after since"""
+    return db.execute(RECENT_DESCRIPTIONS_QUERY, {"since": since, "limit": limit}).all()
+
+def get_descriptions_after(db, after_id, limit):
+    """(id, description) of outfits added after after_id, oldest first"""
+    return db.execute(
+        select(Outfit.id, Outfit.description)
+        .where(Outfit.id > after_id, Outfit.description.is_not(None))
+        .order_by(Outfit.id).limit(limit)
+    ).all()
+
+def get_recent_emotions(db, limit):
+    """Emotions recorded with the newest outfits, oldest first"""
+    rows = db.execute(
+        select(Outfit.emotion).where(Outfit.emotion.is_not(None))
+        .order_by(Outfit.created_at.desc(), Outfit.id.desc()).limit(limit)
+    ).scalars().all()
+    return rows[::-1]
+
+def get_latest_outfit_with_image(db):
+    """Newest outfit that has a snapshot, or None"""
+    row = db.execute(
+        select(*HISTORY_COLUMNS).where(Outfit.image_path.is_not(None))
+        .order_by(Outfit.created_at.desc(), Outfit.id.desc()).limit(1)
+    ).first()
+    return dict(row._asdict(), created_at=row.created_at.isoformat()) if row else None
+
 def get_outfits(db, limit=10, offset=0):
     """Get recent outfits from the database"""
     try:
-        outfits = db.query(Outfit).order_by(Outfit.created_at.desc()).offset(offset).limit(limit).all()
-        return [outfit.to_dict() for outfit in outfits]
+        rows = db.execute(
+            select(*HISTORY_COLUMNS).order_by(Outfit.created_at.desc(), Outfit.id.desc()).offset(offset).limit(limit)
+        ).all()
+        return [dict(row._asdict(), created_at=row.created_at.isoformat()) for row in rows]
     except Exception as e:
         logger.error(f"Error getting outfits: {str(e)}")
         raise
@@ -113,6 +324,3 @@ def delete_outfit(db, outfit_id):
         db.rollback()
         logger.error(f"Error deleting outfit: {str(e)}")
         raise
-
-# Initialize database when module is imported
-init_db() 
\ No newline at end of file
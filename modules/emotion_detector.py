@@ -1,100 +1,105 @@
 import cv2
-from deepface import DeepFace
+import numpy as np
 from modules import shared_state
+from modules.emotion_model import analyze_emotion
+from modules.emotion_pipeline import EmotionPipeline
+from modules.frame_grabber import get_grabber
+from modules.subtitle_overlay import SubtitleOverlay
+from modules.tts_worker import PRIORITY_LOW
 from modules.voice_assistant import chat_with_gpt, speak
+import threading
 import time
 
-def detect_emotion_from_frame():
-    cam = cv2.VideoCapture(0)
-    if not cam.isOpened():
+def detect_emotion_from_frame(initial_emotion=None):
+    grabber = get_grabber()
+    if grabber is None:
         print("❌ Webcam not accessible")
         return
 
     print("🔍 Emotion detection started... Press 'q' to quit")
 
-    last_emotion = ""
     last_spoken_time = 0
     cooldown_seconds = 30
 
-    while True:
-        ret, frame = cam.read()
-        if not ret:
-            print("⚠️ Failed to read from webcam")
-            break
-
-        try:
-            result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-            emotion = result[0]['dominant_emotion']
-            if emotion != last_emotion:
-                current_time = time.time()
-                if (current_time - last_spoken_time > cooldown_seconds):
-                    last_emotion = emotion
-                    shared_state.current_emotion = emotion
-                    last_spoken_time = current_time
-                    print(f"🧠 Detected Emotion: {emotion}")
-                    response = chat_with_gpt("", emotion)
-                    speak(response)
-        except Exception as e:
-            print("Emotion detection error:", e)
-
-        try:
-            cv2.putText(frame, shared_state.latest_response, (20, frame.shape[0] - 20),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        except:
-            pass
-
-        cv2.imshow("Smart Mirror", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    cam.release()
-    cv2.destroyAllWindows()
+    def react(emotion):
+        response = chat_with_gpt("", emotion, intent="emotion_change")
+        # Unprompted remarks never jump ahead of replies the user asked for
+        speak(response, priority=PRIORITY_LOW)
+
+    def on_change(emotion, probabilities, captured_at):
+        # The pipeline only calls this when the smoothed emotion changes
+        nonlocal last_spoken_time
+        print(f"🧠 Detected Emotion: {emotion}")
+        current_time = time.time()
+        if (current_time - last_spoken_time > cooldown_seconds):
+            last_spoken_time = current_time
+            # Reply off the inference worker so analysis keeps running
+            threading.Thread(target=react, args=(emotion,), daemon=True).start()
+
+    # Inference runs on its own worker; the display loop never waits on DeepFace
+    pipeline = EmotionPipeline(grabber, on_change=on_change)
+    if initial_emotion:
+        # Smooth on from the startup reading; its greeting counts as the last remark
+        pipeline.smoother.update({initial_emotion: 1.0})
+        pipeline.emotion = initial_emotion
+        last_spoken_time = time.time()
+    pipeline.start()
+    try:
+        show_webcam_with_subtitles()
+    finally:
+        pipeline.stop()
+        print("📊 Emotion pipeline stats:", pipeline.stats())
 
 def detect_initial_emotion():
-    cam = cv2.VideoCapture(0)
-    if not cam.isOpened():
+    grabber = get_grabber()
+    if grabber is None:
         print("❌ Webcam not accessible")
         return "neutral"
 
-    ret, frame = cam.read()
-    cam.release()
+    with grabber.latest(timeout=2.0) as captured:
+        if captured is None:
+            print("⚠️ Failed to capture initial frame")
+            return "neutral"
 
-    if not ret:
-        print("⚠️ Failed to capture initial frame")
-        return "neutral"
+        try:
+            emotion, _ = analyze_emotion(captured.image)
+            print(f"🧠 Initial Emotion Detected: {emotion}")
+            return emotion
+        except Exception as e:
+            print("Initial emotion detection error:", e)
+            return "neutral"
 
-    try:
-        result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-        emotion = result[0]['dominant_emotion']
-        print(f"🧠 Initial Emotion Detected: {emotion}")
-        return emotion
-    except Exception as e:
-        print("Initial emotion detection error:", e)
-        return "neutral"
 def show_webcam_with_subtitles():
-    cam = cv2.VideoCapture(0)
-    if not cam.isOpened():
+    grabber = get_grabber()
+    if grabber is None:
         print("❌ Webcam not accessible")
         return
 
     print("📷 Showing webcam... Press 'q' to quit")
 
-    while True:
-        ret, frame = cam.read()
-        if not ret:
-            break
+    last_seq = 0
+    display = None
+    subtitles = SubtitleOverlay()
 
-        # Draw latest ChatGPT reply as subtitle
-        try:
-            cv2.putText(frame, shared_state.latest_response, (20, frame.shape[0] - 20),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        except:
-            pass
+    while True:
+        with grabber.latest(after_seq=last_seq) as captured:
+            if captured is None:
+                # Idle mode can leave gaps between frames; only stop if capture ended
+                if grabber.running:
+                    continue
+                break
+            last_seq = captured.seq
+            if display is None or display.shape != captured.image.shape:
+                display = np.empty_like(captured.image)
+            np.copyto(display, captured.image)
+        frame = display
+
+        # Draw latest ChatGPT reply as subtitle (re-laid out only when it changes)
+        subtitles.draw(frame, shared_state.latest_response)
 
         cv2.imshow("Smart Mirror", frame)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-    cam.release()
     cv2.destroyAllWindows()
@@ -0,0 +1,89 @@
+import threading
+import time
+import logging
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Reference point for time-to-first-emotion; this module is imported at boot
+PROCESS_STARTED_AT = time.perf_counter()
+
+_model = None
+_model_lock = threading.Lock()
+_warm = threading.Event()
+_timings = {
+    "model_load_s": None,
+    "warmup_s": None,
+    "time_to_first_emotion_s": None,
+}
+
+
+def deepface():
+    """Import DeepFace (and TensorFlow) on first use; warm_up_async() does this off the main thread"""
+    from deepface import DeepFace
+    return DeepFace
+
+
+def get_model():
+    """Build the DeepFace emotion model once and keep it resident.
+
+    DeepFace caches built models per process, so analyze() calls made after
+    this reuse the same weights instead of rebuilding them.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            started = time.perf_counter()
+            _model = deepface().build_model(model_name="Emotion", task="facial_attribute")
+            _timings["model_load_s"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Emotion model loaded in {_timings['model_load_s']}s")
+        return _model
+
+
+def warm_up():
+    """Load the model and run one inference on a dummy frame"""
+    try:
+        get_model()
+        started = time.perf_counter()
+        dummy = np.zeros((224, 224, 3), dtype=np.uint8)
+        deepface().analyze(dummy, actions=['emotion'], enforce_detection=False)
+        _timings["warmup_s"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Emotion model warm-up finished in {_timings['warmup_s']}s")
+    except Exception as e:
+        logger.error(f"Emotion model warm-up failed: {str(e)}")
+    finally:
+        _warm.set()
+
+
+def warm_up_async():
+    """Start warm_up() in the background and return the thread"""
+    thread = threading.Thread(target=warm_up, name="emotion-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_until_warm(timeout=None):
+    """Block until the background warm-up has finished"""
+    return _warm.wait(timeout)
+
+
+def analyze_emotion(image, face_cropped=False):
+    """Run emotion analysis on the resident model and return (dominant, scores).
+
+    Pass face_cropped=True when image is already a face crop so DeepFace
+    skips its own face detector.
+    """
+    get_model()
+    detector_backend = "skip" if face_cropped else "opencv"
+    result = deepface().analyze(image, actions=['emotion'], enforce_detection=False,
+                                detector_backend=detector_backend)
+    if _timings["time_to_first_emotion_s"] is None:
+        _timings["time_to_first_emotion_s"] = round(time.perf_counter() - PROCESS_STARTED_AT, 3)
+        logger.info(f"Time to first emotion: {_timings['time_to_first_emotion_s']}s")
+    return result[0]['dominant_emotion'], result[0]['emotion']
+
+
+def startup_timings():
+    """Return model load, warm-up and time-to-first-emotion timings"""
+    return dict(_timings)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import logging
+from collections import deque
+import numpy as np
+from modules import shared_state
+from modules.emotion_model import analyze_emotion
+from modules.emotion_smoothing import EmotionSmoother
+from modules.presence import PresenceDetector
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Inference budget: at most this many DeepFace analyses per second
+EMOTION_MAX_FPS = float(os.getenv("EMOTION_MAX_FPS", "2"))
+# Log pipeline stats every this many seconds (0 disables)
+EMOTION_STATS_INTERVAL = float(os.getenv("EMOTION_STATS_INTERVAL", "60"))
+
+
+class EmotionPipeline:
+    """Runs emotion inference on its own worker, always on the newest frame.
+
+    Frames that arrive while an analysis is running are skipped, so the
+    inference rate never throttles capture or display. Frames without a face
+    are skipped, and only the face region is analyzed. Per-frame scores are
+    smoothed, and on_change only fires when the smoothed label changes.
+    """
+
+    def __init__(self, grabber, max_fps=EMOTION_MAX_FPS, on_change=None, analyze=analyze_emotion,
+                 smoother=None, presence=None):
+        self.grabber = grabber
+        self.max_fps = max_fps
+        self.on_change = on_change
+        self.analyze = analyze
+        self.smoother = smoother or EmotionSmoother()
+        self.presence = presence or PresenceDetector()
+        self.emotion = None
+        self._changes = 0
+        self._empty = 0
+        self._latencies = deque(maxlen=500)
+        self._analyzed = 0
+        self._errors = 0
+        self._start_seq = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the inference worker"""
+        if self._running:
+            return
+        self._running = True
+        self._start_seq = self.grabber.frames_captured
+        self._thread = threading.Thread(target=self._run, name="emotion-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the inference worker"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        last_seq = self._start_seq
+        next_run = 0.0
+        next_report = time.monotonic() + EMOTION_STATS_INTERVAL
+
+        while self._running:
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self.grabber.latest(after_seq=last_seq) as frame:
+                if frame is None:
+                    continue
+                last_seq = frame.seq
+                next_run = time.monotonic() + interval
+
+                # Gate on face presence; idle the camera when nobody is around
+                box = self.presence.detect(frame.image)
+                self.grabber.set_idle(box is None and self.presence.idle)
+                if box is None:
+                    self._empty += 1
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    raw_emotion, scores = self.analyze(self.presence.crop(frame.image, box), face_cropped=True)
+                except Exception as e:
+                    self._errors += 1
+                    logger.error(f"Emotion inference error: {str(e)}")
+                    continue
+                self._latencies.append(time.perf_counter() - started)
+                self._analyzed += 1
+                captured_at = frame.timestamp
+
+            emotion = self.smoother.update(scores)
+            changed = emotion != self.emotion
+            # One publish per frame so readers never see scores from one frame and the emotion from another
+            update = {
+                "detected_emotion": raw_emotion,
+                "emotion_scores": {name: float(score) for name, score in scores.items()},
+                "emotion_updated_at": captured_at,
+            }
+            if changed:
+                update["current_emotion"] = emotion
+            shared_state.publish(**update)
+
+            if changed:
+                self.emotion = emotion
+                self._changes += 1
+                if self.on_change is not None:
+                    try:
+                        self.on_change(emotion, self.smoother.probabilities, captured_at)
+                    except Exception as e:
+                        logger.error(f"Emotion change handler error: {str(e)}")
+
+            if EMOTION_STATS_INTERVAL > 0 and time.monotonic() >= next_report:
+                next_report = time.monotonic() + EMOTION_STATS_INTERVAL
+                logger.info(f"Emotion pipeline stats: {self.stats()}")
+
+    def stats(self):
+        """Return capture/inference counters and latency percentiles (ms)"""
+        captured = self.grabber.frames_captured - self._start_seq
+        latencies = np.fromiter(self._latencies, dtype=float) * 1000
+        p50, p95 = np.percentile(latencies, [50, 95]) if latencies.size else (0.0, 0.0)
+        return {
+            "frames_captured": captured,
+            "frames_analyzed": self._analyzed,
+            "frames_dropped": max(0, captured - self._analyzed - self._errors - self._empty),
+            "frames_without_face": self._empty,
+            "errors": self._errors,
+            "emotion_changes": self._changes,
+            "latency_p50_ms": round(float(p50), 1),
+            "latency_p95_ms": round(float(p95), 1),
+        }
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+
+# DeepFace emotion labels, in the column order used by the score window
+EMOTIONS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+
+# Smoothing configuration
+EMOTION_WINDOW = int(os.getenv("EMOTION_WINDOW", "10"))
+EMOTION_DECAY = float(os.getenv("EMOTION_DECAY", "0.8"))
+EMOTION_HYSTERESIS = float(os.getenv("EMOTION_HYSTERESIS", "0.15"))
+
+
+class EmotionSmoother:
+    """Exponentially weighted emotion estimate over a rolling score window.
+
+    Per-frame probability vectors go into a fixed-size NumPy ring buffer. The
+    label only switches when the new leader beats the current label's
+    smoothed probability by more than the hysteresis margin.
+    """
+
+    def __init__(self, window=EMOTION_WINDOW, decay=EMOTION_DECAY, hysteresis=EMOTION_HYSTERESIS):
+        self.window = max(1, window)
+        self.hysteresis = hysteresis
+        self._scores = np.zeros((self.window, len(EMOTIONS)), dtype=np.float32)
+        self._powers = np.power(decay, np.arange(self.window), dtype=np.float32)
+        self._head = 0
+        self._count = 0
+        self._probabilities = np.zeros(len(EMOTIONS), dtype=np.float32)
+        self.emotion = None
+
+    def reset(self):
+        """Forget all buffered frames and the current label"""
+        self._scores.fill(0)
+        self._head = 0
+        self._count = 0
+        self._probabilities.fill(0)
+        self.emotion = None
+
+    def update(self, scores):
+        """Add one frame's emotion scores and return the smoothed label"""
+        row = self._scores[self._head]
+        row[:] = [scores.get(name, 0.0) for name in EMOTIONS]
+        total = row.sum()
+        if total > 0:
+            row /= total
+        self._head = (self._head + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+
+        # Age 0 is the newest row; unfilled rows get zero weight
+        ages = (self._head - 1 - np.arange(self.window)) % self.window
+        weights = np.where(ages < self._count, self._powers[ages], 0.0)
+        self._probabilities = weights @ self._scores / weights.sum()
+
+        leader = int(np.argmax(self._probabilities))
+        if self.emotion is None:
+            self.emotion = EMOTIONS[leader]
+        else:
+            current = EMOTIONS.index(self.emotion)
+            if self._probabilities[leader] - self._probabilities[current] > self.hysteresis:
+                self.emotion = EMOTIONS[leader]
+        return self.emotion
+
+    @property
+    def probabilities(self):
+        """Smoothed probabilities keyed by emotion label"""
+        return dict(zip(EMOTIONS, self._probabilities.tolist()))
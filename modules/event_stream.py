@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+from itertools import islice
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Events kept for clients resuming with Last-Event-ID
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "512"))
+# A client further behind than this skips ahead with a resync instead of replaying
+EVENT_MAX_LAG = int(os.getenv("EVENT_MAX_LAG", "128"))
+# Comment line sent on idle connections so proxies and dead clients are noticed
+EVENT_KEEPALIVE = float(os.getenv("EVENT_KEEPALIVE", "15"))
+# Reconnect delay suggested to EventSource, in milliseconds
+EVENT_RETRY_MS = int(os.getenv("EVENT_RETRY_MS", "3000"))
+
+Event = namedtuple("Event", "seq frame")
+
+
+def encode_event(event_id, event_type, data):
+    """One Server-Sent Events frame"""
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+
+class EventBroker:
+    """Fans events out to Server-Sent Events clients.
+
+    Each event is encoded once into a shared ring buffer. Clients don't have
+    queues of their own: each keeps a cursor into the ring and sends
+    everything past it in one write, so a publish costs the same for one
+    client as for hundreds, and a slow client only holds up its own thread.
+    A client that falls too far behind (or resumes from an event that has
+    already left the ring) gets a "resync" event with the current state
+    instead of a replay.
+    """
+
+    def __init__(self, snapshot=dict, buffer_size=EVENT_BUFFER_SIZE, max_lag=EVENT_MAX_LAG,
+                 keepalive=EVENT_KEEPALIVE):
+        # Ids are "<epoch>-<seq>", so ids from before a restart are recognized as stale
+        self.epoch = format(time.time_ns() // 1000, "x")
+        self.snapshot = snapshot
+        self.max_lag = max_lag
+        self.keepalive = keepalive
+        self._events = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._changed = threading.Condition()
+        self.clients = 0
+        self.resyncs = 0
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, event_type, data):
+        """Add an event and wake every connected client; returns its sequence number"""
+        with self._changed:
+            self._seq += 1
+            self._events.append(Event(self._seq, encode_event(f"{self.epoch}-{self._seq}", event_type, data)))
+            self._changed.notify_all()
+            return self._seq
+
+    def resume_point(self, last_event_id):
+        """Sequence number to replay after, or None if the client has to resync"""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._changed:
+            oldest = self._events[0].seq if self._events else self._seq + 1
+            if seq > self._seq or seq < oldest - 1:
+                return None
+        return seq
+
+    def _resync_frame(self, seq):
+        self.resyncs += 1
+        try:
+            state = self.snapshot()
+        except Exception as e:
+            logger.error(f"Event snapshot failed: {str(e)}")
+            state = {}
+        return encode_event(f"{self.epoch}-{seq}", "resync", state)
+
+    def _pending(self, cursor):
+        """(new cursor, frames past cursor or None if the client must resync); caller holds the lock"""
+        if cursor >= self._seq:
+            return cursor, []
+        oldest = self._events[0].seq if self._events else self._seq + 1
+        if self._seq - cursor > self.max_lag or cursor < oldest - 1:
+            return self._seq, None
+        return self._seq, [event.frame for event in islice(self._events, cursor - oldest + 1, None)]
+
+    def stream(self, last_event_id=None):
+        """Generator of SSE bytes for one client, starting after last_event_id"""
+        cursor = self.resume_point(last_event_id)
+        with self._changed:
+            self.clients += 1
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n\n".encode()
+            if cursor is None:
+                cursor = self._seq
+                yield self._resync_frame(cursor)
+
+            while True:
+                with self._changed:
+                    if cursor >= self._seq:
+                        self._changed.wait(self.keepalive)
+                    cursor, frames = self._pending(cursor)
+                if frames is None:
+                    yield self._resync_frame(cursor)
+                elif frames:
+                    yield b"".join(frames)
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            with self._changed:
+                self.clients -= 1
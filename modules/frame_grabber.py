@@ -0,0 +1,285 @@
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+import cv2
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Camera configuration. CAMERA_SOURCE is a device index ("0"), a video or
+# image file path, or "synthetic" for generated test frames.
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")
+FRAME_RING_SIZE = int(os.getenv("FRAME_RING_SIZE", "4"))
+# Capture rate while nobody is in front of the mirror
+IDLE_CAPTURE_FPS = float(os.getenv("IDLE_CAPTURE_FPS", "2"))
+# Frames a camera may have queued up while idle (V4L2 keeps 4 by default)
+CAMERA_BUFFER_FRAMES = int(os.getenv("CAMERA_BUFFER_FRAMES", "4"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class SyntheticCapture:
+    """VideoCapture stand-in that generates a moving test pattern"""
+
+    def __init__(self, width=640, height=480, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._count = 0
+        self._gradient = np.tile(
+            np.linspace(0, 255, width, dtype=np.uint8), (height, 1)
+        )
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return float(self.fps) if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_FPS or value <= 0:
+            return False
+        self.fps = value
+        return True
+
+    def grab(self):
+        return self.read()[0]
+
+    def read(self, image=None):
+        time.sleep(1.0 / self.fps)
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        shift = (self._count * 4) % self.width
+        image[:, :, 0] = np.roll(self._gradient, shift, axis=1)
+        image[:, :, 1] = self._gradient[::-1]
+        image[:, :, 2] = self._count % 256
+        self._count += 1
+        return True, image
+
+    def release(self):
+        pass
+
+
+class StillImageCapture(SyntheticCapture):
+    """VideoCapture stand-in that replays a single image file"""
+
+    def __init__(self, path, fps=30):
+        self._image = cv2.imread(path)
+        height, width = self._image.shape[:2] if self._image is not None else (0, 0)
+        super().__init__(width=width, height=height, fps=fps)
+
+    def isOpened(self):
+        return self._image is not None
+
+    def read(self, image=None):
+        time.sleep(1.0 / self.fps)
+        if image is None or image.shape != self._image.shape:
+            return True, self._image.copy()
+        np.copyto(image, self._image)
+        return True, image
+
+
+def open_source(source):
+    """Open a camera index, video/image file or the synthetic source"""
+    source = str(source).strip()
+    if source.lower() == "synthetic":
+        return SyntheticCapture()
+    if source.isdigit():
+        return cv2.VideoCapture(int(source))
+    if source.lower().endswith(IMAGE_EXTENSIONS):
+        return StillImageCapture(source)
+    return cv2.VideoCapture(source)
+
+
+class Frame:
+    """A pinned view of one ring buffer slot; valid until released"""
+
+    __slots__ = ("seq", "timestamp", "image", "_slot")
+
+    def __init__(self, seq, timestamp, image, slot):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+        self._slot = slot
+
+
+class FrameGrabber:
+    """Owns the camera on one thread and publishes frames into a ring buffer.
+
+    Readers get the newest frame without copying. A slot stays pinned while a
+    reader holds it, and the capture thread writes around pinned slots.
+    """
+
+    def __init__(self, source=CAMERA_SOURCE, ring_size=FRAME_RING_SIZE):
+        self.source = source
+        self._size = max(2, ring_size)
+        self._images = [None] * self._size
+        self._stamps = [0.0] * self._size
+        self._seqs = [0] * self._size
+        self._pins = [0] * self._size
+        self._latest = -1
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._cap = None
+        self._thread = None
+        self._running = False
+        self._scratch = None
+        self._idle = False
+        self._capture_idle = False
+        self._full_fps = 0.0
+        self._throttled = False
+
+    @property
+    def frames_captured(self):
+        return self._seq
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def idle(self):
+        return self._idle
+
+    def set_idle(self, idle):
+        """Switch between full-rate capture and the low-power idle rate.
+
+        The capture thread applies the switch: it asks the device itself for
+        IDLE_CAPTURE_FPS, and on leaving idle restores the rate and flushes
+        the frames that queued up meanwhile.
+        """
+        if idle != self._idle:
+            self._idle = idle
+            logger.info("Frame grabber entering idle mode" if idle else "Frame grabber resuming full rate")
+
+    def start(self):
+        """Open the source and start the capture thread"""
+        if self._running:
+            return True
+        self._cap = open_source(self.source)
+        if not self._cap.isOpened():
+            logger.error(f"Failed to open camera source: {self.source}")
+            self._cap = None
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+        self._thread.start()
+        logger.info(f"Frame grabber started on source: {self.source}")
+        return True
+
+    def stop(self):
+        """Stop the capture thread and release the device"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_slot(self):
+        for step in range(1, self._size + 1):
+            slot = (self._latest + step) % self._size
+            if slot != self._latest and self._pins[slot] == 0:
+                return slot
+        return None
+
+    def _apply_idle(self, idle):
+        self._capture_idle = idle
+        if idle:
+            if IDLE_CAPTURE_FPS <= 0 or not hasattr(self._cap, "set"):
+                return
+            self._full_fps = self._cap.get(cv2.CAP_PROP_FPS)
+            # Drivers that ignore the request, or round it up, keep being paced by sleeping
+            if self._cap.set(cv2.CAP_PROP_FPS, IDLE_CAPTURE_FPS):
+                self._throttled = 0 < self._cap.get(cv2.CAP_PROP_FPS) <= IDLE_CAPTURE_FPS * 1.5
+            return
+        if self._full_fps > 0:
+            self._cap.set(cv2.CAP_PROP_FPS, self._full_fps)
+        self._full_fps = 0.0
+        self._throttled = False
+        # Drop frames buffered while idle so the first one out is current
+        if hasattr(self._cap, "grab"):
+            for _ in range(CAMERA_BUFFER_FRAMES):
+                if not self._cap.grab():
+                    break
+
+    def _run(self):
+        while self._running:
+            if self._idle != self._capture_idle:
+                self._apply_idle(self._idle)
+            if self._idle and not self._throttled and IDLE_CAPTURE_FPS > 0:
+                time.sleep(1.0 / IDLE_CAPTURE_FPS)
+            with self._cond:
+                slot = self._next_slot()
+            buffer = self._images[slot] if slot is not None else self._scratch
+            ret, image = self._cap.read(buffer) if buffer is not None else self._cap.read()
+            if not ret:
+                # Loop file sources; a real camera that stops delivering ends capture
+                if not str(self.source).isdigit() and hasattr(self._cap, "set"):
+                    self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                logger.warning("Failed to read from camera, stopping frame grabber")
+                self._running = False
+                break
+            if slot is None:
+                # Every slot is pinned by a reader; drop this frame
+                self._scratch = image
+                continue
+            with self._cond:
+                self._seq += 1
+                self._images[slot] = image
+                self._stamps[slot] = time.time()
+                self._seqs[slot] = self._seq
+                self._latest = slot
+                self._cond.notify_all()
+        with self._cond:
+            self._cond.notify_all()
+
+    def acquire(self, after_seq=0, timeout=1.0):
+        """Pin and return the newest frame newer than after_seq, or None"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._latest < 0 or self._seqs[self._latest] <= after_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._cond.wait(remaining)
+            slot = self._latest
+            self._pins[slot] += 1
+            return Frame(self._seqs[slot], self._stamps[slot], self._images[slot], slot)
+
+    def release(self, frame):
+        """Unpin a frame returned by acquire()"""
+        with self._cond:
+            self._pins[frame._slot] -= 1
+
+    @contextmanager
+    def latest(self, after_seq=0, timeout=1.0):
+        """Context manager around acquire()/release(); yields None on timeout"""
+        frame = self.acquire(after_seq, timeout)
+        try:
+            yield frame
+        finally:
+            if frame is not None:
+                self.release(frame)
+
+
+_grabber = None
+_grabber_lock = threading.Lock()
+
+
+def get_grabber():
+    """Return the process-wide frame grabber, starting it on first use"""
+    global _grabber
+    with _grabber_lock:
+        if _grabber is None:
+            _grabber = FrameGrabber()
+        if not _grabber._running and not _grabber.start():
+            return None
+        return _grabber
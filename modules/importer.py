@@ -0,0 +1,218 @@
+"""Import the legacy outfit_history.json and unlinked outfits/ images into the database.
+
+    python -m modules.importer [--history outfit_history.json] [--images outfits] [--dry-run]
+
+Safe to run more than once: entries already in the database are skipped.
+"""
+import os
+import json
+import time
+import argparse
+import logging
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import select
+from .database import Outfit, engine, init_db
+from .text_similarity import text_hash
+from .weather_util import weather_bucket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LEGACY_HISTORY_FILE = "outfit_history.json"
+OUTFITS_DIR = "outfits"
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "10000"))
+READ_CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array without loading the whole file.
+
+    Elements are decoded one at a time with raw_decode(); the buffer only
+    grows while an element is cut off at the end of what has been read.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip_whitespace()
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+        if buffer[pos] == "]":
+            return
+        if not first:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' in JSON array near: {buffer[pos:pos + 40]!r}")
+            pos += 1
+            skip_whitespace()
+        first = False
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A bare number may be cut off mid-digits ("45" of "456.5"); only
+            # trust it once the delimiter that follows it has been read
+            if (not eof and isinstance(value, (int, float))
+                    and buffer[end:].lstrip(" \t\r\n")[:1] not in (",", "]")):
+                fill()
+                continue
+            break
+        pos = end
+        yield value
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Legacy entries carry a "%Y-%m-%d" date; thousands share each day"""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def entry_to_row(entry):
+    """Map a legacy {"name", "image", "date"} entry to an outfits row, or None if unusable"""
+    description = (entry.get("name") or "").strip()
+    if not description:
+        return None
+    try:
+        created_at = parse_date(entry.get("date"))
+    except (TypeError, ValueError):
+        return None
+    weather = entry.get("weather")
+    return {
+        "name": f"Outfit {entry['date']}",
+        "description": description,
+        "image_path": normalize_path(entry.get("image")),
+        "weather": weather,
+        "emotion": entry.get("emotion"),
+        "weather_band": weather_bucket(weather)[1] if weather else None,
+        "name_hash": text_hash(description),
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def normalize_path(path):
+    return os.path.normpath(path).replace(os.sep, "/") if path else None
+
+
+def row_key(name_hash, created_at, image_path):
+    """Identity used to de-duplicate: same text, same day, same image"""
+    return name_hash, created_at.date() if created_at else None, image_path
+
+
+def import_history(path=LEGACY_HISTORY_FILE, images_dir=OUTFITS_DIR, dry_run=False,
+                   batch_size=IMPORT_BATCH_SIZE):
+    """Import history entries and orphaned images in one transaction; returns counts"""
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "images_linked": 0}
+    started = time.perf_counter()
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        seen = set()
+        linked_images = set()
+        for name_hash, created_at, image_path in connection.execute(
+                select(Outfit.name_hash, Outfit.created_at, Outfit.image_path)):
+            seen.add(row_key(name_hash, created_at, normalize_path(image_path)))
+            if image_path:
+                linked_images.add(normalize_path(image_path))
+
+        batch = []
+
+        def flush():
+            # One executemany per batch, all inside the surrounding transaction
+            if batch and not dry_run:
+                connection.execute(Outfit.__table__.insert(), batch)
+            batch.clear()
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for entry in iter_json_array(f):
+                    stats["read"] += 1
+                    row = entry_to_row(entry) if isinstance(entry, dict) else None
+                    if row is None:
+                        stats["invalid"] += 1
+                        continue
+                    key = row_key(row["name_hash"], row["created_at"], row["image_path"])
+                    if key in seen:
+                        stats["duplicates"] += 1
+                        continue
+                    seen.add(key)
+                    if row["image_path"]:
+                        linked_images.add(row["image_path"])
+                    batch.append(row)
+                    stats["inserted"] += 1
+                    if len(batch) >= batch_size:
+                        flush()
+        elif path:
+            logger.warning(f"No legacy history file at {path}")
+
+        # Images captured while the database write failed, or by older versions
+        if images_dir and os.path.isdir(images_dir):
+            for entry in sorted(os.scandir(images_dir), key=lambda e: e.name):
+                image_path = normalize_path(os.path.join(images_dir, entry.name))
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS) or image_path in linked_images:
+                    continue
+                created_at = datetime.fromtimestamp(entry.stat().st_mtime)
+                batch.append({
+                    "name": f"Outfit {created_at.strftime('%Y-%m-%d %H:%M')}",
+                    "description": None, "image_path": image_path, "weather": None,
+                    "emotion": None, "weather_band": None, "name_hash": None,
+                    "created_at": created_at, "updated_at": created_at,
+                })
+                stats["images_linked"] += 1
+                if len(batch) >= batch_size:
+                    flush()
+
+        flush()
+        if dry_run:
+            transaction.rollback()
+        else:
+            transaction.commit()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import legacy outfit history into the database")
+    parser.add_argument("--history", default=LEGACY_HISTORY_FILE, help="legacy JSON history file")
+    parser.add_argument("--images", default=OUTFITS_DIR, help="directory of outfit images to link")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be imported")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    stats = import_history(args.history, args.images, dry_run=args.dry_run)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
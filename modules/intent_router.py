@@ -0,0 +1,112 @@
+import re
+import difflib
+import logging
+from collections import namedtuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Minimum similarity for a fuzzy phrase match (covers ASR slips like "whether")
+FUZZY_THRESHOLD = 0.8
+# Phrases shorter than this are only matched exactly; short words fuzz too easily
+FUZZY_MIN_LENGTH = 6
+
+Intent = namedtuple("Intent", "name phrases priority handler")
+Match = namedtuple("Match", "intent phrase fuzzy")
+
+
+class IntentRouter:
+    """Table-driven intent matcher built once at startup.
+
+    Each intent's trigger phrases are compiled into one word-bounded regex,
+    and intents are tried from the highest priority down, so when phrases
+    of several intents appear (even overlapping ones, like "show my outfit
+    history") the highest priority wins. If nothing matches exactly, the
+    utterance's word n-grams are compared against the phrases with a
+    similarity threshold.
+    """
+
+    def __init__(self, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._intents = {}
+        self._by_phrase = {}
+        self._patterns = None
+        self._fuzzy = {}
+
+    def register(self, name, phrases, priority=0, handler=None):
+        """Add an intent; phrases are matched case-insensitively on word boundaries"""
+        intent = Intent(name, tuple(p.lower() for p in phrases), priority, handler)
+        self._intents[name] = intent
+        self._patterns = None
+        return intent
+
+    def intent(self, name, phrases, priority=0):
+        """Decorator form of register() for handler functions"""
+        def decorator(handler):
+            self.register(name, phrases, priority, handler)
+            return handler
+        return decorator
+
+    def compile(self):
+        """Build the per-intent regexes and fuzzy index; called lazily on first match"""
+        self._by_phrase = {}
+        for intent in self._intents.values():
+            for phrase in intent.phrases:
+                current = self._by_phrase.get(phrase)
+                if current is None or intent.priority > current.priority:
+                    self._by_phrase[phrase] = intent
+
+        # Highest priority first; within an intent, longest phrases first so the
+        # alternation prefers the most specific one. The lookahead makes
+        # finditer() report a phrase at every position, overlapping or not.
+        self._patterns = []
+        for intent in sorted(self._intents.values(), key=lambda i: i.priority, reverse=True):
+            ordered = sorted(intent.phrases, key=len, reverse=True)
+            alternation = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in ordered)
+            self._patterns.append((intent, re.compile(rf"\b(?=((?:{alternation}))\b)")))
+
+        phrases = sorted(self._by_phrase, key=len, reverse=True)
+        self._fuzzy = {}
+        for phrase in phrases:
+            if len(phrase) >= FUZZY_MIN_LENGTH:
+                self._fuzzy.setdefault(len(phrase.split()), []).append(phrase)
+        return self
+
+    def _best(self, candidates, fuzzy):
+        intent, phrase = max(candidates, key=lambda c: (c[0].priority, len(c[1])))
+        return Match(intent, phrase, fuzzy)
+
+    def match(self, text):
+        """Return the best Match for text, or None"""
+        if self._patterns is None:
+            self.compile()
+        text = text.lower()
+
+        for intent, pattern in self._patterns:
+            found = [" ".join(hit.group(1).split()) for hit in pattern.finditer(text)]
+            if found:
+                return Match(intent, max(found, key=len), False)
+
+        candidates = []
+        words = re.findall(r"[a-z']+", text)
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        for size, phrases in self._fuzzy.items():
+            for start in range(len(words) - size + 1):
+                matcher.set_seq2(" ".join(words[start:start + size]))
+                for phrase in phrases:
+                    matcher.set_seq1(phrase)
+                    if (matcher.real_quick_ratio() >= self.fuzzy_threshold
+                            and matcher.quick_ratio() >= self.fuzzy_threshold
+                            and matcher.ratio() >= self.fuzzy_threshold):
+                        candidates.append((self._by_phrase[phrase], phrase))
+        if candidates:
+            return self._best(candidates, True)
+        return None
+
+    def dispatch(self, text, fallback=None):
+        """Run the handler of the matched intent, or fallback(text) if none matched"""
+        found = self.match(text)
+        if found is None or found.intent.handler is None:
+            return fallback(text) if fallback is not None else None
+        logger.debug(f"Routed to intent '{found.intent.name}' via '{found.phrase}'")
+        return found.intent.handler(text)
@@ -0,0 +1,144 @@
+import os
+import re
+import threading
+from dotenv import load_dotenv
+from modules import shared_state
+from modules.response_cache import ResponseCache, make_key
+
+load_dotenv()
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+FALLBACK_REPLY = "I’m having a dumb moment. Try again."
+
+# Chat completion client; anything with a compatible create() can stand in for it.
+# Both are created on first use, so importing this module doesn't load openai.
+completion_client = None
+response_cache = None
+_init_lock = threading.Lock()
+
+def get_completion_client():
+    global completion_client
+    with _init_lock:
+        if completion_client is None:
+            import openai
+            openai.api_key = openai.api_key or os.getenv("OPENAI_API_KEY")
+            completion_client = openai.ChatCompletion
+        return completion_client
+
+def get_response_cache():
+    global response_cache
+    with _init_lock:
+        if response_cache is None:
+            response_cache = ResponseCache()
+        return response_cache
+
+def build_messages(user_input, emotion="neutral", system=None):
+    """Chat messages for user_input; system replaces the best-friend persona"""
+    if system is not None:
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user_input}
+        ]
+    prompt = f"""
+    You are a smart, silly, sarcastic best friend.
+    Your user is feeling {emotion}.
+    User said: {user_input}
+    Reply like a friend, not a therapist. Be witty or savage if needed.
+    """
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": user_input}
+    ]
+
+def complete(user_input, emotion="neutral", intent=None, weather=None, system=None,
+             variants=None):
+    """chat_with_gpt without touching the subtitles or the fallback; raises if the API call fails"""
+    # Replies for a known intent depend only on emotion and weather, so cache them
+    cache_key = make_key(intent, emotion, weather) if intent else None
+    if cache_key:
+        cached = get_response_cache().get(cache_key, variants)
+        if cached:
+            return cached
+
+    response = get_completion_client().create(
+        model="gpt-3.5-turbo",
+        messages=build_messages(user_input, emotion, system),
+        max_tokens=100,
+        temperature=0.8
+    )
+    reply = response['choices'][0]['message']['content'].strip()
+    if cache_key:
+        get_response_cache().put(cache_key, reply)
+    return reply
+
+def chat_with_gpt(user_input, emotion="neutral", intent=None, weather=None):
+    try:
+        reply = complete(user_input, emotion, intent, weather)
+    except Exception as e:
+        print("OpenAI Error:", e)
+        reply = FALLBACK_REPLY
+    shared_state.publish(latest_response=reply)
+    return reply
+
+async def acomplete(user_input, emotion="neutral", intent=None, weather=None, system=None,
+                    variants=None):
+    """complete() for async views: same cache, but the API call doesn't block a thread"""
+    cache_key = make_key(intent, emotion, weather) if intent else None
+    if cache_key:
+        cached = get_response_cache().get(cache_key, variants)
+        if cached:
+            return cached
+
+    response = await get_completion_client().acreate(
+        model="gpt-3.5-turbo",
+        messages=build_messages(user_input, emotion, system),
+        max_tokens=100,
+        temperature=0.8
+    )
+    reply = response['choices'][0]['message']['content'].strip()
+    if cache_key:
+        get_response_cache().put(cache_key, reply)
+    return reply
+
+async def achat_with_gpt(user_input, emotion="neutral", intent=None, weather=None):
+    """chat_with_gpt for async views"""
+    try:
+        reply = await acomplete(user_input, emotion, intent, weather)
+    except Exception as e:
+        print("OpenAI Error:", e)
+        reply = FALLBACK_REPLY
+    shared_state.publish(latest_response=reply)
+    return reply
+
+def stream_chat_with_gpt(user_input, emotion="neutral"):
+    """Yield the reply one sentence at a time as completion tokens arrive"""
+    reply = ""
+    pending = ""
+    try:
+        response = get_completion_client().create(
+            model="gpt-3.5-turbo",
+            messages=build_messages(user_input, emotion),
+            max_tokens=100,
+            temperature=0.8,
+            stream=True
+        )
+        for chunk in response:
+            token = chunk['choices'][0]['delta'].get('content') or ""
+            if not token:
+                continue
+            reply += token
+            pending += token
+            # Let the subtitle overlay follow along token by token
+            shared_state.publish(latest_response=reply.strip())
+            *sentences, pending = SENTENCE_END.split(pending)
+            for sentence in sentences:
+                if sentence.strip():
+                    yield sentence.strip()
+    except Exception as e:
+        print("OpenAI Error:", e)
+        if not reply:
+            shared_state.publish(latest_response=FALLBACK_REPLY)
+            yield FALLBACK_REPLY
+            return
+    if pending.strip():
+        yield pending.strip()
@@ -1,66 +1,77 @@
 import os
-import json
-from datetime import datetime
-import cv2
+from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
-from .database import get_db, save_outfit, get_outfits
+from . import shared_state
+from .database import (session_scope, save_outfit, get_outfits, query_outfits,
+                       has_recent_hash, get_recent_descriptions, get_latest_outfit_with_image)
+from .snapshot_store import snapshot_store
+from .text_similarity import text_hash, shingles, jaccard
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Create outfits directory if it doesn't exist
-OUTFITS_DIR = "outfits"
-if not os.path.exists(OUTFITS_DIR):
-    os.makedirs(OUTFITS_DIR)
+# An outfit counts as a repeat if it was saved within this many days
+OUTFIT_REPEAT_DAYS = float(os.getenv("OUTFIT_REPEAT_DAYS", "7"))
+# Near-duplicate check: how many recent outfits to compare against, and how similar is "the same"
+NEAR_DUPLICATE_WINDOW = int(os.getenv("NEAR_DUPLICATE_WINDOW", "50"))
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.5"))
+
+# Shingles of recent descriptions, so each one is only shingled once
+cached_shingles = lru_cache(maxsize=1024)(shingles)
 
 def capture_outfit_snapshot():
-    """Capture an image of the current outfit using webcam"""
+    """Capture the current outfit from the webcam; returns a Snapshot or None.
+
+    Only the hash and a copy of the frame are taken here; encoding and
+    writing happen on the snapshot store's writer pool.
+    """
+    # Imported here so web workers that only read history never load OpenCV
+    from .frame_grabber import get_grabber
+
     try:
-        # Initialize webcam
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        # Read from the shared frame grabber instead of opening the device
+        grabber = get_grabber()
+        if grabber is None:
             logger.error("Failed to open webcam")
             return None
 
-        # Capture frame
-        ret, frame = cap.read()
-        cap.release()
+        with grabber.latest(timeout=2.0) as frame:
+            if frame is None:
+                logger.error("Failed to capture frame")
+                return None
 
-        if not ret:
-            logger.error("Failed to capture frame")
-            return None
-
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"outfit_{timestamp}.jpg"
-        filepath = os.path.join(OUTFITS_DIR, filename)
+            # Stored under its content hash, so identical shots share one file
+            snapshot = snapshot_store.save(frame.image)
 
-        # Save image
-        cv2.imwrite(filepath, frame)
-        logger.info(f"Captured outfit snapshot: {filepath}")
-        return filepath
+        logger.info(f"Captured outfit snapshot: {snapshot.path}")
+        return snapshot
 
     except Exception as e:
         logger.error(f"Error capturing outfit snapshot: {str(e)}")
         return None
 
-def save_history(outfit_description, image_path=None, weather=None, emotion=None):
-    """Save outfit information to the database"""
+def save_history(outfit_description, snapshot=None, weather=None, emotion=None):
+    """Save outfit information (and its Snapshot, if any) to the database"""
     try:
-        # Get database session
-        db = next(get_db())
-        
-        # Save to database
-        outfit = save_outfit(
-            db=db,
-            name=f"Outfit {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-            description=outfit_description,
-            image_path=image_path,
-            weather=weather,
-            emotion=emotion
-        )
-        
+        with session_scope() as db:
+            # Save to database
+            outfit = save_outfit(
+                db=db,
+                name=f"Outfit {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+                description=outfit_description,
+                image_path=snapshot.path if snapshot else None,
+                weather=weather,
+                emotion=emotion,
+                image_hash=snapshot.image_hash if snapshot else None,
+                width=snapshot.width if snapshot else None,
+                height=snapshot.height if snapshot else None
+            )
+            item = outfit.to_dict()
+
         logger.info(f"Saved outfit to database: {outfit.name}")
+        # Lets the web UI add the entry to its history without polling
+        shared_state.publish(last_outfit=item)
         return outfit
 
     except Exception as e:
@@ -70,80 +81,74 @@ def save_history(outfit_description, image_path=None, weather=None, emotion=None
 def get_recent_outfits(limit=10):
     """Get recent outfits from the database"""
     try:
-        # Get database session
-        db = next(get_db())
-        
-        # Get outfits from database
-        outfits = get_outfits(db, limit=limit)
+        with session_scope() as db:
+            # Get outfits from database
+            outfits = get_outfits(db, limit=limit)
         
         # Format outfit information
-        formatted_outfits = []
-        for outfit in outfits:
-            formatted_outfit = f"Outfit: {outfit['name']}\n"
-            if outfit['description']:
-                formatted_outfit += f"Description: {outfit['description']}\n"
-            if outfit['weather']:
-                formatted_outfit += f"Weather: {outfit['weather']}\n"
-            if outfit['emotion']:
-                formatted_outfit += f"Emotion: {outfit['emotion']}\n"
-            formatted_outfit += f"Created: {outfit['created_at']}\n"
-            formatted_outfits.append(formatted_outfit)
-        
-        return formatted_outfits
+        return [format_outfit(outfit) for outfit in outfits]
 
     except Exception as e:
         logger.error(f"Error getting recent outfits: {str(e)}")
         raise
 
-def is_recently_used(name):
-    if not os.path.exists(HISTORY_FILE):
+def get_outfit_page(limit=10, cursor=None, emotion=None, weather_band=None, since=None, until=None):
+    """Get one page of outfit history as (items, next_cursor)"""
+    with session_scope() as db:
+        return query_outfits(db, limit=limit, cursor=cursor, emotion=emotion,
+                             weather_band=weather_band, since=since, until=until)
+
+def format_outfit(outfit):
+    """Render one history item as the multi-line text shown in the UI"""
+    formatted_outfit = f"Outfit: {outfit['name']}\n"
+    if outfit['description']:
+        formatted_outfit += f"Description: {outfit['description']}\n"
+    if outfit['weather']:
+        formatted_outfit += f"Weather: {outfit['weather']}\n"
+    if outfit['emotion']:
+        formatted_outfit += f"Emotion: {outfit['emotion']}\n"
+    formatted_outfit += f"Created: {outfit['created_at']}\n"
+    return formatted_outfit
+
+def is_recently_used(name, days=OUTFIT_REPEAT_DAYS, near_duplicates=True):
+    """Check whether an outfit (or, with near_duplicates, a paraphrase of it) was saved recently"""
+    since = datetime.utcnow() - timedelta(days=days)
+    try:
+        with session_scope() as db:
+            if has_recent_hash(db, text_hash(name), since):
+                return True
+            if not near_duplicates:
+                return False
+            recent = get_recent_descriptions(db, since, NEAR_DUPLICATE_WINDOW)
+    except Exception as e:
+        logger.error(f"Error checking outfit history: {str(e)}")
         return False
 
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
-
-    one_week_ago = datetime.now() - timedelta(days=7)
-
-    for entry in reversed(history):
-        entry_date = datetime.strptime(entry["date"], "%Y-%m-%d")
-        if entry["name"].lower() == name.lower() and entry_date > one_week_ago:
+    candidate = shingles(name)
+    for _, description in recent:
+        if jaccard(candidate, cached_shingles(description)) >= NEAR_DUPLICATE_THRESHOLD:
             return True
-
     return False
 
-def get_recent_outfits():
-    if not os.path.exists(HISTORY_FILE):
-        return []
-
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
-
-    return [
-        f"{entry['date']}: {entry['name']}"
-        for entry in reversed(history)
-    ]
-
 def show_last_outfit():
-    if not os.path.exists(HISTORY_FILE):
-        print("⚠️ No outfit history yet.")
-        return
+    import cv2
 
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
+    with session_scope() as db:
+        last_entry = get_latest_outfit_with_image(db)
 
-    if not history:
-        print("⚠️ Outfit history is empty.")
+    if last_entry is None:
+        print("⚠️ No outfit history yet.")
         return
 
-    last_entry = history[-1]
-    image_path = last_entry.get("image")
+    image_path = last_entry["image_path"]
 
-    if not image_path or not os.path.exists(image_path):
+    if not os.path.exists(image_path):
         print("⚠️ Outfit image not found.")
         return
 
     image = cv2.imread(image_path)
-    window_title = f"Last Outfit: {last_entry['name']} ({last_entry['date']})"
+    label = last_entry["description"] or last_entry["name"]
+    window_title = f"Last Outfit: {label} ({last_entry['created_at'][:10]})"
     cv2.imshow(window_title, image)
     print(f"📸 Displaying: {window_title}")
     cv2.waitKey(0)
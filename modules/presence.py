@@ -0,0 +1,62 @@
+import os
+import time
+import logging
+import cv2
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Presence configuration
+PRESENCE_DETECT_WIDTH = int(os.getenv("PRESENCE_DETECT_WIDTH", "320"))
+PRESENCE_IDLE_SECONDS = float(os.getenv("PRESENCE_IDLE_SECONDS", "60"))
+FACE_MARGIN = float(os.getenv("FACE_MARGIN", "0.2"))
+
+CASCADE_PATH = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+
+
+class PresenceDetector:
+    """Cheap face-presence gate run ahead of DeepFace.
+
+    A Haar cascade runs on a downscaled grayscale copy of the frame. The
+    largest face is mapped back to full resolution so only that region is
+    passed on for emotion analysis.
+    """
+
+    def __init__(self, detect_width=PRESENCE_DETECT_WIDTH, idle_seconds=PRESENCE_IDLE_SECONDS,
+                 margin=FACE_MARGIN):
+        self.detect_width = detect_width
+        self.idle_seconds = idle_seconds
+        self.margin = margin
+        self._cascade = cv2.CascadeClassifier(CASCADE_PATH)
+        if self._cascade.empty():
+            logger.error(f"Failed to load face cascade: {CASCADE_PATH}")
+        self.last_seen = time.monotonic()
+
+    @property
+    def idle(self):
+        """True when nobody has been seen for idle_seconds"""
+        return time.monotonic() - self.last_seen > self.idle_seconds
+
+    def detect(self, image):
+        """Return the largest face as (x, y, w, h) in image coordinates, or None"""
+        height, width = image.shape[:2]
+        scale = min(1.0, self.detect_width / float(width))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        faces = self._cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+        if len(faces) == 0:
+            return None
+
+        self.last_seen = time.monotonic()
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        return tuple(int(round(v / scale)) for v in (x, y, w, h))
+
+    def crop(self, image, box):
+        """Return a view of image around box, padded by the margin"""
+        x, y, w, h = box
+        pad_x, pad_y = int(w * self.margin), int(h * self.margin)
+        height, width = image.shape[:2]
+        return image[max(0, y - pad_y):min(height, y + h + pad_y),
+                     max(0, x - pad_x):min(width, x + w + pad_x)]
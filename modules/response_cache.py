@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from modules.weather_util import weather_bucket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("data", "response_cache.db"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(6 * 60 * 60)))
+RESPONSE_CACHE_VARIANTS = int(os.getenv("RESPONSE_CACHE_VARIANTS", "3"))
+RESPONSE_CACHE_MAX_KEYS = int(os.getenv("RESPONSE_CACHE_MAX_KEYS", "500"))
+
+
+class ResponseCache:
+    """Persistent TTL/LRU cache of LLM replies with a small pool of variants per key.
+
+    A key keeps missing until it holds `variants` fresh replies. After that,
+    lookups rotate through the pool, least recently served first, so repeated
+    questions don't get the exact same answer.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL,
+                 variants=RESPONSE_CACHE_VARIANTS, max_keys=RESPONSE_CACHE_MAX_KEYS):
+        self.ttl = ttl
+        self.variants = variants
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT NOT NULL, reply TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (key, reply))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def get(self, key, variants=None):
+        """Return a cached reply for key, or None when the pool isn't full yet.
+
+        variants overrides the pool size for this key.
+        """
+        variants = variants or self.variants
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ? AND created_at < ?", (key, now - self.ttl))
+            rows = self._conn.execute(
+                "SELECT rowid, reply FROM responses WHERE key = ? ORDER BY last_used LIMIT ?",
+                (key, variants),
+            ).fetchall()
+            if len(rows) < variants:
+                self._conn.commit()
+                self.misses += 1
+                return None
+            rowid, reply = rows[0]
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE rowid = ?", (now, rowid))
+            self._conn.commit()
+            self.hits += 1
+            return reply
+
+    def put(self, key, reply):
+        """Add a reply to the pool for key and evict least recently used keys"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, reply, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, reply, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses GROUP BY key"
+                " ORDER BY MAX(last_used) DESC LIMIT -1 OFFSET ?)",
+                (self.max_keys,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def make_key(intent, emotion, weather=None):
+    """Build a cache key from the intent, emotion and a normalized weather bucket"""
+    condition, band = weather_bucket(weather)
+    return f"{intent}|{(emotion or 'neutral').lower()}|{condition}|{band}"
@@ -1,2 +1,55 @@
-current_emotion = "neutral"
-latest_response = ""
+"""State shared between the mirror loop and the web app.
+
+Values live on the machine-local state bus (modules.state_bus), so a write
+in one process is visible in the others. Read them as module attributes
+(shared_state.current_emotion) and change them with publish().
+"""
+from modules.state_bus import get_bus
+
+DEFAULTS = {
+    "current_emotion": "neutral",
+    "latest_response": "",
+    # Latest raw result from the emotion pipeline
+    "detected_emotion": None,
+    "emotion_scores": {},
+    "emotion_updated_at": 0.0,
+    # {"city", "weather", "updated_at"} from the last weather lookup
+    "weather": None,
+    # History entry of the most recently saved outfit
+    "last_outfit": None,
+    # Pre-generated outfit suggestions, see modules.suggestions
+    "suggestions": {},
+}
+
+
+def _check(fields):
+    unknown = set(fields) - set(DEFAULTS)
+    if unknown:
+        raise AttributeError(f"Unknown shared state: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def publish(**fields):
+    """Update one or more values and notify subscribers"""
+    get_bus().publish(**_check(fields))
+
+
+def update(change):
+    """Atomically apply change(snapshot) -> {field: value}, even across processes"""
+    get_bus().update(lambda state: _check(change(dict(DEFAULTS, **state)) or {}))
+
+
+def snapshot():
+    """All values as a dict, defaults filled in"""
+    return dict(DEFAULTS, **get_bus().read())
+
+
+def subscribe(callback):
+    """Call callback(snapshot) from a background thread whenever a value changes"""
+    return get_bus().subscribe(lambda state: callback(dict(DEFAULTS, **state)))
+
+
+def __getattr__(name):
+    if name in DEFAULTS:
+        return get_bus().read().get(name, DEFAULTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,114 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "outfits")
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", "2"))
+
+# Stored renditions: name -> (subdirectory, longest side in pixels or None for full size, JPEG quality)
+RENDITIONS = {
+    "full": ("", None, int(os.getenv("SNAPSHOT_JPEG_QUALITY", "90"))),
+    "preview": ("previews", int(os.getenv("SNAPSHOT_PREVIEW_SIZE", "640")), 85),
+    "thumb": ("thumbs", int(os.getenv("SNAPSHOT_THUMB_SIZE", "160")), 80),
+}
+
+Snapshot = namedtuple("Snapshot", "image_hash path width height")
+
+
+def content_hash(image):
+    """Hash of the raw pixels (and shape), so identical shots share one file"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(image.shape).encode())
+    digest.update(image.data if image.flags.c_contiguous else image.tobytes())
+    return digest.hexdigest()
+
+
+def resize_to(image, longest):
+    """Scale image down so its longest side is at most longest pixels"""
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = longest / max(height, width)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+class SnapshotStore:
+    """Content-addressed outfit images, encoded off the caller's thread.
+
+    save() hashes and copies the frame, then returns at once; a small pool
+    encodes the full image plus preview and thumbnail renditions. Saving a
+    frame that is already stored (or still being written) is a no-op.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, workers=SNAPSHOT_WORKERS):
+        self.root = root
+        for subdirectory, _, _ in RENDITIONS.values():
+            os.makedirs(os.path.join(root, subdirectory), exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, image_hash, rendition="full"):
+        subdirectory = RENDITIONS[rendition][0]
+        return os.path.join(self.root, subdirectory, f"{image_hash}.jpg").replace(os.sep, "/")
+
+    def save(self, image):
+        """Queue image for storage and return its Snapshot; image is copied, so the caller may reuse it"""
+        image_hash = content_hash(image)
+        height, width = image.shape[:2]
+        snapshot = Snapshot(image_hash, self.path_for(image_hash), width, height)
+
+        with self._lock:
+            if image_hash in self._pending or os.path.exists(snapshot.path):
+                return snapshot
+            self._pending[image_hash] = self._pool.submit(self._write, image_hash, image.copy())
+        return snapshot
+
+    def _write(self, image_hash, image):
+        # OpenCV is only needed once something is saved; serving files doesn't load it
+        import cv2
+
+        try:
+            for rendition, (_, longest, quality) in RENDITIONS.items():
+                scaled = resize_to(image, longest) if longest else image
+                ok, encoded = cv2.imencode(".jpg", scaled, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if not ok:
+                    raise RuntimeError(f"JPEG encoding failed for {image_hash}")
+                path = self.path_for(image_hash, rendition)
+                # Write then rename, so readers never see a half-written file
+                temporary = f"{path}.tmp"
+                with open(temporary, "wb") as f:
+                    f.write(encoded.tobytes())
+                os.replace(temporary, path)
+            logger.info(f"Stored outfit snapshot {image_hash}")
+        except Exception as e:
+            logger.error(f"Error storing outfit snapshot {image_hash}: {str(e)}")
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(image_hash, None)
+
+    def wait(self, image_hash, timeout=None):
+        """Block until image_hash has been written (if it is still pending)"""
+        with self._lock:
+            future = self._pending.get(image_hash)
+        if future is not None:
+            future.result(timeout)
+
+    def flush(self, timeout=None):
+        """Wait for every pending write"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.exception(timeout)
+
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,144 @@
+import os
+import json
+import logging
+import speech_recognition as sr
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Comma-separated backends to try in order; unavailable ones are skipped
+SPEECH_BACKENDS = os.getenv("SPEECH_BACKENDS", "vosk,google")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", os.path.join("models", "vosk"))
+
+
+class SpeechBackend:
+    """Base class for speech recognizers.
+
+    transcribe() turns a whole utterance into text and raises
+    sr.UnknownValueError / sr.RequestError like speech_recognition does.
+    Backends that can decode incrementally also implement start_stream().
+    """
+
+    name = "base"
+    supports_streaming = False
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def start_stream(self, sample_rate):
+        """Return a session with feed(chunk) -> partial text and result() -> final text"""
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    """Google Web Speech API through speech_recognition (needs network)"""
+
+    name = "google"
+
+    def __init__(self):
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self._recognizer.recognize_google(audio)
+
+
+class VoskStream:
+    """Incremental Vosk decoding session for one utterance.
+
+    Vosk's endpointer can finalize a segment at a pause inside the
+    utterance; those segments are kept and joined with the rest, so
+    feed() and result() always cover everything heard so far.
+    """
+
+    def __init__(self, recognizer):
+        self._recognizer = recognizer
+        self._segments = []
+
+    def _text(self, last):
+        return " ".join(self._segments + ([last] if last else []))
+
+    def feed(self, chunk):
+        """Decode a chunk and return the current partial hypothesis"""
+        if self._recognizer.AcceptWaveform(chunk):
+            segment = json.loads(self._recognizer.Result()).get("text", "")
+            if segment:
+                self._segments.append(segment)
+            return self._text("")
+        return self._text(json.loads(self._recognizer.PartialResult()).get("partial", ""))
+
+    def result(self):
+        return self._text(json.loads(self._recognizer.FinalResult()).get("text", ""))
+
+
+class VoskBackend(SpeechBackend):
+    """Offline on-device recognition with Vosk"""
+
+    name = "vosk"
+    supports_streaming = True
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        import vosk
+
+        if not os.path.isdir(model_path):
+            raise RuntimeError(f"Vosk model not found at {model_path}")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._model = vosk.Model(model_path)
+
+    def start_stream(self, sample_rate):
+        return VoskStream(self._vosk.KaldiRecognizer(self._model, sample_rate))
+
+    def transcribe(self, audio):
+        stream = self.start_stream(audio.sample_rate)
+        stream.feed(audio.get_raw_data(convert_width=2))
+        text = stream.result()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+}
+
+
+def load_backend(name):
+    """Instantiate a backend by name, or return None if it isn't available here"""
+    try:
+        return BACKENDS[name]()
+    except Exception as e:
+        logger.warning(f"Speech backend '{name}' unavailable: {str(e)}")
+        return None
+
+
+class FallbackRecognizer(SpeechBackend):
+    """Tries each backend in order until one understands the utterance"""
+
+    name = "fallback"
+
+    def __init__(self, names=SPEECH_BACKENDS):
+        self.backends = [b for b in (load_backend(n.strip()) for n in names.split(",") if n.strip()) if b]
+        if not self.backends:
+            raise RuntimeError("No speech recognition backend available")
+        logger.info(f"Speech backends: {[b.name for b in self.backends]}")
+
+    @property
+    def supports_streaming(self):
+        return self.backends[0].supports_streaming
+
+    def start_stream(self, sample_rate):
+        return self.backends[0].start_stream(sample_rate)
+
+    def transcribe(self, audio):
+        error = sr.UnknownValueError()
+        for backend in self.backends:
+            try:
+                return backend.transcribe(audio)
+            except sr.RequestError as e:
+                # Service down: move on to the next (e.g. offline) backend
+                logger.warning(f"Speech backend '{backend.name}' failed: {str(e)}")
+                error = e
+            except sr.UnknownValueError as e:
+                error = e
+        raise error
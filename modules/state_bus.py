@@ -0,0 +1,361 @@
+import os
+import json
+import time
+import errno
+import socket
+import struct
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Shared memory segment holding the state, and the directory of subscriber sockets
+STATE_BUS_NAME = os.getenv("STATE_BUS_NAME", "sakha_state")
+STATE_BUS_SIZE = int(os.getenv("STATE_BUS_SIZE", str(64 * 1024)))
+STATE_BUS_DIR = os.getenv("STATE_BUS_DIR", os.path.join(tempfile.gettempdir(), "sakha-state"))
+# Where Unix datagram sockets are unavailable, subscribers poll the sequence number
+STATE_BUS_POLL_INTERVAL = float(os.getenv("STATE_BUS_POLL_INTERVAL", "0.05"))
+# A write still in progress after this many seconds is taken to be from a writer that died
+STATE_BUS_STALL_TIMEOUT = float(os.getenv("STATE_BUS_STALL_TIMEOUT", "1.0"))
+
+# Segment layout: sequence number, payload length, JSON payload
+HEADER = struct.Struct("<QI")
+NOTIFY = struct.Struct("<Q")
+
+
+def _attach(name, size):
+    """Create the named segment, or attach to it if another process already did"""
+    try:
+        segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        segment = shared_memory.SharedMemory(name=name)
+    # The segment outlives any one process; keep the resource tracker from
+    # unlinking it when this process exits
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+class FileLock:
+    """Exclusive lock on a file shared by every process: fcntl.flock on POSIX, msvcrt.locking on Windows.
+
+    The OS drops the lock when its holder exits, so a crashed process never
+    leaves it held.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """Take the lock; with blocking=False return False instead of waiting"""
+        lock_file = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                while True:
+                    try:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.01)
+        except OSError:
+            lock_file.close()
+            if blocking:
+                raise
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class StateBus:
+    """Machine-local key/value state shared by the mirror and web processes.
+
+    The state lives in a shared memory segment guarded by a seqlock: readers
+    copy it without taking any lock and retry if a write overlapped, so
+    reading is a few memory copies. Writers serialize on a file lock. After
+    each write, subscribers are notified with a datagram on their Unix
+    socket instead of polling. The segment outlives every process, so a
+    write left half done by a writer that died is repaired rather than
+    waited on forever.
+    """
+
+    def __init__(self, name=STATE_BUS_NAME, size=STATE_BUS_SIZE, socket_dir=STATE_BUS_DIR):
+        self.name = name
+        self.socket_dir = socket_dir
+        self._segment = _attach(name, size)
+        self._buf = self._segment.buf
+        self._capacity = self._segment.size - HEADER.size
+        os.makedirs(socket_dir, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._lock_path = os.path.join(socket_dir, f"{name}.lock")
+        # (seq, state) of the last decode, swapped as one object so threads never mix the two
+        self._cached = (None, {})
+        self._callbacks = []
+        self._subscriber = None
+        self._sender = None
+        self._closed = threading.Event()
+
+    @property
+    def seq(self):
+        return HEADER.unpack_from(self._buf, 0)[0]
+
+    def read(self):
+        """Current state as a dict, without locking (retries while a write is in progress)"""
+        deadline = None
+        while True:
+            seq, length = HEADER.unpack_from(self._buf, 0)
+            cached_seq, cached_state = self._cached
+            if seq == cached_seq:
+                return cached_state
+            if seq & 1:
+                if deadline is None:
+                    deadline = time.monotonic() + STATE_BUS_STALL_TIMEOUT
+                elif time.monotonic() > deadline:
+                    self._repair(seq)
+                    deadline = None
+                else:
+                    time.sleep(0)
+                continue
+            payload = bytes(self._buf[HEADER.size:HEADER.size + min(length, self._capacity)])
+            if HEADER.unpack_from(self._buf, 0)[0] != seq:
+                continue
+            state = json.loads(payload) if payload else {}
+            self._cached = (seq, state)
+            return state
+
+    def publish(self, **fields):
+        """Merge fields into the state, then notify subscribers; returns the new sequence number"""
+        return self.update(lambda state: fields)
+
+    def update(self, change):
+        """Atomic read-modify-write: merge change(state) into the state.
+
+        change runs under the writer lock, so no other process can write in
+        between; returning an empty dict leaves the state (and sequence
+        number) untouched.
+        """
+        with self._locked():
+            if self.seq & 1:
+                self._recover()
+            fields = change(self.read())
+            if not fields:
+                return self.seq
+            seq = self._write(dict(self.read(), **fields))
+        self._notify(seq)
+        return seq
+
+    @contextmanager
+    def _locked(self):
+        """Writer lock: threads of this process, then other processes"""
+        with self._write_lock, FileLock(self._lock_path):
+            yield
+
+    def _write(self, state):
+        """Store state and return the new (even) sequence number; call with the writer lock held"""
+        payload = json.dumps(state, separators=(",", ":")).encode()
+        if len(payload) > self._capacity:
+            raise ValueError(f"State of {len(payload)} bytes exceeds the bus capacity")
+        # Odd sequence = write in progress; readers retry until it is even again
+        odd = self.seq | 1
+        HEADER.pack_into(self._buf, 0, odd, 0)
+        self._buf[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(self._buf, 0, odd + 1, len(payload))
+        return odd + 1
+
+    def _recover(self):
+        """Finish a write whose writer died half way; call with the writer lock held.
+
+        The payload may be torn, so the last state this process decoded is
+        published again in its place.
+        """
+        logger.warning("State bus was left mid-write by a writer that went away; restoring the last known state")
+        return self._write(self._cached[1])
+
+    def _repair(self, stuck_seq):
+        """Called by a reader that has waited too long for a write to finish"""
+        with self._locked():
+            # A live writer holds the lock, so getting it with seq unchanged means the writer is gone
+            if self.seq != stuck_seq:
+                return
+            seq = self._recover()
+        self._notify(seq)
+
+    def _notify(self, seq):
+        if not hasattr(socket, "AF_UNIX"):
+            return
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+        message = NOTIFY.pack(seq)
+        for entry in os.scandir(self.socket_dir):
+            if not entry.name.endswith(".sock"):
+                continue
+            try:
+                self._sender.sendto(message, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Subscriber went away without cleaning up
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            except OSError as e:
+                # A full receive queue is fine: the subscriber reads the latest state anyway
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS):
+                    logger.warning(f"State notification to {entry.name} failed: {str(e)}")
+
+    def subscribe(self, callback):
+        """Call callback(state) after every change, from a background thread"""
+        self._callbacks.append(callback)
+        if self._subscriber is None:
+            self._subscriber = threading.Thread(target=self._listen, name="state-bus", daemon=True)
+            self._subscriber.start()
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def _listen(self):
+        receiver = None
+        path = None
+        if hasattr(socket, "AF_UNIX"):
+            path = os.path.join(self.socket_dir, f"{os.getpid()}-{id(self):x}.sock")
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(path)
+            receiver.settimeout(1.0)
+
+        last_seq = self.seq
+        try:
+            while not self._closed.is_set():
+                if receiver is not None:
+                    try:
+                        receiver.recv(NOTIFY.size)
+                    except socket.timeout:
+                        pass
+                else:
+                    self._closed.wait(STATE_BUS_POLL_INTERVAL)
+                state = self.read()
+                seq = self._cached[0]
+                if seq == last_seq:
+                    continue
+                last_seq = seq
+                for callback in list(self._callbacks):
+                    try:
+                        callback(state)
+                    except Exception as e:
+                        logger.error(f"State subscriber error: {str(e)}")
+        finally:
+            if receiver is not None:
+                receiver.close()
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        self._closed.set()
+        if self._subscriber is not None:
+            self._subscriber.join(timeout=2)
+        if self._sender is not None:
+            self._sender.close()
+        self._buf = None
+        self._segment.close()
+
+    def unlink(self):
+        """Close the bus and remove the segment for every process (benchmarks and tests)"""
+        from multiprocessing import resource_tracker
+
+        self.close()
+        # _attach() unregistered the segment; SharedMemory.unlink() unregisters it again
+        resource_tracker.register(self._segment._name, "shared_memory")
+        self._segment.unlink()
+
+
+class LocalStateBus:
+    """Process-local stand-in used when shared memory isn't available"""
+
+    def __init__(self):
+        self._state = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def read(self):
+        return self._state
+
+    def publish(self, **fields):
+        self.update(lambda state: fields)
+
+    def update(self, change):
+        with self._lock:
+            fields = change(self._state)
+            if not fields:
+                return
+            self._state = dict(self._state, **fields)
+            state = self._state
+        for callback in list(self._callbacks):
+            try:
+                callback(state)
+            except Exception as e:
+                logger.error(f"State subscriber error: {str(e)}")
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """The process-wide bus, opened on first use"""
+    global _bus
+    if _bus is not None:
+        return _bus
+    with _bus_lock:
+        if _bus is None:
+            try:
+                _bus = StateBus()
+            except Exception as e:
+                logger.warning(f"Shared state bus unavailable, state stays in-process: {str(e)}")
+                _bus = LocalStateBus()
+        return _bus
@@ -0,0 +1,119 @@
+import os
+import cv2
+import numpy as np
+
+# Subtitle appearance
+SUBTITLE_FONT_SCALE = float(os.getenv("SUBTITLE_FONT_SCALE", "0.7"))
+SUBTITLE_THICKNESS = int(os.getenv("SUBTITLE_THICKNESS", "2"))
+SUBTITLE_MAX_LINES = int(os.getenv("SUBTITLE_MAX_LINES", "4"))
+SUBTITLE_MARGIN = int(os.getenv("SUBTITLE_MARGIN", "20"))
+# Opacity of the band behind the text (0 = none, 1 = solid black)
+SUBTITLE_BACKGROUND = float(os.getenv("SUBTITLE_BACKGROUND", "0.55"))
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class SubtitleOverlay:
+    """Word-wrapped subtitles blended into the bottom of each frame.
+
+    The text is laid out and rasterized into a premultiplied layer only when
+    it (or the frame width) changes; every frame after that is one
+    multiply-add over the subtitle band's ROI. Long replies keep their last
+    max_lines lines, which is where streamed text is growing.
+    """
+
+    def __init__(self, scale=SUBTITLE_FONT_SCALE, thickness=SUBTITLE_THICKNESS,
+                 max_lines=SUBTITLE_MAX_LINES, margin=SUBTITLE_MARGIN, background=SUBTITLE_BACKGROUND):
+        self.scale = scale
+        self.thickness = thickness
+        self.max_lines = max_lines
+        self.margin = margin
+        self.background = background
+        (_, text_height), baseline = cv2.getTextSize("Ag", FONT, scale, thickness)
+        self.line_height = text_height + baseline + max(4, text_height // 3)
+        self.baseline = baseline
+        self.renders = 0
+        self._key = None
+        self._layer = None
+        self._word_widths = {}
+
+    def _width(self, text):
+        width = self._word_widths.get(text)
+        if width is None:
+            width = cv2.getTextSize(text, FONT, self.scale, self.thickness)[0][0]
+            if len(self._word_widths) > 4096:
+                self._word_widths.clear()
+            self._word_widths[text] = width
+        return width
+
+    def wrap(self, text, max_width):
+        """Greedy word wrap to max_width pixels; over-long words are split"""
+        space = self._width(" ")
+        lines, line, line_width = [], [], 0
+        for word in text.split():
+            word_width = self._width(word)
+            while word_width > max_width and len(word) > 1:
+                # Split a word that can't fit on any line
+                cut = max(1, len(word) * max_width // word_width)
+                if line:
+                    lines.append(" ".join(line))
+                    line, line_width = [], 0
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = self._width(word)
+            if line and line_width + space + word_width > max_width:
+                lines.append(" ".join(line))
+                line, line_width = [], 0
+            line_width += (space if line else 0) + word_width
+            line.append(word)
+        if line:
+            lines.append(" ".join(line))
+        return lines
+
+    def _render(self, text, frame_width):
+        """Rasterize text into (band height, premultiplied colour, inverse alpha, blend buffer)"""
+        max_width = frame_width - 2 * self.margin
+        lines = self.wrap(text, max_width)
+        if len(lines) > self.max_lines:
+            lines = ["..." + lines[-self.max_lines]] + lines[-self.max_lines + 1:]
+        if not lines:
+            return None
+
+        height = len(lines) * self.line_height + self.margin
+        mask = np.zeros((height, frame_width), dtype=np.uint8)
+        for i, line in enumerate(lines):
+            y = (i + 1) * self.line_height - self.baseline
+            cv2.putText(mask, line, (self.margin, y), FONT, self.scale, 255, self.thickness, cv2.LINE_AA)
+
+        # White text over a translucent black band: what is left of the
+        # frame is (1 - band) * (1 - text) and the added colour is the text
+        # coverage itself, so the sum never exceeds 255.
+        inverse = ((1.0 - self.background) * (255 - mask.astype(np.float32))).round().astype(np.uint8)
+        inverse = cv2.merge([inverse] * 3)
+        premultiplied = cv2.merge([mask] * 3)
+        self.renders += 1
+        return height, premultiplied, inverse, np.empty_like(premultiplied)
+
+    def draw(self, frame, text):
+        """Blend the subtitle for text into the bottom of frame (in place) and return it"""
+        if not text:
+            return frame
+        frame_height, frame_width = frame.shape[:2]
+        key = (text, frame_width)
+        if key != self._key:
+            self._layer = self._render(text, frame_width)
+            self._key = key
+        if self._layer is None:
+            return frame
+
+        height, premultiplied, inverse, scratch = self._layer
+        height = min(height, frame_height)
+        roi = frame[frame_height - height:, :]
+        kept = scratch[-height:]
+        cv2.multiply(roi, inverse[-height:], dst=kept, scale=1 / 255)
+        if roi.flags.c_contiguous:
+            cv2.add(kept, premultiplied[-height:], dst=roi)
+        else:
+            # OpenCV can't write into a strided view; copy the result back
+            roi[:] = cv2.add(kept, premultiplied[-height:])
+        return frame
@@ -0,0 +1,369 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter, defaultdict, deque
+from modules import shared_state
+from modules.database import session_scope, get_recent_emotions
+from modules.state_bus import STATE_BUS_DIR, STATE_BUS_NAME, FileLock
+from modules.wardrobe import suggest, parse_items
+from modules.weather_util import publish_weather, watch_weather, weather_bucket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Turn prefetching off with PREFETCH_SUGGESTIONS=0; requests then rank and phrase on demand
+PREFETCH_SUGGESTIONS = os.getenv("PREFETCH_SUGGESTIONS", "1") == "1"
+# Besides the current emotion, pre-generate for this many likely next emotions
+PREFETCH_NEXT_EMOTIONS = int(os.getenv("PREFETCH_NEXT_EMOTIONS", "2"))
+# ...but only those at least this likely to come next, so unlikely guesses don't cost API calls
+PREFETCH_MIN_PROBABILITY = float(os.getenv("PREFETCH_MIN_PROBABILITY", "0.2"))
+# How long take() waits for a suggestion that is being generated right now, in seconds
+PREFETCH_WAIT = float(os.getenv("PREFETCH_WAIT", "10"))
+# A prefetched suggestion is dropped after this many seconds
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", str(30 * 60)))
+# Upper bound on generations per hour, so speculation can't run up the bill
+PREFETCH_MAX_PER_HOUR = int(os.getenv("PREFETCH_MAX_PER_HOUR", "60"))
+# How many saved outfits seed the emotion transition model
+PREFETCH_HISTORY = int(os.getenv("PREFETCH_HISTORY", "1000"))
+# Log hit rate and generation counts every this many seconds (0 disables)
+PREFETCH_STATS_INTERVAL = float(os.getenv("PREFETCH_STATS_INTERVAL", "600"))
+
+
+def suggestion_key(city, weather, emotion):
+    """Suggestions are kept per weather bucket, so a one-degree change doesn't discard them"""
+    condition, band = weather_bucket(weather)
+    return f"{city}|{condition}|{band}|{emotion}"
+
+
+def outfit_items(text):
+    """The combination a suggestion names, however it is worded"""
+    return frozenset(item.name for item in parse_items(text))
+
+
+class EmotionForecast:
+    """First-order Markov model of smoothed emotion changes.
+
+    Transition counts are seeded from the emotions stored with past outfits
+    and grow with every change seen at runtime.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(Counter)
+
+    def observe(self, previous, emotion):
+        if previous and emotion and previous != emotion:
+            self.counts[previous][emotion] += 1
+
+    def seed(self, emotions):
+        """Learn from a sequence of emotions, oldest first"""
+        for previous, emotion in zip(emotions, emotions[1:]):
+            self.observe(previous, emotion)
+
+    def predict(self, emotion, count, min_probability=0.0):
+        """Up to count most likely emotions to follow emotion, most likely first"""
+        following = self.counts.get(emotion)
+        if not following or count <= 0:
+            return []
+        total = sum(following.values())
+        return [name for name, seen in following.most_common(count) if seen / total >= min_probability]
+
+
+class SuggestionPrefetcher:
+    """Keeps outfit suggestions ready for the current weather and likely emotions.
+
+    Ready suggestions live on the shared state bus, so the web app and the
+    mirror's voice loop serve from the same pool. Any process can take() one;
+    only the process holding the prefetch lock generates, so two processes
+    never pay for the same suggestion. It refills whenever the weather, the
+    smoothed emotion or the pool changes, and drops suggestions made for
+    weather that no longer applies or naming an outfit that was just worn.
+    """
+
+    def __init__(self, generate=None, next_emotions=PREFETCH_NEXT_EMOTIONS, min_probability=PREFETCH_MIN_PROBABILITY,
+                 ttl=PREFETCH_TTL, max_per_hour=PREFETCH_MAX_PER_HOUR):
+        self.generate = generate or suggest
+        self.next_emotions = next_emotions
+        self.min_probability = min_probability
+        self.ttl = ttl
+        self.max_per_hour = max_per_hour
+        self.forecast = EmotionForecast()
+        self._leader_lock = FileLock(os.path.join(STATE_BUS_DIR, f"{STATE_BUS_NAME}.prefetch.lock"))
+        self._leader = False
+        self._generated_at = deque()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self._emotion = None
+        self._weather = None
+        self._worn_id = None
+        self._worn = []
+        self._worn_lock = threading.Lock()
+        self._pool = {}
+        self._recheck_at = None
+        self._counts = {"hits": 0, "misses": 0, "generated": 0, "failed": 0, "expired": 0, "stale": 0,
+                        "over_budget": 0}
+
+    def start(self):
+        """Start the prefetch worker (generation only happens in the process holding the lock)"""
+        if self._running:
+            return
+        self._running = True
+        try:
+            with session_scope() as db:
+                self.forecast.seed(get_recent_emotions(db, PREFETCH_HISTORY))
+        except Exception as e:
+            logger.error(f"Could not seed emotion forecast: {str(e)}")
+        self._emotion = shared_state.current_emotion
+        self._worn_id = (shared_state.last_outfit or {}).get("id")
+        self._weather = shared_state.weather
+        self._pool = shared_state.suggestions
+        shared_state.subscribe(self._on_state)
+        watch_weather()
+        # Fill for the state as it is now, not only after the next change
+        self._wake.set()
+        self._thread = threading.Thread(target=self._run, name="suggestion-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._leader:
+            self._leader_lock.release()
+            self._leader = False
+
+    def take(self, city, weather, emotion, wait=PREFETCH_WAIT):
+        """Remove and return the ready suggestion for these inputs, or None.
+
+        If that suggestion is being generated right now, wait up to wait
+        seconds for it instead of paying for a second API call. Whether it
+        hits or the caller falls back to suggesting on demand, the key is left
+        with a marker that holds off its replacement until the next outfit has
+        been saved, so the replacement is ranked knowing it was worn. A ready
+        suggestion naming the outfit saved last is dropped rather than served.
+        """
+        # Lets the generating process learn about weather looked up here
+        publish_weather(city, weather)
+        key = suggestion_key(city, weather, emotion)
+        taken, stale = [], []
+
+        def pop(state):
+            pool = state["suggestions"]
+            entry = pool.get(key)
+            if entry is not None and entry["text"] is None and not entry.get("taken"):
+                # Still being generated; the wait ran out
+                return None
+            last = state["last_outfit"]
+            if entry is not None and entry["text"] is not None and time.time() - entry["created_at"] < self.ttl:
+                if last and outfit_items(entry["text"]) == outfit_items(last["description"]):
+                    stale.append(key)
+                else:
+                    taken.append(entry["text"])
+            pool = dict(pool)
+            pool[key] = {"text": None, "created_at": time.time(), "taken": True, "after": last and last["id"]}
+            return {"suggestions": pool}
+
+        deadline = time.monotonic() + wait
+        entry = shared_state.suggestions.get(key)
+        while entry is not None and entry["text"] is None and not entry.get("taken") and time.monotonic() < deadline:
+            time.sleep(0.02)
+            entry = shared_state.suggestions.get(key)
+        shared_state.update(pop)
+        self._counts["stale"] += len(stale)
+        if taken:
+            self._counts["hits"] += 1
+            return taken[0]
+        self._counts["misses"] += 1
+        return None
+
+    def stats(self):
+        counts = dict(self._counts)
+        served = counts["hits"] + counts["misses"]
+        counts["hit_rate"] = round(counts["hits"] / served, 3) if served else None
+        counts["ready"] = sum(entry["text"] is not None for entry in shared_state.suggestions.values())
+        return counts
+
+    def _on_state(self, state):
+        # Emotion scores and streamed replies publish many times a second; only
+        # the weather, the smoothed emotion, a newly saved outfit and
+        # suggestions taken or dropped (in any process) matter here
+        changed = False
+        if state["current_emotion"] != self._emotion:
+            self.forecast.observe(self._emotion, state["current_emotion"])
+            self._emotion = state["current_emotion"]
+            changed = True
+        outfit = state["last_outfit"]
+        if outfit and outfit["id"] != self._worn_id:
+            self._worn_id = outfit["id"]
+            with self._worn_lock:
+                self._worn.append((outfit["id"], suggestion_key("", outfit["weather"], outfit["emotion"]),
+                                   outfit_items(outfit["description"])))
+            changed = True
+        if state["weather"] != self._weather:
+            self._weather = state["weather"]
+            changed = True
+        pool = state["suggestions"]
+        if pool != self._pool:
+            taken = any(entry.get("taken") and self._pool.get(key) != entry for key, entry in pool.items())
+            dropped = any(entry["text"] is not None and (pool.get(key) or {}).get("text") is None
+                          for key, entry in self._pool.items())
+            changed = changed or taken or dropped
+            self._pool = pool
+        if changed:
+            self._wake.set()
+
+    def _is_leader(self):
+        if not self._leader:
+            os.makedirs(STATE_BUS_DIR, exist_ok=True)
+            if not self._leader_lock.acquire(blocking=False):
+                return False
+            self._leader = True
+            logger.info("Generating prefetched suggestions in this process")
+        return True
+
+    def _within_budget(self):
+        now = time.monotonic()
+        while self._generated_at and now - self._generated_at[0] > 3600:
+            self._generated_at.popleft()
+        return len(self._generated_at) < self.max_per_hour
+
+    def _expire(self, city, weather):
+        prefix = suggestion_key(city, weather, "")
+        now = time.time()
+        expired, stale, recheck = [], [], []
+        with self._worn_lock:
+            worn, self._worn = self._worn, []
+        worn_items = {items for _, _, items in worn if items}
+
+        def fresh(key, entry):
+            age = now - entry["created_at"]
+            if entry.get("taken"):
+                # Refill once an outfit for this key is saved after the marker, or
+                # after a while if none is
+                recheck.append(entry["created_at"] + PREFETCH_WAIT)
+                saved = any(key.endswith(suffix) and outfit_id > (entry.get("after") or 0)
+                            for outfit_id, suffix, _ in worn)
+                return age < PREFETCH_WAIT and not saved
+            if entry["text"] is None:
+                # A placeholder this old was left behind by a generator that went away
+                recheck.append(entry["created_at"] + 2 * PREFETCH_WAIT)
+                return age < 2 * PREFETCH_WAIT
+            if outfit_items(entry["text"]) in worn_items:
+                # Ranked before that outfit was saved, so it would suggest it again
+                stale.append(key)
+                return False
+            return age < self.ttl
+
+        def drop_stale(state):
+            pool = state["suggestions"]
+            del recheck[:], stale[:]
+            keep = {k: v for k, v in pool.items() if k.startswith(prefix) and fresh(k, v)}
+            if len(keep) == len(pool):
+                return None
+            expired.append(sum(v["text"] is not None for k, v in pool.items() if k not in keep) - len(stale))
+            return {"suggestions": keep}
+
+        shared_state.update(drop_stale)
+        self._counts["expired"] += sum(expired)
+        self._counts["stale"] += len(stale)
+        # Taken markers and placeholders run out without any state change to wake on
+        self._recheck_at = min(recheck, default=None)
+
+    def _wanted(self):
+        """(city, weather, [emotions]) to have ready now, current emotion first"""
+        state = shared_state.snapshot()
+        if not state["weather"]:
+            return None
+        emotion = state["current_emotion"] or "neutral"
+        likely = self.forecast.predict(emotion, self.next_emotions, self.min_probability)
+        emotions = [emotion] + [e for e in likely if e != emotion]
+        return state["weather"]["city"], state["weather"]["weather"], emotions
+
+    def _fill(self):
+        wanted = self._wanted()
+        if wanted is None:
+            return
+        city, weather, emotions = wanted
+        self._expire(city, weather)
+        prefix = suggestion_key(city, weather, "")
+        for emotion in emotions:
+            key = suggestion_key(city, weather, emotion)
+            if key in shared_state.suggestions:
+                continue
+            if not self._within_budget():
+                self._counts["over_budget"] += 1
+                return
+            if not self._claim(key):
+                continue
+            self._generated_at.append(time.monotonic())
+            # Wearing one ready suggestion would make any other naming the same
+            # outfit stale, so each emotion gets a different combination
+            ready = {outfit_items(entry["text"]) for k, entry in shared_state.suggestions.items()
+                     if k.startswith(prefix) and entry["text"] is not None}
+            try:
+                text = self.generate(city, weather, emotion, avoid=ready)
+            except Exception as e:
+                self._counts["failed"] += 1
+                logger.error(f"Prefetching suggestion for {key} failed: {str(e)}")
+                self._set(key, None)
+                return
+            self._counts["generated"] += 1
+            self._set(key, {"text": text, "created_at": time.time()})
+            if self._wanted() != wanted:
+                # Inputs changed while generating; start over with the new ones
+                self._wake.set()
+                return
+
+    def _claim(self, key):
+        """Put a placeholder at key unless something is already there, so take()
+        waits for this one instead of calling the API itself"""
+        claimed = []
+
+        def change(state):
+            if key in state["suggestions"]:
+                return None
+            claimed.append(key)
+            return {"suggestions": dict(state["suggestions"], **{key: {"text": None, "created_at": time.time()}})}
+
+        shared_state.update(change)
+        return bool(claimed)
+
+    def _set(self, key, entry):
+        def change(state):
+            pool = {k: v for k, v in state["suggestions"].items() if k != key}
+            if entry is not None:
+                pool[key] = entry
+            return {"suggestions": pool}
+        shared_state.update(change)
+
+    def _run(self):
+        next_report = time.monotonic() + PREFETCH_STATS_INTERVAL
+        while self._running:
+            timeout = 60
+            if self._recheck_at is not None:
+                timeout = min(timeout, max(0.0, self._recheck_at - time.time()) + 0.01)
+            self._wake.wait(timeout=timeout)
+            self._wake.clear()
+            if not self._running:
+                break
+            try:
+                leader = self._is_leader()
+            except Exception as e:
+                # Not worth retrying: this process would never generate anything
+                logger.error(f"Suggestion prefetch stopped, can't take the generator lock: {str(e)}")
+                self._running = False
+                break
+            try:
+                if leader:
+                    self._fill()
+            except Exception as e:
+                logger.error(f"Suggestion prefetch error: {str(e)}")
+            if PREFETCH_STATS_INTERVAL > 0 and time.monotonic() >= next_report:
+                logger.info(f"Suggestion prefetch stats: {self.stats()}")
+                next_report = time.monotonic() + PREFETCH_STATS_INTERVAL
+
+
+prefetcher = SuggestionPrefetcher()
@@ -0,0 +1,39 @@
+import os
+import re
+import hashlib
+
+# Character shingle size used for near-duplicate detection
+SHINGLE_SIZE = int(os.getenv("SHINGLE_SIZE", "4"))
+
+# Filler words GPT reshuffles freely between paraphrases
+STOPWORDS = frozenset("""
+a an and the with or of for to in on at by your you it its is are be this that
+some pair try wear go pick today perfect look style stylish bit just so
+""".split())
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+
+def text_hash(text):
+    """Signed 64-bit hash of the normalized text (fits an SQLite INTEGER)"""
+    digest = hashlib.blake2b(normalize_text(text).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character shingles over the content words of text"""
+    words = " ".join(w for w in normalize_text(text).split() if w not in STOPWORDS)
+    if len(words) <= size:
+        return frozenset([words]) if words else frozenset()
+    return frozenset(words[i:i + size] for i in range(len(words) - size + 1))
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Utterance priorities; lower values are spoken first
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+def create_engine():
+    """Create and configure the pyttsx3 engine"""
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 170)
+    engine.setProperty('volume', 1.0)
+    return engine
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TTSWorker:
+    """Single thread that owns the TTS engine and speaks a priority queue of utterances.
+
+    say() never blocks. Identical texts that are already queued are dropped
+    (unless the caller opts out, as a streamed reply does for its own
+    sentences), and interrupt() clears the queue and cuts off the current
+    utterance at the next word boundary.
+    """
+
+    def __init__(self, engine_factory=create_engine, history=200):
+        self.engine_factory = engine_factory
+        self._heap = []
+        self._queued_texts = set()
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._current = None
+        self._cancel = False
+        self._engine = None
+        self._thread = None
+        self._latencies = []
+        self._history = history
+        self._spoken = 0
+        self._interrupted = 0
+        self._deduplicated = 0
+
+    def start(self):
+        """Start the worker thread; the engine is created on that thread"""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+                self._thread.start()
+
+    def say(self, text, priority=PRIORITY_NORMAL, on_start=None, dedupe=True):
+        """Queue text to be spoken and return immediately.
+
+        on_start(text, perf_counter_time) is called just before the
+        utterance reaches the engine. Returns False if the text was already
+        queued and has been dropped as a duplicate. dedupe=False always
+        queues it, for parts of one reply that may legitimately repeat.
+        """
+        self.start()
+        with self._cond:
+            if dedupe:
+                if text in self._queued_texts:
+                    self._deduplicated += 1
+                    return False
+                self._queued_texts.add(text)
+            heapq.heappush(self._heap, (priority, next(self._order), text, time.perf_counter(), on_start, dedupe))
+            self._cond.notify_all()
+        return True
+
+    def interrupt(self):
+        """Drop every queued utterance and stop the one being spoken"""
+        with self._cond:
+            self._interrupted += len(self._heap)
+            self._heap.clear()
+            self._queued_texts.clear()
+            if self._current is not None:
+                self._cancel = True
+                self._interrupted += 1
+            self._cond.notify_all()
+
+    @property
+    def busy(self):
+        """True while something is being spoken or waiting to be spoken"""
+        return bool(self._heap) or self._current is not None
+
+    def wait(self, timeout=None):
+        """Block until the queue is empty and nothing is being spoken"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.busy, timeout)
+
+    def stats(self):
+        """Return queue depth, counters and enqueue-to-speech latency (ms)"""
+        with self._cond:
+            latencies = list(self._latencies)
+            return {
+                "queue_depth": len(self._heap),
+                "spoken": self._spoken,
+                "interrupted": self._interrupted,
+                "deduplicated": self._deduplicated,
+                "latency_p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+                "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+            }
+
+    def _on_word(self, name, location, length):
+        # Runs inside runAndWait(); stopping here is how pyttsx3 supports barge-in
+        if self._cancel:
+            self._engine.stop()
+
+    def _run(self):
+        try:
+            self._engine = self.engine_factory()
+            if hasattr(self._engine, "connect"):
+                self._engine.connect('started-word', self._on_word)
+        except Exception as e:
+            logger.error(f"Failed to initialize TTS engine: {str(e)}")
+            self._engine = None
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._heap)
+                priority, _, text, enqueued_at, on_start, dedupe = heapq.heappop(self._heap)
+                if dedupe:
+                    self._queued_texts.discard(text)
+                self._current = text
+                self._cancel = False
+                started = time.perf_counter()
+                self._latencies.append(started - enqueued_at)
+                del self._latencies[:-self._history]
+
+            try:
+                if on_start is not None:
+                    on_start(text, started)
+                if self._engine is not None:
+                    self._engine.say(text)
+                    self._engine.runAndWait()
+            except Exception as e:
+                logger.error(f"TTS error: {str(e)}")
+            finally:
+                with self._cond:
+                    if not self._cancel:
+                        self._spoken += 1
+                    self._current = None
+                    self._cancel = False
+                    self._cond.notify_all()
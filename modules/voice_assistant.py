@@ -1,49 +1,75 @@
 import os
 import threading
-from dotenv import load_dotenv
+import time
 import speech_recognition as sr
-import pyttsx3
-import openai
 from modules import shared_state
+# The LLM helpers live in modules.llm; re-exported here for existing callers
+from modules.llm import build_messages, chat_with_gpt, achat_with_gpt, stream_chat_with_gpt
+from modules.audio_input import AudioStream
+from modules.intent_router import IntentRouter
+from modules.speech_backends import FallbackRecognizer
+from modules.tts_worker import TTSWorker, PRIORITY_NORMAL, PRIORITY_URGENT
 from modules.weather_util import get_weather, get_city_from_ip
+from modules.suggestions import prefetcher, PREFETCH_SUGGESTIONS
+from modules.wardrobe import suggest
 from modules.outfit_memory import (
     save_history, is_recently_used, get_recent_outfits,
     capture_outfit_snapshot, show_last_outfit
 )
 
-stop_speaking = False
+# Speak free-form chat replies sentence by sentence while they stream in
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") == "1"
 
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# All engine access happens on the TTS worker thread
+tts = TTSWorker()
+last_time_to_first_audio = None
 
-engine = pyttsx3.init()
-engine.setProperty('rate', 170)
-engine.setProperty('volume', 1.0)
+# One persistent audio input stream, cut into utterances by VAD
+recognizer = None
+audio_stream = None
+_audio_lock = threading.Lock()
 
-def speak(text):
-    global stop_speaking
-    stop_speaking = False
+def speak(text, priority=PRIORITY_NORMAL, interrupt=False):
+    """Queue text on the TTS worker and return without waiting for it.
+
+    interrupt=True cuts off whatever is being said first (barge-in).
+    """
+    if interrupt:
+        tts.interrupt()
     print("🪞 Mirror says:", text)
-    try:
-        engine.stop()
-        engine.say(text)
-        engine.runAndWait()
-    except Exception as e:
-        print("❌ TTS error:", e)
-    shared_state.latest_response = text
+    tts.say(text, priority=priority)
+    shared_state.publish(latest_response=text)
+
+def on_partial_transcript(text):
+    """Cut the mirror off as soon as a partial result asks it to stop"""
+    match = router.match(text)
+    if match and match.intent.name == "pause" and not match.fuzzy:
+        tts.interrupt()
+        return True
+    return False
+
+def get_audio_stream():
+    """Open the shared audio input on first use; it stays open for the session"""
+    global audio_stream, recognizer
+    with _audio_lock:
+        if audio_stream is None:
+            recognizer = FallbackRecognizer()
+            # Speech that overlaps the mirror's own voice is dropped
+            audio_stream = AudioStream(suppress=lambda: tts.busy, recognizer=recognizer,
+                                       on_partial=on_partial_transcript).start()
+        return audio_stream
 
 def listen():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("🎤 Listening...")
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        try:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=6)
-        except sr.WaitTimeoutError:
-            print("⚠️ Listening timed out.")
-            return ""
+    stream = get_audio_stream()
+    # Don't pick up the mirror's own voice
+    tts.wait()
+    print("🎤 Listening...")
+    utterance = stream.next_utterance(timeout=5)
+    if utterance is None:
+        print("⚠️ Listening timed out.")
+        return ""
     try:
-        text = recognizer.recognize_google(audio)
+        text = utterance.transcript or recognizer.transcribe(utterance.audio)
         print("👤 You said:", text)
         return text
     except sr.UnknownValueError:
@@ -53,106 +79,128 @@ def listen():
         print("❌ Speech service down")
         return ""
 
-def chat_with_gpt(user_input, emotion="neutral"):
-    prompt = f"""
-    You are a smart, silly, sarcastic best friend.
-    Your user is feeling {emotion}.
-    User said: {user_input}
-    Reply like a friend, not a therapist. Be witty or savage if needed.
-    """
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_input}
-            ],
-            max_tokens=100,
-            temperature=0.8
-        )
-        reply = response['choices'][0]['message']['content'].strip()
-        shared_state.latest_response = reply
-        return reply
-    except Exception as e:
-        print("OpenAI Error:", e)
-        shared_state.latest_response = "I’m having a dumb moment. Try again."
-        return "I’m having a dumb moment. Try again."
+def speak_streaming(user_input, emotion="neutral"):
+    """Speak a GPT reply sentence by sentence while it is still being generated"""
+    started = time.perf_counter()
+
+    def mark_first_audio(text, at):
+        global last_time_to_first_audio
+        last_time_to_first_audio = at - started
+        print(f"⏱️ Time to first audio: {last_time_to_first_audio:.2f}s")
+
+    sentences = []
+    for sentence in stream_chat_with_gpt(user_input, emotion):
+        print("🪞 Mirror says:", sentence)
+        # Sentences of one reply are never collapsed, even if the reply repeats itself
+        tts.say(sentence, on_start=None if sentences else mark_first_audio, dedupe=False)
+        sentences.append(sentence)
+
+    reply = " ".join(sentences)
+    shared_state.publish(latest_response=reply)
+    return reply
+
+router = IntentRouter()
+
+@router.intent("pause", ["stop talking", "shut up", "be quiet"], priority=100)
+def handle_pause(user_input):
+    speak("Fine! I’m muting myself. Say 'resume' if you miss me.", priority=PRIORITY_URGENT, interrupt=True)
+    return True, "pause"
+
+@router.intent("resume", ["resume"], priority=95)
+def handle_resume(user_input):
+    speak("I knew you'd come back. What now?")
+    return True, "resume"
+
+@router.intent("goodbye", ["bye", "goodbye", "goodnight", "good night", "see you"], priority=90)
+def handle_goodbye(user_input):
+    speak("Sleep well, drama queen.")
+    return False, None
+
+@router.intent("save_outfit", ["this is my outfit", "save my outfit", "save this outfit"], priority=80)
+def handle_save_outfit(user_input):
+    speak("Smile! Capturing your fabulous look...")
+    snapshot = capture_outfit_snapshot()
+    if snapshot:
+        speak("What should I call this outfit?")
+        name = listen()
+        if name:
+            save_history(name, snapshot)
+            speak(f"Outfit '{name}' saved successfully!")
+        else:
+            speak("No name given. Outfit not saved.")
+    else:
+        speak("Could not capture your outfit. Try again.")
+    return True, None
 
-def run_friend_chat(paused):
-    user_input = listen()
-    if not user_input:
-        return True, None
+@router.intent("outfit_history", ["what did i wear", "past outfits", "outfit history"], priority=85)
+def handle_outfit_history(user_input):
+    recent = get_recent_outfits()
+    if not recent:
+        speak("No outfit history yet, fashion ghost.")
+    else:
+        summary = "Here’s what you’ve worn:\n" + "\n".join(recent)
+        speak(summary)
+    return True, None
 
-    user_input_lower = user_input.lower()
+@router.intent("show_outfit", ["show my outfit", "show last outfit", "show me my outfit",
+                               "show my last outfit", "show me my last outfit", "last outfit"], priority=60)
+def handle_show_outfit(user_input):
+    threading.Thread(target=show_last_outfit, daemon=True).start()
+    speak("Here’s what you wore last time.")
+    return True, None
 
-    if paused and "resume" in user_input_lower:
-        speak("I knew you'd come back. What now?")
-        return True, "resume"
+@router.intent("suggest_outfit", ["what should i wear", "suggest outfit", "suggest an outfit", "fit to wear",
+                                  "what to wear", "what do i wear", "outfit"], priority=50)
+def handle_suggest_outfit(user_input):
+    city = get_city_from_ip()
+    weather = get_weather(city)
+    emotion = shared_state.current_emotion
+    # Usually ready already; the prefetcher refills in the background
+    outfit = prefetcher.take(city, weather, emotion) if PREFETCH_SUGGESTIONS else None
+    if not outfit:
+        outfit = suggest(city, weather, emotion, tone="Be witty.")
+        shared_state.publish(latest_response=outfit)
+    if is_recently_used(outfit):
+        speak("We just wore that! Try something new today.")
+    else:
+        save_history(outfit, weather=weather, emotion=emotion)
+        speak(outfit)
+    return True, None
 
-    if paused:
-        return True, None
+@router.intent("weather", ["weather", "temperature", "forecast", "is it raining", "how hot is it",
+                           "how cold is it"], priority=40)
+def handle_weather(user_input):
+    city = get_city_from_ip()
+    weather = get_weather(city)
+    speak(f"The weather in {city} is {weather}.")
+    return True, None
 
-    if "stop talking" in user_input_lower or "shut up" in user_input_lower:
-        speak("Fine! I’m muting myself. Say 'resume' if you miss me.")
-        return True, "pause"
-
-    if any(p in user_input_lower for p in ["bye", "goodnight", "see you"]):
-        speak("Sleep well, drama queen.")
-        return False, None
-
-    if "this is my outfit" in user_input_lower or "save my outfit" in user_input_lower:
-        speak("Smile! Capturing your fabulous look...")
-        image_path = capture_outfit_snapshot()
-        if image_path:
-            speak("What should I call this outfit?")
-            name = listen()
-            if name:
-                save_history(name, image_path)
-                speak(f"Outfit '{name}' saved successfully!")
-            else:
-                speak("No name given. Outfit not saved.")
-        else:
-            speak("Could not capture your outfit. Try again.")
-        return True, None
+router.compile()
 
-    if "what did i wear" in user_input_lower or "past outfits" in user_input_lower:
-        recent = get_recent_outfits()
-        if not recent:
-            speak("No outfit history yet, fashion ghost.")
-        else:
-            summary = "Here’s what you’ve worn:\n" + "\n".join(recent)
-            speak(summary)
-        return True, None
+def handle_chat(user_input):
+    """Fallback for anything no intent matched: free-form GPT chat"""
+    emotion = shared_state.current_emotion
+    if STREAM_REPLIES:
+        speak_streaming(user_input, emotion)
+    else:
+        reply = chat_with_gpt(user_input, emotion)
+        speak(reply)
+    return True, None
 
-    if "show my outfit" in user_input_lower or "show last outfit" in user_input_lower:
-        threading.Thread(target=show_last_outfit, daemon=True).start()
-        speak("Here’s what you wore last time.")
+def run_friend_chat(paused):
+    user_input = listen()
+    if not user_input:
         return True, None
 
-    if any(x in user_input_lower for x in ["what should i wear", "suggest outfit", "fit to wear", "outfit"]):
-        city = get_city_from_ip()
-        weather = get_weather(city)
-        emotion = shared_state.current_emotion
-        prompt = (
-            f"You are a smart fashion assistant. The user is feeling {emotion}. "
-            f"The weather in {city} is {weather}. "
-            f"Suggest a stylish outfit that fits their mood and the current weather. Be witty."
-        )
-        outfit = chat_with_gpt(prompt, emotion)
-        if is_recently_used(outfit):
-            speak("We just wore that! Try something new today.")
-        else:
-            save_history(outfit)
-            speak(outfit)
-        return True, None
+    user_input_lower = user_input.lower()
+    match = router.match(user_input_lower)
 
-    if "weather" in user_input_lower:
-        city = get_city_from_ip()
-        weather = get_weather(city)
-        speak(f"The weather in {city} is {weather}.")
+    if paused:
+        if match and match.intent.name == "resume":
+            return handle_resume(user_input_lower)
         return True, None
 
-    emotion = shared_state.current_emotion
-    reply = chat_with_gpt(user_input_lower, emotion)
-    speak(reply)
-    return True, None
+    # "resume" only means something while paused
+    if match is None or match.intent.name == "resume":
+        return handle_chat(user_input_lower)
+    return match.intent.handler(user_input_lower)
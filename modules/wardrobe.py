@@ -0,0 +1,384 @@
+import os
+import re
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from modules.database import session_scope, get_descriptions_after
+from modules.llm import complete, acomplete
+from modules.weather_util import weather_bucket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Word the top pick with the LLM (WARDROBE_PHRASING=0 uses the plain sentence)
+WARDROBE_PHRASING = os.getenv("WARDROBE_PHRASING", "1") == "1"
+# Cached wordings kept per combination; the ranker's rotation already varies the replies
+WARDROBE_PHRASING_VARIANTS = int(os.getenv("WARDROBE_PHRASING_VARIANTS", "1"))
+# Items worn this many outfits ago still carry about a third of the full recency penalty
+WARDROBE_RECENCY_OUTFITS = float(os.getenv("WARDROBE_RECENCY_OUTFITS", "4"))
+# Per slot, keep this many top-scoring items (plus the best at each warmth level) for the combination search
+WARDROBE_SHORTLIST = int(os.getenv("WARDROBE_SHORTLIST", "8"))
+# Score weights
+WARDROBE_WEIGHTS = {
+    "warmth": float(os.getenv("WARDROBE_WEIGHT_WARMTH", "4")),
+    "rain": float(os.getenv("WARDROBE_WEIGHT_RAIN", "1.5")),
+    "mood": float(os.getenv("WARDROBE_WEIGHT_MOOD", "1")),
+    "harmony": float(os.getenv("WARDROBE_WEIGHT_HARMONY", "0.5")),
+    "recent": float(os.getenv("WARDROBE_WEIGHT_RECENT", "1.5")),
+    "owned": float(os.getenv("WARDROBE_WEIGHT_OWNED", "0.2")),
+}
+
+# kind -> (slot, warmth, rainproof, formality, coziness)
+GARMENTS = {
+    "t-shirt": ("top", 0.1, 0, 0.1, 0.4), "tee": ("top", 0.1, 0, 0.1, 0.4),
+    "tank top": ("top", 0.0, 0, 0.0, 0.3), "crop top": ("top", 0.0, 0, 0.1, 0.2),
+    "shirt": ("top", 0.2, 0, 0.6, 0.3), "blouse": ("top", 0.15, 0, 0.6, 0.3),
+    "polo": ("top", 0.15, 0, 0.4, 0.3), "sweater": ("top", 0.55, 0, 0.3, 0.8),
+    "sweatshirt": ("top", 0.45, 0, 0.1, 0.8), "hoodie": ("top", 0.5, 0, 0.0, 0.9),
+    "turtleneck": ("top", 0.5, 0, 0.5, 0.6),
+    "jeans": ("bottom", 0.3, 0, 0.3, 0.4), "chinos": ("bottom", 0.25, 0, 0.5, 0.4),
+    "trousers": ("bottom", 0.3, 0, 0.7, 0.3), "pants": ("bottom", 0.3, 0, 0.4, 0.4),
+    "joggers": ("bottom", 0.3, 0, 0.0, 0.9), "leggings": ("bottom", 0.2, 0, 0.0, 0.8),
+    "shorts": ("bottom", 0.0, 0, 0.1, 0.4), "skirt": ("bottom", 0.1, 0, 0.5, 0.3),
+    "dress": ("onepiece", 0.2, 0, 0.6, 0.4), "sundress": ("onepiece", 0.05, 0, 0.3, 0.4),
+    "jumpsuit": ("onepiece", 0.3, 0, 0.5, 0.5),
+    "jacket": ("outer", 0.4, 0, 0.4, 0.4), "puffer jacket": ("outer", 0.9, 1, 0.0, 0.8),
+    "rain jacket": ("outer", 0.3, 1, 0.1, 0.3), "raincoat": ("outer", 0.35, 1, 0.2, 0.3),
+    "windbreaker": ("outer", 0.3, 1, 0.0, 0.3), "blazer": ("outer", 0.3, 0, 0.9, 0.2),
+    "cardigan": ("outer", 0.3, 0, 0.3, 0.9), "coat": ("outer", 0.8, 0, 0.7, 0.6),
+    "trench coat": ("outer", 0.6, 1, 0.8, 0.4), "parka": ("outer", 0.9, 1, 0.1, 0.8),
+    "sneakers": ("footwear", 0.1, 0, 0.1, 0.6), "loafers": ("footwear", 0.1, 0, 0.7, 0.4),
+    "boots": ("footwear", 0.3, 1, 0.4, 0.5), "ankle boots": ("footwear", 0.25, 1, 0.5, 0.4),
+    "rain boots": ("footwear", 0.25, 1, 0.0, 0.4), "sandals": ("footwear", 0.0, 0, 0.1, 0.5),
+    "brogues": ("footwear", 0.1, 0, 0.8, 0.3), "espadrilles": ("footwear", 0.0, 0, 0.2, 0.5),
+    "heels": ("footwear", 0.0, 0, 0.8, 0.1), "flats": ("footwear", 0.05, 0, 0.4, 0.5),
+    "beanie": ("accessory", 0.2, 0, 0.0, 0.8), "scarf": ("accessory", 0.2, 0, 0.3, 0.8),
+    "cap": ("accessory", 0.0, 0, 0.0, 0.4), "sunglasses": ("accessory", 0.0, 0, 0.3, 0.2),
+    "umbrella": ("accessory", 0.0, 1, 0.3, 0.2), "watch": ("accessory", 0.0, 0, 0.6, 0.2),
+    "necklace": ("accessory", 0.0, 0, 0.5, 0.2), "statement necklace": ("accessory", 0.0, 0, 0.6, 0.2),
+}
+# Shoes you don't want on wet streets
+OPEN_FOOTWEAR = {"sandals", "espadrilles", "heels", "flats"}
+# Only worth carrying when it is wet, or sunny, out
+RAIN_ONLY = {"umbrella", "rain boots"}
+SUN_ONLY = {"sunglasses"}
+# colour -> brightness; neutrals go with anything
+COLORS = {
+    "black": 0.0, "navy": 0.15, "charcoal": 0.1, "grey": 0.3, "gray": 0.3, "brown": 0.25, "olive": 0.35,
+    "khaki": 0.4, "beige": 0.5, "cream": 0.6, "white": 0.6, "denim": 0.4, "blue": 0.55, "green": 0.55,
+    "teal": 0.6, "burgundy": 0.45, "rust": 0.65, "mustard": 0.8, "red": 0.9, "pink": 0.8, "yellow": 0.9,
+    "orange": 0.9, "purple": 0.7, "lavender": 0.7,
+}
+NEUTRAL_COLORS = {"black", "navy", "charcoal", "grey", "gray", "brown", "khaki", "beige", "cream", "white", "denim"}
+COLOR_INDEX = {color: i for i, color in enumerate(COLORS)}
+LOUD_COLORS = [COLOR_INDEX[color] for color in COLORS if color not in NEUTRAL_COLORS]
+# material/fit word -> warmth adjustment
+MATERIALS = {
+    "wool": 0.15, "knit": 0.1, "chunky": 0.1, "fleece": 0.15, "flannel": 0.1, "corduroy": 0.1,
+    "linen": -0.05, "cotton": 0.0, "silk": 0.0, "leather": 0.05, "suede": 0.0, "oversized": 0.05,
+    "cropped": -0.05, "pleated": 0.0, "striped": 0.0, "floral": 0.0, "graphic": 0.0, "plaid": 0.0,
+    "cargo": 0.0, "wide-leg": 0.0, "slim": 0.0,
+}
+
+# Total warmth the outfit should add up to, per temperature band
+TARGET_WARMTH = {"cold": 1.6, "cool": 1.1, "mild": 0.7, "warm": 0.35, "hot": 0.1, "unknown": 0.7}
+WET_CONDITIONS = ("rain", "drizzle", "thunderstorm", "snow", "sleet")
+SLOTS = ("top", "bottom", "onepiece", "footwear", "outer", "accessory")
+# How much each slot's look counts towards the mood fit
+MOOD_SHARE = {"top": 0.5, "bottom": 0.5, "onepiece": 1.0, "footwear": 0.5, "outer": 0.5, "accessory": 0.25}
+# emotion -> preference for (brightness, coziness, formality), roughly -1..1
+MOODS = {
+    "happy": (1.0, 0.0, 0.2), "surprise": (0.8, 0.0, 0.3), "neutral": (0.2, 0.2, 0.4),
+    "sad": (0.4, 1.0, -0.3), "fear": (0.0, 1.0, -0.2), "angry": (-0.6, 0.6, 0.0), "disgust": (-0.2, 0.4, 0.5),
+}
+
+# Something for every slot, so there is always a suggestion before any history exists
+STARTER_WARDROBE = [
+    "white t-shirt", "navy shirt", "grey sweater", "black hoodie", "blue jeans", "khaki chinos",
+    "black trousers", "grey joggers", "denim shorts", "white sneakers", "brown boots", "black loafers",
+    "sandals", "denim jacket", "black raincoat", "navy wool coat", "beige cardigan", "grey beanie",
+    "black umbrella", "sunglasses",
+]
+
+Item = namedtuple("Item", "name kind slot color warmth rainproof formality coziness brightness")
+
+# Longest kinds first, so "puffer jacket" wins over "jacket" and "t-shirt" over "shirt"
+_modifier = "|".join(re.escape(word) for word in sorted(set(COLORS) | set(MATERIALS), key=len, reverse=True))
+_kind = "|".join(re.escape(kind) for kind in sorted(GARMENTS, key=len, reverse=True))
+ITEM_PATTERN = re.compile(rf"\b((?:(?:{_modifier})\s+){{0,3}})({_kind})(?:s|es)?\b")
+
+
+@lru_cache(maxsize=4096)
+def parse_items(description):
+    """Items mentioned in an outfit description, e.g. "navy wool coat" -> Item(kind="coat", ...)"""
+    items = []
+    for match in ITEM_PATTERN.finditer((description or "").lower()):
+        modifiers = match.group(1).split()
+        kind = match.group(2)
+        slot, warmth, rainproof, formality, coziness = GARMENTS[kind]
+        color = next((word for word in modifiers if word in COLORS), None)
+        warmth += sum(MATERIALS.get(word, 0.0) for word in modifiers)
+        if "suede" in modifiers:
+            rainproof = 0
+        brightness = COLORS[color] if color else 0.4
+        items.append(Item(" ".join(modifiers + [kind]), kind, slot, color, max(warmth, 0.0), rainproof,
+                          formality, coziness, brightness))
+    return tuple(items)
+
+
+class Wardrobe:
+    """Items learned from outfit history, and a vectorized ranker for combinations.
+
+    Items are parsed out of saved descriptions (plus a small starter set) and
+    remembered with the outfit they were last worn in. rank() scores
+    top+bottom (or one-piece) x footwear x outerwear x accessory combinations
+    at once with NumPy broadcasting: warmth against the temperature band,
+    rain protection, mood fit for the emotion, colour harmony, a bonus for
+    items seen in the history and a penalty for recently worn ones. Each slot
+    is shortlisted first, so a large wardrobe doesn't blow up the search.
+    """
+
+    def __init__(self, starter=STARTER_WARDROBE, weights=WARDROBE_WEIGHTS, recency_outfits=WARDROBE_RECENCY_OUTFITS,
+                 shortlist=WARDROBE_SHORTLIST):
+        self.weights = weights
+        self.recency_outfits = recency_outfits
+        self.shortlist = shortlist
+        self.items = {}
+        self.last_worn = {}
+        self.times_worn = {}
+        self._last_id = 0
+        self._slots = None
+        self._lock = threading.Lock()
+        for item in parse_items(", ".join(starter)):
+            self.items[item.name] = item
+
+    def learn(self, description, outfit_id):
+        for item in parse_items(description):
+            self.items.setdefault(item.name, item)
+            self.times_worn[item.name] = self.times_worn.get(item.name, 0) + 1
+            self.last_worn[item.name] = max(outfit_id, self.last_worn.get(item.name, 0))
+        self._slots = None
+
+    def refresh(self, batch_size=5000):
+        """Learn from outfits saved since the last refresh"""
+        with self._lock:
+            while True:
+                with session_scope() as db:
+                    rows = get_descriptions_after(db, self._last_id, batch_size)
+                for outfit_id, description in rows:
+                    self.learn(description, outfit_id)
+                    self._last_id = outfit_id
+                if len(rows) < batch_size:
+                    return
+
+    def _build_slots(self):
+        """Per-slot items and feature arrays, rebuilt only after the wardrobe changes"""
+        import numpy as np
+
+        slots = {}
+        for slot in SLOTS:
+            items = [item for item in self.items.values() if item.slot == slot]
+            slots[slot] = {
+                "items": items,
+                "features": np.array([(item.warmth, item.rainproof, item.brightness, item.coziness, item.formality)
+                                      for item in items], dtype=np.float32).reshape(-1, 5),
+                "worn_in": np.array([self.last_worn.get(item.name, -np.inf) for item in items], dtype=np.float64),
+                "owned": np.log1p(np.array([self.times_worn.get(item.name, 0) for item in items], dtype=np.float32)),
+                "open": np.array([item.kind in OPEN_FOOTWEAR for item in items], dtype=np.float32),
+                "rain_only": np.array([item.kind in RAIN_ONLY for item in items], dtype=np.float32),
+                "sun_only": np.array([item.kind in SUN_ONLY for item in items], dtype=np.float32),
+                "color": np.array([COLOR_INDEX.get(item.color, -1) for item in items], dtype=np.int16),
+            }
+        return slots
+
+    def _item_scores(self, slot, arrays, last_id, mood, wet, clear):
+        """The part of the score each item contributes on its own"""
+        import numpy as np
+
+        w = self.weights
+        score = w["mood"] * MOOD_SHARE[slot] * (arrays["features"][:, 2:5] @ mood)
+        # Never-worn items have worn_in = -inf, so exp() gives no penalty
+        score -= w["recent"] * np.exp(-(last_id - arrays["worn_in"]) / self.recency_outfits).astype(np.float32)
+        score += w["owned"] * arrays["owned"]
+        if wet and slot == "footwear":
+            score += w["rain"] * (arrays["features"][:, 1] - arrays["open"])
+        if not wet:
+            score -= w["rain"] * arrays["rain_only"]
+        if not clear:
+            score -= w["rain"] * arrays["sun_only"]
+        return score
+
+    def _shortlist(self, features, score):
+        """Indices of the best items by score, plus the best at every warmth level (with
+        and without rain protection), since those depend on the rest of the outfit"""
+        import numpy as np
+
+        if len(score) <= self.shortlist:
+            return np.arange(len(score))
+        level = np.round(features[:, 0] * 5).astype(np.int32) * 2 + (features[:, 1] > 0)
+        order = np.lexsort((-score, level))
+        first = order[np.r_[True, level[order][1:] != level[order][:-1]]]
+        best = np.argpartition(-score, self.shortlist - 1)[:self.shortlist]
+        return np.union1d(best, first)
+
+    def rank(self, weather, emotion, limit=3):
+        """Best combinations for the weather and emotion as [(score, (item, ...))], best first"""
+        import numpy as np
+
+        condition, band = weather_bucket(weather)
+        target = TARGET_WARMTH.get(band, TARGET_WARMTH["unknown"])
+        wet = condition.startswith(WET_CONDITIONS)
+        clear = condition.startswith("clear")
+        mood = np.array(MOODS.get(emotion, MOODS["neutral"]), dtype=np.float32)
+        w = self.weights
+
+        with self._lock:
+            if self._slots is None:
+                self._slots = self._build_slots()
+            slots, last_id = self._slots, self._last_id
+
+        # Shortlist each slot: (items, features, score) of the candidates
+        candidates = {}
+        for slot, arrays in slots.items():
+            score = self._item_scores(slot, arrays, last_id, mood, wet, clear)
+            keep = self._shortlist(arrays["features"], score)
+            candidates[slot] = ([arrays["items"][i] for i in keep], arrays["features"][keep], score[keep],
+                                arrays["color"][keep])
+
+        # Bodies: every top x bottom pair plus every one-piece
+        tops, top_f, top_s, top_c = candidates["top"]
+        bottoms, bottom_f, bottom_s, bottom_c = candidates["bottom"]
+        pieces, piece_f, piece_s, _ = candidates["onepiece"]
+        # Two loud colours, or the same loud colour head to toe, clash
+        top_loud, bottom_loud = np.isin(top_c, LOUD_COLORS), np.isin(bottom_c, LOUD_COLORS)
+        clash = top_loud[:, None] & (bottom_loud[None, :] | (top_c[:, None] == bottom_c[None, :]))
+        pair_s = top_s[:, None] + bottom_s[None, :] - w["harmony"] * clash
+        bodies = [(top, bottom) for top in tops for bottom in bottoms] + [(piece,) for piece in pieces]
+        body_f = np.concatenate([(top_f[:, None, :2] + bottom_f[None, :, :2]).reshape(-1, 2), piece_f[:, :2]])
+        body_s = np.concatenate([pair_s.reshape(-1), piece_s])
+        keep = self._shortlist(body_f, body_s)
+        bodies, body_f, body_s = [bodies[i] for i in keep], body_f[keep], body_s[keep]
+
+        shoes, shoe_f, shoe_s, _ = candidates["footwear"]
+        outers, outer_f, outer_s, _ = candidates["outer"]
+        extras, extra_f, extra_s, _ = candidates["accessory"]
+        if not bodies or not shoes:
+            return []
+        # Outerwear and accessories are optional: a leading all-zero row stands for "none"
+        outers, extras = [None] + outers, [None] + extras
+        none = np.zeros((1, 5), dtype=np.float32)
+        outer_f, extra_f = np.vstack([none, outer_f]), np.vstack([none, extra_f])
+        outer_s, extra_s = np.r_[0, outer_s].astype(np.float32), np.r_[0, extra_s].astype(np.float32)
+
+        # Shaped to broadcast over (body, shoes, outer, accessory)
+        b, s, o, a = (np.s_[:, None, None, None], np.s_[None, :, None, None],
+                      np.s_[None, None, :, None], np.s_[None, None, None, :])
+        warmth = body_f[:, 0][b] + shoe_f[:, 0][s] + outer_f[:, 0][o] + extra_f[:, 0][a]
+        score = body_s[b] + shoe_s[s] + outer_s[o] + extra_s[a] - w["warmth"] * (warmth - target) ** 2
+        if wet:
+            # A raincoat or an umbrella keeps you dry; footwear was scored on its own
+            score = score + w["rain"] * np.maximum(outer_f[:, 1][o], extra_f[:, 1][a])
+
+        flat = score.reshape(-1)
+        limit = min(limit, flat.size)
+        best = np.argpartition(-flat, limit - 1)[:limit]
+        best = best[np.argsort(-flat[best])]
+        ranked = []
+        for index in best:
+            bi, si, oi, ai = np.unravel_index(index, score.shape)
+            combo = bodies[bi] + (shoes[si],) + tuple(item for item in (outers[oi], extras[ai]) if item is not None)
+            ranked.append((float(flat[index]), combo))
+        return ranked
+
+
+def describe(combo):
+    """Plain-English sentence for a combination"""
+    names = {item.slot: item.name for item in combo}
+    if "onepiece" in names:
+        sentence = f"Wear your {names['onepiece']}"
+    else:
+        sentence = f"Wear your {names['top']} with your {names['bottom']}"
+    if "outer" in names:
+        sentence += f", your {names['outer']} on top"
+    sentence += f" and your {names['footwear']}"
+    if "accessory" in names:
+        sentence += f", plus your {names['accessory']}"
+    return sentence + "."
+
+
+PHRASING_SYSTEM = (
+    "You are Sakha, a smart mirror telling its user what to wear. The outfit is already "
+    "decided: keep every item name exactly as written, add no other clothing, and answer "
+    "in one or two sentences."
+)
+
+
+def phrasing_prompt(plain, emotion, weather, tone=""):
+    """Only the weather bucket goes in, so a cached wording fits every reading in it"""
+    condition, band = weather_bucket(weather)
+    conditions = " and ".join(part for part in (band, condition) if part != "unknown") or "unknown"
+    return (
+        f"The user is feeling {emotion} and the weather is {conditions}. "
+        f"Their outfit for today: {plain} {tone}"
+    ).strip()
+
+
+def phrasing_intent(plain, tone=""):
+    """Response cache intent: a pool of wordings per combination and tone"""
+    return f"phrase|{tone}|{plain}"
+
+
+wardrobe = Wardrobe()
+
+
+def pick(weather, emotion, avoid=()):
+    """Top-ranked combination as (combo, plain sentence), or (None, None) with an empty wardrobe.
+
+    avoid holds frozensets of item names; the best combination not among
+    them is picked (falling back to the very best if all are avoided).
+    """
+    try:
+        wardrobe.refresh()
+    except Exception as e:
+        logger.error(f"Could not refresh wardrobe from history: {str(e)}")
+    ranked = wardrobe.rank(weather, emotion, limit=1 + len(avoid))
+    if not ranked:
+        return None, None
+    combo = next((combo for _, combo in ranked if frozenset(item.name for item in combo) not in avoid),
+                 ranked[0][1])
+    return combo, describe(combo)
+
+
+def suggest(city, weather, emotion, tone="", phrase=WARDROBE_PHRASING, avoid=()):
+    """An outfit suggestion chosen by the local ranker; the LLM only words it.
+
+    Wordings are cached per combination, emotion and weather bucket. If
+    the LLM call fails (or phrasing is off) the plain sentence is
+    returned, so there is always a real suggestion. avoid is passed to pick().
+    """
+    combo, plain = pick(weather, emotion, avoid)
+    if combo is None or not phrase:
+        return plain
+    try:
+        return complete(phrasing_prompt(plain, emotion, weather, tone), emotion,
+                        intent=phrasing_intent(plain, tone), weather=weather, system=PHRASING_SYSTEM,
+                        variants=WARDROBE_PHRASING_VARIANTS)
+    except Exception as e:
+        logger.error(f"Phrasing the outfit failed, using the plain suggestion: {str(e)}")
+        return plain
+
+
+async def asuggest(city, weather, emotion, tone="", phrase=WARDROBE_PHRASING):
+    """suggest() for async views; the refresh and ranking run off the event loop"""
+    combo, plain = await asyncio.to_thread(pick, weather, emotion)
+    if combo is None or not phrase:
+        return plain
+    try:
+        return await acomplete(phrasing_prompt(plain, emotion, weather, tone), emotion,
+                               intent=phrasing_intent(plain, tone), weather=weather, system=PHRASING_SYSTEM,
+                               variants=WARDROBE_PHRASING_VARIANTS)
+    except Exception as e:
+        logger.error(f"Phrasing the outfit failed, using the plain suggestion: {str(e)}")
+        return plain
@@ -1,35 +1,268 @@
 import os
+import re
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from modules import shared_state
 
 load_dotenv()
 api_key = os.getenv("OPENWEATHER_API_KEY")
 
+# Endpoints (overridable so a local stub server can stand in)
+IPINFO_URL = os.getenv("IPINFO_URL", "https://ipinfo.io/json")
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "http://api.openweathermap.org/data/2.5/weather")
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
+
+# Freshness windows in seconds. Past the TTL a cached value is still served
+# (and refreshed in the background) until it is older than the stale limit.
+CITY_TTL = float(os.getenv("CITY_TTL", str(24 * 60 * 60)))
+CITY_STALE = float(os.getenv("CITY_STALE", str(7 * 24 * 60 * 60)))
+WEATHER_TTL = float(os.getenv("WEATHER_TTL", str(10 * 60)))
+WEATHER_STALE = float(os.getenv("WEATHER_STALE", str(60 * 60)))
+
+DEFAULT_CITY = "Bangalore"
+# How often watch_weather() re-checks the weather, in seconds (0 disables it)
+WEATHER_PUSH_INTERVAL = float(os.getenv("WEATHER_PUSH_INTERVAL", "600"))
+
+
+class WeatherService:
+    """Cached city and weather lookups over a pooled HTTP session.
+
+    Fresh values are served from memory. Stale values are served while one
+    background request refreshes them (stale-while-revalidate), and
+    concurrent misses for the same key share a single request. acity() and
+    aweather() are the same lookups for async views, over httpx.
+    """
+
+    def __init__(self, session=None):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, key, loader):
+        """Run loader once for key, however many threads ask at the same time"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+            with self._lock:
+                self._cache[key] = (value, time.monotonic())
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _afetch(self, key, aloader):
+        """_fetch() for coroutines; waiters in other threads or event loops share the request"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await aloader()
+            with self._lock:
+                self._cache[key] = (value, time.monotonic())
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._inflight:
+                return
+
+        def refresh():
+            try:
+                self._fetch(key, loader)
+            except Exception as e:
+                print("Background refresh error:", e)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _cached(self, key, loader, ttl, stale):
+        """(True, value) if the cache can answer, refreshing a stale value in the background"""
+        entry = self._cache.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < ttl:
+                return True, value
+            if age < stale:
+                self._refresh_in_background(key, loader)
+                return True, value
+        return False, None
+
+    def _get(self, key, loader, ttl, stale):
+        hit, value = self._cached(key, loader, ttl, stale)
+        return value if hit else self._fetch(key, loader)
+
+    async def _aget(self, key, loader, aloader, ttl, stale):
+        hit, value = self._cached(key, loader, ttl, stale)
+        return value if hit else await self._afetch(key, aloader)
+
+    def _load_city(self):
+        response = self.session.get(IPINFO_URL, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.json().get("city", DEFAULT_CITY)
+
+    async def _aload_city(self):
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            response = await client.get(IPINFO_URL)
+        response.raise_for_status()
+        return response.json().get("city", DEFAULT_CITY)
+
+    @staticmethod
+    def _weather_params(city_name):
+        return {"q": city_name, "appid": api_key, "units": "metric"}
+
+    @staticmethod
+    def _parse_weather(data):
+        if data.get("cod") != 200:
+            raise ValueError(f"Weather API error: {data.get('message')}")
+        weather_desc = data["weather"][0]["main"].lower()
+        temperature = round(data["main"]["temp"])
+        return f"{weather_desc}, {temperature}°C"
+
+    def _load_weather(self, city_name):
+        response = self.session.get(OPENWEATHER_URL, params=self._weather_params(city_name), timeout=HTTP_TIMEOUT)
+        return self._parse_weather(response.json())
+
+    async def _aload_weather(self, city_name):
+        # Async views run each request on its own event loop, so a client can't outlive the call
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            response = await client.get(OPENWEATHER_URL, params=self._weather_params(city_name))
+        return self._parse_weather(response.json())
+
+    def city(self):
+        return self._get("city", self._load_city, CITY_TTL, CITY_STALE)
+
+    def weather(self, city_name):
+        return self._get(("weather", city_name), lambda: self._load_weather(city_name),
+                         WEATHER_TTL, WEATHER_STALE)
+
+    async def acity(self):
+        return await self._aget("city", self._load_city, self._aload_city, CITY_TTL, CITY_STALE)
+
+    async def aweather(self, city_name):
+        return await self._aget(("weather", city_name), lambda: self._load_weather(city_name),
+                                lambda: self._aload_weather(city_name), WEATHER_TTL, WEATHER_STALE)
+
+
+weather_service = WeatherService()
+
 def get_city_from_ip():
     try:
-        response = requests.get("https://ipinfo.io/json")
-        data = response.json()
-        return data.get("city", "Bangalore")
+        return weather_service.city()
     except:
-        return "Bangalore"  # fallback
+        return DEFAULT_CITY  # fallback
 
 def get_weather(city_name):
     if not api_key:
         return "weather API key missing"
 
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric"
+    try:
+        return weather_service.weather(city_name)
+    except ValueError as e:
+        print("⚠️", e)
+        return "weather unavailable"
+    except Exception as e:
+        print("Weather fetch error:", e)
+        return "weather unavailable"
 
+async def aget_city_from_ip():
+    """get_city_from_ip() for async views"""
     try:
-        response = requests.get(url)
-        data = response.json()
+        return await weather_service.acity()
+    except Exception:
+        return DEFAULT_CITY
 
-        if data.get("cod") != 200:
-            print("⚠️ Weather API error:", data.get("message"))
-            return "weather unavailable"
+async def aget_weather(city_name):
+    """get_weather() for async views"""
+    if not api_key:
+        return "weather API key missing"
 
-        weather_desc = data["weather"][0]["main"].lower()
-        temperature = round(data["main"]["temp"])
-        return f"{weather_desc}, {temperature}°C"
+    try:
+        return await weather_service.aweather(city_name)
+    except ValueError as e:
+        print("⚠️", e)
+        return "weather unavailable"
     except Exception as e:
         print("Weather fetch error:", e)
         return "weather unavailable"
+
+def publish_weather(city, weather):
+    """Put a lookup on the shared state bus if it differs from the last one"""
+    current = shared_state.weather
+    if not current or current.get("city") != city or current.get("weather") != weather:
+        shared_state.publish(weather={"city": city, "weather": weather, "updated_at": datetime.now().isoformat()})
+
+_watching = False
+_watch_lock = threading.Lock()
+
+def _watch(interval):
+    while True:
+        try:
+            city = get_city_from_ip()
+            publish_weather(city, get_weather(city))
+        except Exception as e:
+            print("Weather refresh error:", e)
+        time.sleep(interval)
+
+def watch_weather(interval=WEATHER_PUSH_INTERVAL):
+    """Keep the shared weather fresh from a background thread (once per process)"""
+    global _watching
+    with _watch_lock:
+        if _watching or interval <= 0:
+            return
+        _watching = True
+    threading.Thread(target=_watch, args=(interval,), name="weather-watch", daemon=True).start()
+
+# Upper bounds (°C) of the temperature bands used to bucket weather strings
+TEMPERATURE_BANDS = [(10, "cold"), (18, "cool"), (26, "mild"), (32, "warm")]
+
+def weather_bucket(weather):
+    """Normalize a get_weather() string like "clouds, 24°C" into (condition, band)"""
+    if not weather:
+        return "unknown", "unknown"
+
+    condition = weather.split(",")[0].strip().lower() or "unknown"
+    match = re.search(r"(-?\d+)\s*°?C", weather)
+    if not match:
+        return ("unknown" if condition.startswith("weather") else condition), "unknown"
+
+    temperature = int(match.group(1))
+    for upper, band in TEMPERATURE_BANDS:
+        if temperature < upper:
+            return condition, band
+    return condition, "hot"
@@ -0,0 +1,28 @@
+"""Shared test setup: scratch storage for every run, so tests never touch the mirror's own data"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix="sakha-tests-")
+
+# Set before any module reads its settings at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'outfits.db')}"
+os.environ["SNAPSHOT_DIR"] = os.path.join(SCRATCH, "outfits")
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(SCRATCH, "response_cache.db")
+os.environ["STATE_BUS_NAME"] = f"sakha_test_{os.getpid()}"
+os.environ["STATE_BUS_DIR"] = SCRATCH
+os.environ["WEATHER_PUSH_INTERVAL"] = "0"
+os.environ["PREFETCH_SUGGESTIONS"] = "0"
+
+sys.path.insert(0, ROOT)
+
+
+def pytest_sessionstart(session):
+    # app.py keeps its log files under ./logs
+    os.chdir(SCRATCH)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if "modules.state_bus" in sys.modules:
+        sys.modules["modules.state_bus"].get_bus().unlink()
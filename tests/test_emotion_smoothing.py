@@ -0,0 +1,67 @@
+"""Emotion smoothing over the rolling score window"""
+import pytest
+
+from modules.emotion_smoothing import EmotionSmoother
+
+
+def scores(emotion, confidence=90.0):
+    """DeepFace-style percentages with one clear leader"""
+    result = {"neutral": 100.0 - confidence}
+    result[emotion] = confidence
+    return result
+
+
+def test_first_frame_sets_the_label():
+    smoother = EmotionSmoother(window=5, decay=0.8, hysteresis=0.15)
+    assert smoother.update(scores("happy")) == "happy"
+
+
+def test_single_outlier_frame_does_not_flip_the_label():
+    smoother = EmotionSmoother(window=10, decay=0.8, hysteresis=0.15)
+    for _ in range(10):
+        smoother.update(scores("happy"))
+    assert smoother.update(scores("angry")) == "happy"
+    assert smoother.update(scores("happy")) == "happy"
+
+
+def test_sustained_change_flips_the_label():
+    smoother = EmotionSmoother(window=10, decay=0.8, hysteresis=0.15)
+    for _ in range(10):
+        smoother.update(scores("happy"))
+    labels = [smoother.update(scores("sad")) for _ in range(10)]
+    assert labels[0] == "happy"
+    assert labels[-1] == "sad"
+
+
+def test_hysteresis_holds_a_near_tie():
+    smoother = EmotionSmoother(window=1, decay=1.0, hysteresis=0.15)
+    smoother.update({"happy": 55.0, "sad": 45.0})
+    assert smoother.update({"happy": 45.0, "sad": 55.0}) == "happy"
+    assert smoother.update({"happy": 30.0, "sad": 70.0}) == "sad"
+
+
+def test_scores_are_normalized():
+    smoother = EmotionSmoother(window=3, decay=0.5)
+    smoother.update({"happy": 60.0, "neutral": 20.0, "sad": 20.0})
+    probabilities = smoother.probabilities
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert probabilities["happy"] == pytest.approx(0.6)
+
+
+def test_frames_older_than_the_window_are_forgotten():
+    smoother = EmotionSmoother(window=3, decay=1.0, hysteresis=0.0)
+    for _ in range(5):
+        smoother.update(scores("angry"))
+    for _ in range(3):
+        smoother.update(scores("neutral"))
+    assert smoother.probabilities["angry"] == pytest.approx(0.0)
+    assert smoother.emotion == "neutral"
+
+
+def test_reset_forgets_the_label():
+    smoother = EmotionSmoother(window=5)
+    for _ in range(5):
+        smoother.update(scores("happy"))
+    smoother.reset()
+    assert smoother.emotion is None
+    assert smoother.update(scores("sad")) == "sad"
@@ -0,0 +1,117 @@
+"""Frame grabber ring buffer, driven by the synthetic source"""
+import time
+
+import numpy as np
+import pytest
+
+from modules import frame_grabber
+from modules.frame_grabber import FrameGrabber, SyntheticCapture
+
+
+class CountingCapture(SyntheticCapture):
+    """Synthetic source that counts the frames flushed with grab()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.grabbed = 0
+
+    def grab(self):
+        self.grabbed += 1
+        return super().grab()
+
+
+@pytest.fixture
+def capture():
+    return CountingCapture(64, 48, fps=200)
+
+
+@pytest.fixture
+def grabber(monkeypatch, capture):
+    monkeypatch.setattr(frame_grabber, "open_source", lambda source: capture)
+    grabber = FrameGrabber(source="synthetic", ring_size=3)
+    assert grabber.start()
+    yield grabber
+    grabber.stop()
+
+
+def test_latest_yields_the_newest_frame(grabber):
+    with grabber.latest() as frame:
+        assert frame is not None and frame.seq >= 1
+        assert frame.image.shape == (48, 64, 3)
+        first = frame.seq
+    with grabber.latest(after_seq=first) as frame:
+        assert frame.seq > first
+        assert frame.seq <= grabber.frames_captured
+
+
+def test_latest_times_out_without_a_newer_frame(grabber):
+    with grabber.latest(after_seq=grabber.frames_captured + 10_000, timeout=0.1) as frame:
+        assert frame is None
+
+
+def test_pinned_frame_is_not_overwritten(grabber):
+    with grabber.latest() as frame:
+        pinned = frame.image.copy()
+        seen = frame.seq
+        # Capture goes on around the pinned slot
+        while grabber.frames_captured < seen + 10:
+            time.sleep(0.01)
+        assert np.array_equal(frame.image, pinned)
+
+
+def test_frames_are_dropped_while_every_slot_is_pinned(grabber):
+    frames = []
+    for _ in range(3):
+        frame = grabber.acquire(after_seq=frames[-1].seq if frames else 0)
+        assert frame is not None
+        frames.append(frame)
+    assert len({frame._slot for frame in frames}) == 3
+
+    stalled = grabber.frames_captured
+    time.sleep(0.1)
+    assert grabber.frames_captured == stalled
+    assert grabber.acquire(after_seq=stalled, timeout=0.05) is None
+
+    for frame in frames:
+        grabber.release(frame)
+    with grabber.latest(after_seq=stalled) as frame:
+        assert frame is not None
+
+
+def test_stopped_grabber_yields_nothing(grabber):
+    grabber.stop()
+    with grabber.latest(after_seq=grabber.frames_captured, timeout=0.1) as frame:
+        assert frame is None
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_idle_lowers_the_device_rate_and_leaving_flushes_the_buffer(grabber, capture, monkeypatch):
+    monkeypatch.setattr(frame_grabber, "IDLE_CAPTURE_FPS", 20.0)
+    grabber.set_idle(True)
+    wait_until(lambda: capture.fps == 20.0)
+    counted = grabber.frames_captured
+    time.sleep(0.3)
+    # Paced by the device alone: no extra sleep on top of the slower reads
+    assert 3 <= grabber.frames_captured - counted <= 8
+    assert capture.grabbed == 0
+
+    grabber.set_idle(False)
+    wait_until(lambda: capture.fps == 200)
+    wait_until(lambda: capture.grabbed == frame_grabber.CAMERA_BUFFER_FRAMES)
+
+
+def test_idle_falls_back_to_sleeping_when_the_device_ignores_the_rate(grabber, capture, monkeypatch):
+    monkeypatch.setattr(frame_grabber, "IDLE_CAPTURE_FPS", 20.0)
+    monkeypatch.setattr(capture, "set", lambda prop, value: False)
+    grabber.set_idle(True)
+    wait_until(lambda: grabber._capture_idle)
+    counted = grabber.frames_captured
+    time.sleep(0.3)
+    assert capture.fps == 200
+    assert 3 <= grabber.frames_captured - counted <= 8
@@ -0,0 +1,76 @@
+"""Conditional requests for content-addressed snapshot images"""
+import builtins
+import os
+from unittest import mock
+
+import pytest
+
+import app as app_module
+from modules.snapshot_store import snapshot_store
+
+IMAGE_HASH = "0123456789abcdef0123456789abcdef"
+JPEG = b"\xff\xd8\xff\xe0 not really a jpeg \xff\xd9"
+
+
+@pytest.fixture
+def client():
+    app_module.init_app()
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def stored_image():
+    path = snapshot_store.path_for(IMAGE_HASH, "thumb")
+    with open(path, "wb") as f:
+        f.write(JPEG)
+    yield path
+    os.remove(path)
+
+
+@pytest.fixture
+def no_file_access():
+    """Fail if the request touches the disk for the image"""
+    with mock.patch.object(app_module, "send_file") as send_file, \
+            mock.patch.object(builtins, "open") as open_, \
+            mock.patch.object(os.path, "exists") as exists:
+        yield send_file, open_, exists
+    for patched in (send_file, open_, exists):
+        patched.assert_not_called()
+
+
+def test_full_response_has_etag_and_immutable_caching(client, stored_image):
+    response = client.get(f"/images/thumb/{IMAGE_HASH}.jpg")
+    assert response.status_code == 200
+    assert response.data == JPEG
+    assert response.mimetype == "image/jpeg"
+    assert response.get_etag() == (f"{IMAGE_HASH}-thumb", False)
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == app_module.IMAGE_MAX_AGE
+
+
+def test_if_none_match_is_answered_without_file_access(client, no_file_access):
+    response = client.get(f"/images/thumb/{IMAGE_HASH}.jpg",
+                          headers={"If-None-Match": f'"{IMAGE_HASH}-thumb"'})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.get_etag() == (f"{IMAGE_HASH}-thumb", False)
+    assert response.cache_control.immutable
+
+
+def test_if_modified_since_is_answered_without_file_access(client, no_file_access):
+    response = client.get(f"/images/preview/{IMAGE_HASH}.jpg",
+                          headers={"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 GMT"})
+    assert response.status_code == 304
+    assert response.get_etag() == (f"{IMAGE_HASH}-preview", False)
+
+
+def test_etag_of_another_rendition_gets_the_image(client, stored_image):
+    response = client.get(f"/images/thumb/{IMAGE_HASH}.jpg",
+                          headers={"If-None-Match": f'"{IMAGE_HASH}-full"'})
+    assert response.status_code == 200
+    assert response.data == JPEG
+
+
+def test_unknown_hash_is_not_found(client):
+    response = client.get("/images/thumb/ffffffffffffffffffffffffffffffff.jpg")
+    assert response.status_code == 404
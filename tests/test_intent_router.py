@@ -0,0 +1,57 @@
+"""Routing table of the voice assistant's intents"""
+import pytest
+
+from modules.voice_assistant import router
+
+# (utterance, expected intent or None for the GPT fallback)
+CASES = [
+    ("stop talking please", "pause"),
+    ("oh shut up", "pause"),
+    ("resume", "resume"),
+    ("okay bye", "goodbye"),
+    ("maybe later", None),
+    ("good night mirror", "goodbye"),
+    ("this is my outfit", "save_outfit"),
+    ("can you save my outfit", "save_outfit"),
+    ("what did i wear yesterday", "outfit_history"),
+    # Overlapping phrases of two intents: priority decides, not position
+    ("show my outfit history", "outfit_history"),
+    ("save my outfit history", "outfit_history"),
+    ("show my outfit", "show_outfit"),
+    ("show my outfit please", "show_outfit"),
+    ("show me my last outfit", "show_outfit"),
+    ("outfit", "suggest_outfit"),
+    ("what should i wear today", "suggest_outfit"),
+    ("pick an outfit for me", "suggest_outfit"),
+    ("how's the weather", "weather"),
+    ("is it raining outside", "weather"),
+    ("tell me a joke", None),
+    ("i had a terrible day at work", None),
+]
+
+# Misheard by ASR; only the fuzzy pass catches these
+FUZZY_CASES = [
+    ("what should i where", "suggest_outfit"),
+    ("what's the whether like", "weather"),
+    ("hows the wether", "weather"),
+    ("stop talkin", "pause"),
+    ("save my outfitt", "save_outfit"),
+    ("what did i where yesterday", "outfit_history"),
+]
+
+
+def intent_name(text):
+    found = router.match(text)
+    return found.intent.name if found else None
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_routes(text, expected):
+    assert intent_name(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", FUZZY_CASES)
+def test_routes_asr_errors(text, expected):
+    found = router.match(text)
+    assert found is not None and found.fuzzy
+    assert found.intent.name == expected
@@ -0,0 +1,109 @@
+"""Reply caching in llm.complete(), against a fake completion client"""
+from types import SimpleNamespace
+
+import pytest
+
+from modules import llm
+from modules import response_cache as response_cache_module
+from modules.response_cache import ResponseCache
+
+WEATHER = "clouds, 22°C"
+
+
+class FakeCompletion:
+    """Same create() interface as openai.ChatCompletion, numbering its replies"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"choices": [{"message": {"content": f" reply {len(self.calls)} "}}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeCompletion()
+    monkeypatch.setattr(llm, "completion_client", fake)
+    return fake
+
+
+@pytest.fixture
+def use_cache(monkeypatch, tmp_path, clock):
+    def install(variants=1, **options):
+        cache = ResponseCache(path=str(tmp_path / "response_cache.db"), variants=variants, **options)
+        monkeypatch.setattr(llm, "response_cache", cache)
+        return cache
+    return install
+
+
+def test_cache_hit_makes_no_second_upstream_call(client, use_cache):
+    cache = use_cache()
+    first = llm.complete("what should I wear?", "happy", intent="outfit", weather=WEATHER)
+    second = llm.complete("what do I wear today?", "happy", intent="outfit", weather=WEATHER)
+    assert first == second == "reply 1"
+    assert len(client.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_covers_emotion_and_weather(client, use_cache):
+    use_cache()
+    llm.complete("what should I wear?", "happy", intent="outfit", weather=WEATHER)
+    llm.complete("what should I wear?", "sad", intent="outfit", weather=WEATHER)
+    llm.complete("what should I wear?", "happy", intent="outfit", weather="snow, -3°C")
+    assert len(client.calls) == 3
+
+
+def test_entries_expire_after_ttl(client, use_cache, clock):
+    use_cache(ttl=60)
+    llm.complete("joke please", "neutral", intent="joke", weather=WEATHER)
+    clock[0] += 59
+    assert llm.complete("joke please", "neutral", intent="joke", weather=WEATHER) == "reply 1"
+    clock[0] += 2
+    assert llm.complete("joke please", "neutral", intent="joke", weather=WEATHER) == "reply 2"
+    assert len(client.calls) == 2
+
+
+def test_least_recently_used_key_is_evicted_at_capacity(client, use_cache, clock):
+    use_cache(max_keys=2)
+    for intent in ("outfit", "joke"):
+        clock[0] += 1
+        llm.complete("hi", "neutral", intent=intent, weather=WEATHER)
+    # Serving "outfit" again makes "joke" the least recently used key
+    clock[0] += 1
+    assert llm.complete("hi", "neutral", intent="outfit", weather=WEATHER) == "reply 1"
+    clock[0] += 1
+    llm.complete("hi", "neutral", intent="compliment", weather=WEATHER)
+    assert len(client.calls) == 3
+
+    clock[0] += 1
+    assert llm.complete("hi", "neutral", intent="outfit", weather=WEATHER) == "reply 1"
+    assert len(client.calls) == 3
+    clock[0] += 1
+    assert llm.complete("hi", "neutral", intent="joke", weather=WEATHER) == "reply 4"
+    assert len(client.calls) == 4
+
+
+def test_no_intent_bypasses_the_cache(client, use_cache):
+    cache = use_cache()
+    replies = [llm.complete("tell me something", "happy", weather=WEATHER) for _ in range(3)]
+    assert replies == ["reply 1", "reply 2", "reply 3"]
+    assert len(client.calls) == 3
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0}
+
+
+def test_pool_fills_before_variants_are_served(client, use_cache, clock):
+    use_cache(variants=2)
+    replies = []
+    for _ in range(4):
+        clock[0] += 1
+        replies.append(llm.complete("hi", "neutral", intent="greeting", weather=WEATHER))
+    assert replies == ["reply 1", "reply 2", "reply 1", "reply 2"]
+    assert len(client.calls) == 2
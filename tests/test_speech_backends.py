@@ -0,0 +1,68 @@
+"""Vosk decoding sessions, against a fake KaldiRecognizer"""
+import json
+from types import SimpleNamespace
+
+import pytest
+import speech_recognition as sr
+
+from modules.speech_backends import VoskBackend, VoskStream
+
+
+class FakeRecognizer:
+    """Scripted KaldiRecognizer: audio is space-separated words, and "|" is a pause the endpointer cuts at"""
+
+    def __init__(self, *args):
+        self.words = []
+        self.finalized = None
+
+    def AcceptWaveform(self, data):
+        # Like Vosk, decoding carries on past the endpoint within the same chunk
+        accepted = False
+        for word in data.decode().split():
+            if word == "|":
+                self.finalized, self.words = " ".join(self.words), []
+                accepted = True
+            else:
+                self.words.append(word)
+        return accepted
+
+    def Result(self):
+        return json.dumps({"text": self.finalized})
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.words)})
+
+    def FinalResult(self):
+        text, self.words = " ".join(self.words), []
+        return json.dumps({"text": text})
+
+
+def fake_backend():
+    backend = VoskBackend.__new__(VoskBackend)
+    backend._vosk = SimpleNamespace(KaldiRecognizer=FakeRecognizer)
+    backend._model = None
+    return backend
+
+
+def test_stream_keeps_segments_finalized_mid_utterance():
+    stream = VoskStream(FakeRecognizer())
+    partials = [stream.feed(chunk) for chunk in (b"what", b"should", b"|", b"i", b"wear")]
+    assert partials == ["what", "what should", "what should", "what should i", "what should i wear"]
+    assert stream.result() == "what should i wear"
+
+
+def test_stream_with_several_pauses():
+    stream = VoskStream(FakeRecognizer())
+    for chunk in (b"save", b"|", b"|", b"this", b"|", b"outfit"):
+        stream.feed(chunk)
+    assert stream.result() == "save this outfit"
+
+
+def test_transcribe_keeps_text_before_an_endpoint():
+    audio = sr.AudioData(b"show my | last outfit ", 16000, 2)
+    assert fake_backend().transcribe(audio) == "show my last outfit"
+
+
+def test_transcribe_silence_is_not_understood():
+    with pytest.raises(sr.UnknownValueError):
+        fake_backend().transcribe(sr.AudioData(b"| ", 16000, 2))
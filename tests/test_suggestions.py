@@ -0,0 +1,80 @@
+"""Prefetched outfit suggestions on the shared state bus"""
+import time
+
+import pytest
+
+from modules import shared_state
+from modules import suggestions
+from modules.database import init_db
+from modules.outfit_memory import save_history
+from modules.suggestions import SuggestionPrefetcher, outfit_items, suggestion_key
+from modules.wardrobe import suggest
+
+CITY = "Mysuru"
+WEATHER = "rain, 19°C"
+KEY = suggestion_key(CITY, WEATHER, "neutral")
+
+
+def plain_suggestion(city, weather, emotion, avoid=()):
+    """The ranker's pick without the LLM"""
+    return suggest(city, weather, emotion, phrase=False, avoid=avoid)
+
+
+def ready(key=KEY):
+    entry = shared_state.suggestions.get(key)
+    return entry is not None and entry["text"] is not None
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def prefetcher():
+    init_db()
+    shared_state.publish(suggestions={}, current_emotion="neutral", last_outfit=None,
+                         weather={"city": CITY, "weather": WEATHER, "updated_at": time.time()})
+    prefetcher = SuggestionPrefetcher(generate=plain_suggestion, next_emotions=0)
+    yield prefetcher
+    prefetcher.stop()
+    shared_state.publish(suggestions={})
+
+
+def test_consecutive_takes_suggest_different_outfits(prefetcher):
+    prefetcher.start()
+    wait_until(ready)
+    first = prefetcher.take(CITY, WEATHER, "neutral")
+    save_history(first, weather=WEATHER, emotion="neutral")
+
+    # The replacement waits for the save, so it is ranked knowing the first was worn
+    wait_until(ready)
+    second = prefetcher.take(CITY, WEATHER, "neutral")
+    assert first and second
+    assert outfit_items(first) != outfit_items(second)
+    assert prefetcher.stats()["hits"] == 2
+
+
+def test_suggestion_naming_the_outfit_just_saved_is_not_served(prefetcher):
+    outfit = plain_suggestion(CITY, WEATHER, "neutral")
+    shared_state.publish(suggestions={KEY: {"text": outfit, "created_at": time.time()}})
+    save_history(outfit, weather=WEATHER, emotion="neutral")
+
+    assert prefetcher.take(CITY, WEATHER, "neutral") is None
+    assert prefetcher.stats()["stale"] == 1
+    assert shared_state.suggestions[KEY]["taken"]
+
+
+def test_take_elsewhere_without_saving_refills_after_the_marker_runs_out(prefetcher, monkeypatch):
+    monkeypatch.setattr(suggestions, "PREFETCH_WAIT", 0.3)
+    prefetcher.start()
+    wait_until(ready)
+
+    # Another process takes the suggestion and never saves an outfit
+    other = SuggestionPrefetcher(generate=plain_suggestion, next_emotions=0)
+    assert other.take(CITY, WEATHER, "neutral")
+    assert not ready()
+    wait_until(ready, timeout=3)
+    assert prefetcher.stats()["generated"] == 2
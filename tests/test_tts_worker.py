@@ -0,0 +1,99 @@
+"""TTS worker queueing, against a fake pyttsx3 engine"""
+import threading
+import time
+
+from modules.tts_worker import TTSWorker, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_URGENT
+
+
+class FakeEngine:
+    """Speaks word by word through the 'started-word' callback; "hold" blocks until released"""
+
+    def __init__(self):
+        self.spoken = []
+        self.words = []
+        self.release = threading.Event()
+        self.holding = threading.Event()
+        self._callback = None
+        self._text = None
+        self._stopped = False
+
+    def connect(self, topic, callback):
+        self._callback = callback
+
+    def say(self, text):
+        self._text = text
+
+    def runAndWait(self):
+        self._stopped = False
+        if self._text == "hold":
+            self.holding.set()
+            self.release.wait(5)
+        for location, word in enumerate(self._text.split()):
+            self._callback(None, location, len(word))
+            if self._stopped:
+                return
+            self.words.append(word)
+            time.sleep(0.01)
+        self.spoken.append(self._text)
+
+    def stop(self):
+        self._stopped = True
+
+
+def held_worker():
+    """A worker busy speaking "hold", so the next utterances queue up"""
+    engine = FakeEngine()
+    worker = TTSWorker(engine_factory=lambda: engine)
+    worker.say("hold")
+    assert engine.holding.wait(2)
+    return worker, engine
+
+
+def test_duplicate_queued_text_is_dropped():
+    worker, engine = held_worker()
+    assert worker.say("the weather is clear")
+    assert not worker.say("the weather is clear")
+    engine.release.set()
+    assert worker.wait(2)
+    assert engine.spoken == ["hold", "the weather is clear"]
+    assert worker.stats()["deduplicated"] == 1
+
+
+def test_dedupe_off_queues_repeats():
+    worker, engine = held_worker()
+    assert worker.say("okay", dedupe=False)
+    assert worker.say("okay", dedupe=False)
+    engine.release.set()
+    assert worker.wait(2)
+    assert engine.spoken == ["hold", "okay", "okay"]
+
+
+def test_higher_priority_is_spoken_first():
+    worker, engine = held_worker()
+    worker.say("later", priority=PRIORITY_LOW)
+    worker.say("normal", priority=PRIORITY_NORMAL)
+    worker.say("first", priority=PRIORITY_URGENT)
+    worker.say("normal again", priority=PRIORITY_NORMAL)
+    engine.release.set()
+    assert worker.wait(2)
+    assert engine.spoken == ["hold", "first", "normal", "normal again", "later"]
+
+
+def test_interrupt_cuts_off_speech_and_clears_the_queue():
+    engine = FakeEngine()
+    worker = TTSWorker(engine_factory=lambda: engine)
+    started = threading.Event()
+    worker.say(" ".join(["word"] * 200), on_start=lambda text, at: started.set())
+    worker.say("queued")
+    assert started.wait(2)
+    time.sleep(0.05)
+    worker.interrupt()
+    assert worker.wait(2)
+    assert engine.spoken == []
+    assert 0 < len(engine.words) < 200
+    assert worker.stats()["interrupted"] == 2
+
+    # The same text can be queued again after an interrupt
+    assert worker.say("queued")
+    assert worker.wait(2)
+    assert engine.spoken == ["queued"]
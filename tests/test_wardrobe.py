@@ -0,0 +1,56 @@
+"""Wording the ranker's pick through the LLM"""
+import asyncio
+
+import pytest
+
+from modules import llm
+from modules import wardrobe
+from modules.response_cache import ResponseCache
+
+PLAIN = "Wear your navy jeans with your white shirt and your brown loafers."
+
+
+class FakeCompletion:
+    """Same create()/acreate() interface as openai.ChatCompletion"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"choices": [{"message": {"content": f"{PLAIN} ({len(self.calls)})"}}]}
+
+    async def acreate(self, **kwargs):
+        return self.create(**kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    fake = FakeCompletion()
+    monkeypatch.setattr(llm, "completion_client", fake)
+    # Chat replies keep a pool of wordings; phrasing asks for WARDROBE_PHRASING_VARIANTS
+    monkeypatch.setattr(llm, "response_cache", ResponseCache(path=str(tmp_path / "cache.db"), variants=3))
+    monkeypatch.setattr(wardrobe, "pick", lambda weather, emotion, avoid=(): (("combo",), PLAIN))
+    return fake
+
+
+def test_phrasing_is_cached_per_combination_and_weather_bucket(client):
+    first = wardrobe.suggest("Mysuru", "clouds, 22°C", "happy", phrase=True)
+    # 24°C falls in the same "mild" band, so the wording is reused
+    assert wardrobe.suggest("Mysuru", "clouds, 24°C", "happy", phrase=True) == first
+    assert asyncio.run(wardrobe.asuggest("Mysuru", "clouds, 23°C", "happy", phrase=True)) == first
+    assert len(client.calls) == 1
+
+    wardrobe.suggest("Mysuru", "clouds, 22°C", "sad", phrase=True)
+    wardrobe.suggest("Mysuru", "rain, 22°C", "happy", phrase=True)
+    wardrobe.suggest("Mysuru", "clouds, 22°C", "happy", tone="Be witty.", phrase=True)
+    assert len(client.calls) == 4
+
+
+def test_phrasing_uses_its_own_system_message(client):
+    wardrobe.suggest("Mysuru", "clouds, 22°C", "happy", phrase=True)
+    system, user = client.calls[0]["messages"]
+    assert system == {"role": "system", "content": wardrobe.PHRASING_SYSTEM}
+    assert "best friend" not in system["content"]
+    assert PLAIN in user["content"]
+    assert "22" not in user["content"]
@@ -0,0 +1,189 @@
+"""Weather lookups against a local stub of the weather and IP APIs"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from modules import weather_util
+from modules.weather_util import WeatherService, get_weather, get_city_from_ip
+
+TTL = 600
+STALE = 3600
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Answers like ipinfo.io and OpenWeather, as configured on the server"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+        server.arrived.set()
+        server.gate.wait(5)
+        if self.path.startswith("/ip"):
+            body = {"city": server.city}
+        elif server.failing:
+            body = {"cod": 500, "message": "upstream is down"}
+        else:
+            body = {"cod": 200, "weather": [{"main": "Clouds"}], "main": {"temp": server.temperature}}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.arrived = threading.Event()
+    server.gate = threading.Event()
+    server.gate.set()
+    server.city = "Mysuru"
+    server.temperature = 22.4
+    server.failing = False
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(weather_util, "IPINFO_URL", base + "/ip")
+    monkeypatch.setattr(weather_util, "OPENWEATHER_URL", base + "/weather")
+    monkeypatch.setattr(weather_util, "api_key", "test-key")
+    monkeypatch.setattr(weather_util, "WEATHER_TTL", TTL)
+    monkeypatch.setattr(weather_util, "WEATHER_STALE", STALE)
+    yield server
+    server.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(weather_util, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def service(monkeypatch, clock):
+    service = WeatherService()
+    # Talk to the stub directly, whatever proxy the environment configures
+    service.session.trust_env = False
+    monkeypatch.setattr(weather_util, "weather_service", service)
+    return service
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_fresh_value_is_served_from_memory(api, service, clock):
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    clock[0] += TTL - 1
+    api.temperature = 30
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    assert len(api.requests) == 1
+    assert "q=Mysuru" in api.requests[0]
+
+
+def test_city_lookup(api, service):
+    assert get_city_from_ip() == "Mysuru"
+    assert get_city_from_ip() == "Mysuru"
+    assert api.requests == ["/ip"]
+
+
+def test_concurrent_misses_share_one_request(api, service):
+    api.gate.clear()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(get_weather("Mysuru"))) for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    assert api.arrived.wait(5)
+    # Give the other callers time to queue up behind the first request
+    time.sleep(0.2)
+    api.gate.set()
+    for caller in callers:
+        caller.join(5)
+    assert results == ["clouds, 22°C"] * 8
+    assert len(api.requests) == 1
+
+
+def test_stale_value_is_served_while_refreshing(api, service, clock):
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    clock[0] += TTL + 1
+    api.temperature = 30
+    api.arrived.clear()
+    api.gate.clear()
+
+    # The refresh is stuck upstream, yet callers get the stale value at once
+    started = time.monotonic()
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    assert time.monotonic() - started < 1
+    assert api.arrived.wait(5)
+
+    api.gate.set()
+    wait_until(lambda: get_weather("Mysuru") == "clouds, 30°C")
+    assert len(api.requests) == 2
+
+
+def test_failed_refresh_keeps_serving_stale_value(api, service, clock):
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    clock[0] += TTL + 1
+    api.failing = True
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    wait_until(lambda: len(api.requests) == 2 and not service._inflight)
+    assert get_weather("Mysuru") == "clouds, 22°C"
+
+    # Past the stale limit there is nothing left to fall back on
+    clock[0] += STALE
+    wait_until(lambda: not service._inflight)
+    assert get_weather("Mysuru") == "weather unavailable"
+
+
+def test_async_lookups_share_the_cache(api, service, clock):
+    async def lookups():
+        return await weather_util.aget_city_from_ip(), await weather_util.aget_weather("Mysuru")
+
+    assert asyncio.run(lookups()) == ("Mysuru", "clouds, 22°C")
+    assert get_weather("Mysuru") == "clouds, 22°C"
+    assert get_city_from_ip() == "Mysuru"
+    assert len(api.requests) == 2
+
+
+def test_async_and_threaded_misses_share_one_request(api, service):
+    api.gate.clear()
+
+    async def many():
+        return await asyncio.gather(*(weather_util.aget_weather("Mysuru") for _ in range(4)))
+
+    results = []
+    callers = [threading.Thread(target=lambda: results.extend(asyncio.run(many()))),
+               threading.Thread(target=lambda: results.append(get_weather("Mysuru")))]
+    for caller in callers:
+        caller.start()
+    assert api.arrived.wait(5)
+    time.sleep(0.2)
+    api.gate.set()
+    for caller in callers:
+        caller.join(5)
+    assert results == ["clouds, 22°C"] * 5
+    assert len(api.requests) == 1
+
+
+def test_async_lookup_falls_back_when_the_api_fails(api, service):
+    api.failing = True
+    assert asyncio.run(weather_util.aget_weather("Mysuru")) == "weather unavailable"